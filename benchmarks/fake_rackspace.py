@@ -0,0 +1,1058 @@
+# -*- coding: utf-8 -*-
+"""
+A local stand-in for the Rackspace Identity, Cloud DNS (with reverse DNS),
+Cloud Databases, Cloud Files and Cloud Load Balancers APIs.
+
+It serves just enough of each API for pyrax and the rackspace module to run
+unmodified against it, counts every request it receives and can add latency,
+shrink page sizes and enforce rate limits. Fixtures are seeded and counters
+read through the /_fake control endpoints, so the server can run in its own
+process and stay out of the client's memory measurements.
+
+Run standalone with::
+
+    python benchmarks/fake_rackspace.py --port 8900 --latency 0.02
+"""
+
+# Import Python libs
+import argparse
+import bisect
+import collections
+import datetime
+import itertools
+import json
+import threading
+import time
+import uuid
+
+import six
+from six.moves import BaseHTTPServer, socketserver
+from six.moves.urllib.parse import parse_qsl, urlsplit
+
+TENANT_ID = '123456'
+FILES_TENANT = 'MossoCloudFS_{0}'.format(TENANT_ID)
+REGIONS = ['DFW', 'ORD', 'IAD']
+
+#Page sizes and limits as documented for each API
+DEFAULT_PAGE_SIZES = {
+    'dns': 100,
+    'db': 20,
+    'files': 10000,
+    'lb': 100,
+}
+
+DEFAULT_SETTINGS = {
+    'latency': 0.0,
+    'page_sizes': DEFAULT_PAGE_SIZES,
+    #service -> verb -> [value, unit], ex. {"dns": {"GET": [600, "MINUTE"]}}
+    'rate_limits': {},
+    'regions': REGIONS,
+}
+
+RATE_LIMIT_UNITS = {'SECOND': 1, 'MINUTE': 60, 'HOUR': 3600, 'DAY': 86400}
+
+DB_FLAVORS = [
+    {'id': 1, 'name': '512MB Instance', 'ram': 512},
+    {'id': 2, 'name': '1GB Instance', 'ram': 1024},
+    {'id': 3, 'name': '2GB Instance', 'ram': 2048},
+    {'id': 4, 'name': '4GB Instance', 'ram': 4096},
+]
+
+
+def server_id(index):
+    """
+    :return: The id of the index-th server PTR records are seeded for
+    """
+    return u'00000000-0000-4000-8000-{0:012d}'.format(index)
+
+
+def ptr_address(index):
+    """
+    :return: The address of the index-th server PTR records are seeded for
+    """
+    return u'10.3.{0}.{1}'.format(index // 250, index % 250 + 1)
+
+
+def _timestamp(when=None):
+    when = when or datetime.datetime.utcnow()
+    return when.strftime('%Y-%m-%dT%H:%M:%S.000+0000')
+
+
+class FakeError(Exception):
+    """
+    Ends a request with an error status and a Rackspace style fault body
+    """
+    def __init__(self, status, message, fault='badRequest', headers=None,
+                 extra=None):
+        super(FakeError, self).__init__(message)
+        self.status = status
+        body = {'code': status, 'message': message, 'details': message}
+        body.update(extra or {})
+        self.body = {fault: body}
+        self.headers = headers or {}
+
+
+class FakeRackspace(object):
+    """
+    The state of the fake account and the request handlers of each service.
+    """
+
+    def __init__(self, url, **settings):
+        self.url = url.rstrip('/')
+        self.lock = threading.RLock()
+        self.settings = {}
+        self.configure(**settings)
+        self.reset()
+
+    def configure(self, **settings):
+        """
+        Changes the latency, page sizes, rate limits or regions
+        """
+        with self.lock:
+            for key, default in DEFAULT_SETTINGS.items():
+                value = settings.get(key, self.settings.get(key, default))
+                if key == 'page_sizes':
+                    value = dict(DEFAULT_PAGE_SIZES, **value)
+                self.settings[key] = value
+            self.windows = {}
+
+    def reset(self):
+        """
+        Removes all fixtures and zeroes the counters
+        """
+        with self.lock:
+            self.domains = collections.OrderedDict()
+            self.containers = {}
+            self.container_names = []
+            self.instances = dict((region, collections.OrderedDict())
+                                  for region in self.settings['regions'])
+            self.lbs = dict((region, collections.OrderedDict())
+                            for region in self.settings['regions'])
+            self.jobs = {}
+            #Device URL -> IP address -> PTR record
+            self.ptrs = collections.defaultdict(collections.OrderedDict)
+            #(service, region) -> fault, see seed
+            self.faults = {}
+            self.ids = itertools.count(1000)
+            self.windows = {}
+            self.reset_calls()
+
+    def reset_calls(self):
+        with self.lock:
+            self.calls = collections.Counter()
+            self.over_limit = 0
+
+    def stats(self):
+        """
+        :return: The request counters, keyed by "service VERB"
+        """
+        with self.lock:
+            return {
+                'total': sum(self.calls.values()),
+                'calls': dict(self.calls),
+                'over_limit': self.over_limit,
+            }
+
+    ## Fixtures
+    def seed(self, fixtures):
+        """
+        Adds generated fixtures to the account.
+
+        :param fixtures: A dict of dns_zones, containers, db_instances,
+        load_balancers and ptr_records lists, see the seed_* methods for
+        their fields, and a
+        faults list of {service, region, status, latency, every} making
+        every request, or every Nth one, to a service in a region wait
+        latency seconds and then fail with status if it is set
+        """
+        with self.lock:
+            for zone in fixtures.get('dns_zones', []):
+                self.seed_dns_zone(**zone)
+            for containers in fixtures.get('containers', []):
+                self.seed_containers(**containers)
+            for instances in fixtures.get('db_instances', []):
+                self.seed_db_instances(**instances)
+            for lbs in fixtures.get('load_balancers', []):
+                self.seed_load_balancers(**lbs)
+            for ptrs in fixtures.get('ptr_records', []):
+                self.seed_ptr_records(**ptrs)
+            for fault in fixtures.get('faults', []):
+                self.faults[(fault['service'], fault.get('region', 'DFW'))] = \
+                    fault
+
+    def seed_dns_zone(self, name, records=0, ttl=300,
+                      email_address='admin@example.com'):
+        """
+        Adds a zone with the given number of A records, named host-N.<zone>
+        and pointing to addresses of 10.0.0.0/8
+        """
+        domain = self._dns_domain_create(name, email_address, ttl)
+        for index in range(records):
+            self._dns_record_create(domain, {
+                'name': u'host-{0}.{1}'.format(index, name),
+                'type': 'A',
+                'data': u'10.{0}.{1}.{2}'.format(index >> 16 & 255,
+                                                 index >> 8 & 255,
+                                                 index & 255),
+                'ttl': ttl,
+            })
+        return domain
+
+    def seed_ptr_records(self, count, region='DFW', every=1,
+                         domain='example.com'):
+        """
+        Adds a PTR record for every every-th of count servers, see server_id
+        and ptr_address, naming server-N.<domain>
+        """
+        for index in range(0, count, every):
+            device = u'{0}/servers/{1}'.format(
+                self._servers_url(region), server_id(index))
+            self._rdns_record_create(device, {
+                'name': u'server-{0}.{1}'.format(index, domain),
+                'type': 'PTR',
+                'data': ptr_address(index),
+            })
+
+    def seed_containers(self, count, prefix='container', cdn_every=0,
+                        objects=0, ttl=259200):
+        """
+        Adds count containers named <prefix>-N, every cdn_every-th of them
+        CDN enabled
+        """
+        for index in range(count):
+            name = u'{0}-{1:06d}'.format(prefix, index)
+            cdn = None
+            if cdn_every and index % cdn_every == 0:
+                cdn = {'ttl': ttl, 'log_retention': False}
+            self._cf_container_create(name, cdn=cdn, objects=objects)
+
+    def seed_db_instances(self, count, region='DFW', prefix='db', flavor=1,
+                          size=5):
+        """
+        Adds count ACTIVE database instances named <prefix>-N
+        """
+        for index in range(count):
+            instance_id = six.text_type(uuid.uuid4())
+            self.instances[region][instance_id] = {
+                'id': instance_id,
+                'name': u'{0}-{1}'.format(prefix, index),
+                'status': 'ACTIVE',
+                'flavor': {'id': six.text_type(flavor), 'links': [
+                    {'rel': 'self', 'href': self._db_url(region, u'flavors/{0}'
+                                                         .format(flavor))}]},
+                'volume': {'size': size},
+                'hostname': u'{0}.rackspaceclouddb.com'.format(
+                    uuid.uuid4().hex),
+                'links': [],
+            }
+
+    def seed_load_balancers(self, count, region='DFW', prefix='lb', nodes=0,
+                            port=80, protocol='HTTP'):
+        """
+        Adds count ACTIVE load balancers named <prefix>-N, each with nodes
+        nodes at 10.1.N.M:port
+        """
+        for index in range(count):
+            lb_id = next(self.ids)
+            self.lbs[region][lb_id] = {
+                'id': lb_id,
+                'name': u'{0}-{1}'.format(prefix, index),
+                'port': port,
+                'protocol': protocol,
+                'algorithm': 'RANDOM',
+                'status': 'ACTIVE',
+                'virtualIps': [{'id': next(self.ids), 'type': 'PUBLIC',
+                                'ipVersion': 'IPV4',
+                                'address': u'198.51.100.{0}'.format(
+                                    index % 250 + 1)}],
+                'nodes': [self._lb_node({'address': u'10.1.{0}.{1}'.format(
+                    index % 250, node), 'port': port})
+                    for node in range(nodes)],
+                'created': {'time': _timestamp()},
+                'updated': {'time': _timestamp()},
+            }
+
+    ## Request handling
+    def handle(self, method, path, query, body):
+        """
+        Routes a request to its service.
+
+        :return: A (status, body, headers) tuple. A None body is sent empty,
+        anything else as JSON.
+        """
+        parts = [part for part in path.split('/') if part]
+        if parts[:1] == ['_fake']:
+            return self._control(method, parts[1:], body)
+
+        service = parts[0] if parts else ''
+        latency = self.settings['latency']
+        if latency:
+            time.sleep(latency)
+        with self.lock:
+            self.calls[u'{0} {1}'.format(service, method)] += 1
+
+        try:
+            if service == 'identity':
+                return self._identity(method, parts[1:], body)
+            if service == 'dns':
+                region, rest = 'ALL', parts[3:]
+            elif service in ('db', 'lb', 'files', 'cdn'):
+                region, rest = parts[1], parts[4:]
+                if region not in self.settings['regions']:
+                    raise FakeError(404, u'Unknown region', 'itemNotFound')
+            else:
+                raise FakeError(404, u'No such service', 'itemNotFound')
+
+            self._fault(service, region)
+            if rest == ['limits'] and service in ('dns', 'db', 'lb'):
+                return 200, self._limits(service), {}
+            self._rate_limit(service, region, method)
+            handler = getattr(self, '_' + service)
+            return handler(method, region, rest, query, body)
+        except FakeError as e:
+            return e.status, e.body, e.headers
+
+    def _control(self, method, parts, body):
+        action = parts[0] if parts else ''
+        if action == 'stats':
+            return 200, self.stats(), {}
+        if method != 'POST':
+            raise FakeError(405, u'Use POST')
+        if action == 'reset':
+            self.reset()
+        elif action == 'reset_calls':
+            self.reset_calls()
+        elif action == 'configure':
+            self.configure(**(body or {}))
+        elif action == 'seed':
+            self.seed(body or {})
+        else:
+            return 404, {'message': u'Unknown action'}, {}
+        return 200, self.stats(), {}
+
+    def _fault(self, service, region):
+        fault = self.faults.get((service, region))
+        if not fault:
+            return
+        with self.lock:
+            fault['requests'] = fault.get('requests', 0) + 1
+            if fault['requests'] % fault.get('every', 1):
+                return
+        time.sleep(fault.get('latency', 0))
+        if fault.get('status'):
+            raise FakeError(fault['status'], u'Service Unavailable',
+                            'serviceUnavailable')
+
+    def _limits(self, service):
+        rates = []
+        for verb, (value, unit) in sorted(
+                self.settings['rate_limits'].get(service, {}).items()):
+            rates.append({'verb': verb, 'value': value, 'unit': unit,
+                          'remaining': value,
+                          'next-available': _timestamp()})
+        limits = {'rate': [], 'absolute': {}}
+        if rates:
+            limits['rate'].append({'uri': '*', 'regex': '.*',
+                                   'limit': rates})
+        return {'limits': limits}
+
+    def _rate_limit(self, service, region, method):
+        """
+        Applies a fixed window limit per service, region and verb
+        :raise FakeError: A 413 with Retry-After once over the limit
+        """
+        limit = self.settings['rate_limits'].get(service, {}).get(method)
+        if not limit:
+            return
+        value, unit = limit
+        seconds = RATE_LIMIT_UNITS[unit.upper()]
+        now = time.time()
+        key = (service, region, method)
+        with self.lock:
+            start, count = self.windows.get(key, (now, 0))
+            if now - start >= seconds:
+                start, count = now, 0
+            if count >= value:
+                self.over_limit += 1
+                retry = start + seconds - now
+                retry_at = datetime.datetime.utcnow() + datetime.timedelta(
+                    seconds=retry)
+                raise FakeError(
+                    413, u'OverLimit Retry...', 'overLimit',
+                    headers={'Retry-After': '{0:.0f}'.format(retry + 0.5)},
+                    extra={'retryAfter': retry_at.strftime(
+                        '%Y-%m-%dT%H:%M:%SZ')})
+            self.windows[key] = (start, count + 1)
+
+    def _page(self, service, items, query, key=None):
+        """
+        Pages a list by limit and offset
+        :return: The page and the offset of the next page or None
+        """
+        page_size = self.settings['page_sizes'][service]
+        limit = min(int(query.get('limit', page_size)), page_size)
+        offset = int(query.get('offset', 0))
+        page = items[offset:offset + limit]
+        if offset + limit < len(items):
+            return page, offset + limit
+        return page, None
+
+    ## Identity
+    def _identity(self, method, parts, body):
+        if method != 'POST' or parts[-1:] != ['tokens']:
+            raise FakeError(404, u'Not found', 'itemNotFound')
+        auth = (body or {}).get('auth', {})
+        creds = auth.get('RAX-KSKEY:apiKeyCredentials') or auth.get(
+            'passwordCredentials') or {}
+        username = creds.get('username')
+        if not username:
+            raise FakeError(401, u'Unable to authenticate user',
+                            'unauthorized')
+        expires = datetime.datetime.utcnow() + datetime.timedelta(days=1)
+        return 200, {'access': {
+            'token': {
+                'id': uuid.uuid4().hex,
+                'expires': expires.strftime('%Y-%m-%dT%H:%M:%S.000Z'),
+                'tenant': {'id': TENANT_ID, 'name': TENANT_ID},
+            },
+            'serviceCatalog': self._catalog(),
+            'user': {
+                'id': '1', 'name': username,
+                'roles': [{'id': '3', 'name': 'identity:default'}],
+                'RAX-AUTH:defaultRegion': self.settings['regions'][0],
+            },
+        }}, {}
+
+    def _catalog(self):
+        def regional(prefix, version, tenant):
+            return [{'region': region, 'tenantId': tenant,
+                     'publicURL': u'{0}/{1}/{2}/{3}/{4}'.format(
+                         self.url, prefix, region, version, tenant)}
+                    for region in self.settings['regions']]
+
+        return [
+            {'name': 'cloudDNS', 'type': 'rax:dns', 'endpoints': [
+                {'tenantId': TENANT_ID, 'publicURL': u'{0}/dns/v1.0/{1}'
+                 .format(self.url, TENANT_ID)}]},
+            {'name': 'cloudDatabases', 'type': 'rax:database',
+             'endpoints': regional('db', 'v1.0', TENANT_ID)},
+            {'name': 'cloudLoadBalancers', 'type': 'rax:load-balancer',
+             'endpoints': regional('lb', 'v1.0', TENANT_ID)},
+            {'name': 'cloudFiles', 'type': 'object-store',
+             'endpoints': regional('files', 'v1', FILES_TENANT)},
+            {'name': 'cloudFilesCDN', 'type': 'rax:object-cdn',
+             'endpoints': regional('cdn', 'v1', FILES_TENANT)},
+            #Only referred to by PTR records, not served
+            {'name': 'cloudServersOpenStack', 'type': 'compute',
+             'endpoints': regional('servers', 'v2', TENANT_ID)},
+        ]
+
+    ## Cloud DNS
+    def _dns_url(self, path):
+        return u'{0}/dns/v1.0/{1}/{2}'.format(self.url, TENANT_ID, path)
+
+    def _dns_links(self, path, query, offset):
+        if offset is None:
+            return []
+        params = [(key, value) for key, value in sorted(query.items())
+                  if key not in ('offset', 'limit')]
+        params.append(('limit', self.settings['page_sizes']['dns']))
+        params.append(('offset', offset))
+        qs = u'&'.join(u'{0}={1}'.format(key, value) for key, value in params)
+        return [{'rel': 'next', 'href': self._dns_url(u'{0}?{1}'.format(
+            path, qs))}]
+
+    def _dns_domain_create(self, name, email_address, ttl):
+        domain_id = next(self.ids)
+        now = _timestamp()
+        domain = {
+            'id': domain_id, 'name': name, 'emailAddress': email_address,
+            'ttl': ttl, 'created': now, 'updated': now,
+            'accountId': TENANT_ID,
+            'records': collections.OrderedDict(),
+            #Changes made through the API, seeding isn't recorded
+            'changes': [],
+        }
+        self.domains[domain_id] = domain
+        return domain
+
+    def _dns_record_create(self, domain, spec):
+        record = dict((key, spec[key]) for key in
+                      ('name', 'type', 'data', 'ttl', 'priority', 'comment')
+                      if spec.get(key) is not None)
+        record.setdefault('ttl', domain['ttl'])
+        record['id'] = u'{0}-{1}'.format(record['type'], next(self.ids))
+        record['created'] = record['updated'] = _timestamp()
+        domain['records'][record['id']] = record
+        domain['updated'] = record['updated']
+        return record
+
+    def _dns_domain_view(self, domain):
+        return dict((key, value) for key, value in domain.items()
+                    if key not in ('records', 'changes'))
+
+    def _dns_change(self, domain, action, target, before=None, after=None):
+        """
+        Records a change of a domain or record in the changes feed of the
+        domain, with the fields that differ between before and after
+        """
+        before = before or {}
+        after = after or {}
+        details = [{'field': key, 'originalValue': before.get(key),
+                    'newValue': after.get(key)}
+                   for key in sorted(set(before) | set(after))
+                   if key not in ('id', 'created', 'updated') and
+                   before.get(key) != after.get(key)]
+        domain['changes'].append((_timestamp(), {
+            'action': action, 'domain': domain['name'],
+            'accountId': TENANT_ID,
+            'targetType': 'Domain' if target is domain else 'Record',
+            'targetId': six.text_type((after or before)['id']),
+            'changeDetails': details,
+        }))
+
+    def _dns_job(self, status, response=None):
+        job_id = six.text_type(uuid.uuid4())
+        job = {'jobId': job_id, 'status': status,
+               'callbackUrl': self._dns_url(u'status/{0}'.format(job_id)),
+               'requestUrl': self._dns_url('domains')}
+        if response is not None:
+            job['response'] = response
+        self.jobs[job_id] = job
+        return 202, job, {}
+
+    def _dns_get_domain(self, domain_id):
+        try:
+            return self.domains[int(domain_id)]
+        except (KeyError, ValueError):
+            raise FakeError(404, u'Object not Found.', 'itemNotFound')
+
+    def _dns(self, method, region, parts, query, body):
+        with self.lock:
+            if parts[:1] == ['status'] and len(parts) == 2:
+                job = self.jobs.get(parts[1])
+                if job is None:
+                    raise FakeError(404, u'Job not found', 'itemNotFound')
+                return 200, job, {}
+            if parts[:1] == ['rdns']:
+                return self._rdns(method, parts[1:], query, body)
+            if parts[:1] != ['domains']:
+                raise FakeError(404, u'Not found', 'itemNotFound')
+
+            if len(parts) == 1:
+                return self._dns_domains(method, query, body)
+            domain = self._dns_get_domain(parts[1])
+            if len(parts) == 2:
+                if method == 'GET':
+                    #Only the details of a domain list its nameservers
+                    view = self._dns_domain_view(domain)
+                    view['nameservers'] = [{'name': 'dns1.stabletransit.com'},
+                                           {'name': 'dns2.stabletransit.com'}]
+                    return 200, view, {}
+                if method == 'PUT':
+                    before = self._dns_domain_view(domain)
+                    for key in ('emailAddress', 'ttl', 'comment'):
+                        if key in (body or {}):
+                            domain[key] = body[key]
+                    domain['updated'] = _timestamp()
+                    self._dns_change(domain, 'update', domain, before,
+                                     self._dns_domain_view(domain))
+                    return self._dns_job('COMPLETED')
+                if method == 'DELETE':
+                    del self.domains[domain['id']]
+                    return self._dns_job('COMPLETED')
+            elif parts[2] == 'records':
+                return self._dns_records(method, domain, parts[3:], query,
+                                         body)
+            elif parts[2] == 'changes' and method == 'GET':
+                since = query.get('since') or domain['created']
+                now = _timestamp()
+                changes = [change for time, change in domain['changes']
+                           if time >= since]
+                return 200, {'changes': changes, 'from': since, 'to': now,
+                             'totalEntries': len(changes)}, {}
+            raise FakeError(405, u'Method not allowed')
+
+    def _dns_domains(self, method, query, body):
+        if method == 'GET':
+            domains = list(self.domains.values())
+            name = query.get('name')
+            if name:
+                name = name.lower()
+                domains = [domain for domain in domains
+                           if domain['name'] == name or
+                           domain['name'].endswith(u'.' + name)]
+            page, offset = self._page('dns', domains, query)
+            return 200, {
+                'domains': [self._dns_domain_view(domain) for domain in page],
+                'totalEntries': len(domains),
+                'links': self._dns_links('domains', query, offset),
+            }, {}
+        if method == 'POST':
+            created = []
+            for spec in (body or {}).get('domains', []):
+                domain = self._dns_domain_create(
+                    spec['name'], spec.get('emailAddress'),
+                    spec.get('ttl', 3600))
+                for record in spec.get('recordsList', {}).get('records', []):
+                    self._dns_record_create(domain, record)
+                created.append(self._dns_domain_view(domain))
+            return self._dns_job('COMPLETED', {'domains': created})
+        raise FakeError(405, u'Method not allowed')
+
+    def _dns_records(self, method, domain, parts, query, body):
+        if not parts:
+            if method == 'GET':
+                records = list(domain['records'].values())
+                for key in ('type', 'name', 'data'):
+                    if query.get(key):
+                        records = [record for record in records
+                                   if record[key] == query[key]]
+                page, offset = self._page('dns', records, query)
+                path = u'domains/{0}/records'.format(domain['id'])
+                return 200, {
+                    'records': page,
+                    'totalEntries': len(records),
+                    'links': self._dns_links(path, query, offset),
+                }, {}
+            if method == 'POST':
+                created = [self._dns_record_create(domain, spec)
+                           for spec in (body or {}).get('records', [])]
+                for record in created:
+                    self._dns_change(domain, 'create', record, after=record)
+                return self._dns_job('COMPLETED', {'records': created})
+            if method == 'PUT':
+                for spec in (body or {}).get('records', []):
+                    self._dns_record_update(domain, spec['id'], spec)
+                return self._dns_job('COMPLETED')
+            if method == 'DELETE':
+                for record_id in query.get('id', '').split(','):
+                    record = domain['records'].pop(record_id, None)
+                    if record is not None:
+                        self._dns_change(domain, 'delete', record, record)
+                domain['updated'] = _timestamp()
+                return self._dns_job('COMPLETED')
+        else:
+            record = domain['records'].get(parts[0])
+            if record is None:
+                raise FakeError(404, u'Object not Found.', 'itemNotFound')
+            if method == 'GET':
+                return 200, record, {}
+            if method == 'PUT':
+                self._dns_record_update(domain, parts[0], body or {})
+                return self._dns_job('COMPLETED')
+            if method == 'DELETE':
+                del domain['records'][parts[0]]
+                domain['updated'] = _timestamp()
+                self._dns_change(domain, 'delete', record, record)
+                return self._dns_job('COMPLETED')
+        raise FakeError(405, u'Method not allowed')
+
+    def _dns_record_update(self, domain, record_id, spec):
+        record = domain['records'].get(record_id)
+        if record is None:
+            raise FakeError(404, u'Object not Found.', 'itemNotFound')
+        before = dict(record)
+        for key in ('name', 'data', 'ttl', 'priority', 'comment'):
+            if spec.get(key) is not None:
+                record[key] = spec[key]
+        record['updated'] = domain['updated'] = _timestamp()
+        self._dns_change(domain, 'update', record, before, record)
+
+    ## Reverse DNS
+    def _servers_url(self, region):
+        return u'{0}/servers/{1}/v2/{2}'.format(self.url, region, TENANT_ID)
+
+    def _rdns_record_create(self, device, spec):
+        record = dict((key, spec[key]) for key in
+                      ('name', 'type', 'data', 'ttl', 'comment')
+                      if spec.get(key) is not None)
+        record.setdefault('ttl', 3600)
+        record['id'] = u'PTR-{0}'.format(next(self.ids))
+        record['created'] = record['updated'] = _timestamp()
+        self.ptrs[device][record['data']] = record
+        return record
+
+    def _rdns_job(self, response=None):
+        """
+        Records a completed job but answers that it is still running, so
+        clients have to poll its status once
+        """
+        status, job, headers = self._dns_job('COMPLETED', response)
+        return status, dict(job, status='RUNNING'), headers
+
+    def _rdns(self, method, parts, query, body):
+        if method in ('GET', 'DELETE'):
+            device = query.get('href')
+            if len(parts) != 1 or not device:
+                raise FakeError(400, u'href is required')
+            records = self.ptrs.get(device)
+            if not records:
+                raise FakeError(404, u'Not Found', 'itemNotFound')
+            if method == 'GET':
+                return 200, {'records': list(records.values())}, {}
+            if query.get('ip'):
+                if records.pop(query['ip'], None) is None:
+                    raise FakeError(404, u'Not Found', 'itemNotFound')
+            else:
+                records.clear()
+            return self._rdns_job()
+
+        device = (body or {}).get('link', {}).get('href')
+        specs = (body or {}).get('recordsList', {}).get('records', [])
+        if parts or not device:
+            raise FakeError(400, u'link is required')
+        if method == 'POST':
+            created = [self._rdns_record_create(device, spec)
+                       for spec in specs]
+            return self._rdns_job({'records': created})
+        if method == 'PUT':
+            records = self.ptrs.get(device) or {}
+            for spec in specs:
+                record = records.get(spec.get('data'))
+                if record is None:
+                    raise FakeError(404, u'Object not Found.',
+                                    'itemNotFound')
+                for key in ('name', 'ttl', 'comment'):
+                    if spec.get(key) is not None:
+                        record[key] = spec[key]
+                record['updated'] = _timestamp()
+            return self._rdns_job()
+        raise FakeError(405, u'Method not allowed')
+
+    ## Cloud Databases
+    def _db_url(self, region, path):
+        return u'{0}/db/{1}/v1.0/{2}/{3}'.format(self.url, region, TENANT_ID,
+                                                 path)
+
+    def _db(self, method, region, parts, query, body):
+        with self.lock:
+            if parts[:1] == ['flavors']:
+                flavors = [dict(flavor, links=[{
+                    'rel': 'self', 'href': self._db_url(
+                        region, u'flavors/{0}'.format(flavor['id']))}])
+                    for flavor in DB_FLAVORS]
+                if len(parts) == 1:
+                    return 200, {'flavors': flavors}, {}
+                for flavor in flavors:
+                    if six.text_type(flavor['id']) == parts[1]:
+                        return 200, {'flavor': flavor}, {}
+                raise FakeError(404, u'Flavor not found', 'itemNotFound')
+
+            if parts[:1] != ['instances']:
+                raise FakeError(404, u'Not found', 'itemNotFound')
+            instances = self.instances[region]
+            if len(parts) == 1 and method == 'GET':
+                #Cloud Databases pages by marker, the id of the last instance
+                items = list(instances.values())
+                start = 0
+                if query.get('marker'):
+                    ids = list(instances.keys())
+                    start = ids.index(query['marker']) + 1
+                page_size = self.settings['page_sizes']['db']
+                limit = min(int(query.get('limit', page_size)), page_size)
+                page = items[start:start + limit]
+                links = []
+                if start + limit < len(items):
+                    links.append({'rel': 'next', 'href': self._db_url(
+                        region, u'instances?limit={0}&marker={1}'.format(
+                            limit, page[-1]['id']))})
+                return 200, {'instances': page, 'links': links}, {}
+            if len(parts) >= 2:
+                instance = instances.get(parts[1])
+                if instance is None:
+                    raise FakeError(404, u'Instance not found',
+                                    'itemNotFound')
+                if len(parts) == 2 and method == 'GET':
+                    return 200, {'instance': instance}, {}
+                if len(parts) == 2 and method == 'DELETE':
+                    del instances[parts[1]]
+                    return 202, None, {}
+                if len(parts) == 3 and method == 'GET':
+                    return 200, {parts[2]: []}, {}
+            raise FakeError(405, u'Method not allowed')
+
+    ## Cloud Files
+    def _cf_container_create(self, name, cdn=None, objects=0):
+        if name not in self.containers:
+            bisect.insort(self.container_names, name)
+        listing = [{
+            'name': u'object-{0:06d}'.format(index),
+            'bytes': 1024,
+            'hash': uuid.uuid4().hex,
+            'content_type': 'application/octet-stream',
+            'last_modified': '2026-01-01T00:00:00.000000',
+        } for index in range(objects)]
+        self.containers[name] = {'objects': listing, 'cdn': cdn}
+
+    def _files_container(self, name):
+        container = self.containers.get(name)
+        if container is None:
+            raise FakeError(404, u'Not Found', 'itemNotFound')
+        return container
+
+    def _marker_page(self, names, query, page_size):
+        limit = min(int(query.get('limit', page_size)), page_size)
+        start = 0
+        if query.get('marker'):
+            start = bisect.bisect_right(names, query['marker'])
+        prefix = query.get('prefix')
+        output = []
+        for name in itertools.islice(names, start, None):
+            if prefix and not name.startswith(prefix):
+                if name > prefix:
+                    break
+                continue
+            output.append(name)
+            if len(output) == limit:
+                break
+        return output
+
+    def _files(self, method, region, parts, query, body):
+        page_size = self.settings['page_sizes']['files']
+        with self.lock:
+            if not parts:
+                if method == 'HEAD':
+                    return 204, None, {
+                        'X-Account-Container-Count': len(self.containers)}
+                names = self._marker_page(self.container_names, query,
+                                          page_size)
+                listing = []
+                for name in names:
+                    objects = self.containers[name]['objects']
+                    listing.append({'name': name, 'count': len(objects),
+                                    'bytes': sum(obj['bytes']
+                                                 for obj in objects)})
+                return 200, listing, {}
+
+            name = parts[0]
+            if len(parts) == 1:
+                if method == 'PUT':
+                    self._cf_container_create(name)
+                    return 201, None, {}
+                container = self._files_container(name)
+                objects = container['objects']
+                if method == 'HEAD':
+                    return 204, None, {
+                        'X-Container-Object-Count': len(objects),
+                        'X-Container-Bytes-Used': sum(obj['bytes']
+                                                      for obj in objects)}
+                if method == 'GET':
+                    by_name = dict((obj['name'], obj) for obj in objects)
+                    names = self._marker_page(sorted(by_name), query,
+                                              page_size)
+                    return 200, [by_name[obj] for obj in names], {}
+                if method == 'DELETE':
+                    if objects:
+                        raise FakeError(409, u'Container not empty',
+                                        'conflict')
+                    del self.containers[name]
+                    self.container_names.remove(name)
+                    return 204, None, {}
+                if method == 'POST':
+                    return 204, None, {}
+            raise FakeError(405, u'Method not allowed')
+
+    def _cdn(self, method, region, parts, query, body):
+        with self.lock:
+            if not parts:
+                return 200, [{'name': name, 'cdn_enabled': True,
+                              'ttl': container['cdn']['ttl']}
+                             for name, container in
+                             sorted(self.containers.items())
+                             if container['cdn']], {}
+            container = self._files_container(parts[0])
+            if method in ('PUT', 'POST'):
+                headers = dict((key.lower(), value)
+                               for key, value in query.items())
+                enabled = headers.get('x-cdn-enabled', 'True') == 'True'
+                container['cdn'] = {'ttl': int(headers.get('x-ttl', 259200)),
+                                    'log_retention': False} if enabled \
+                    else None
+                return 204, None, {}
+            cdn = container['cdn']
+            if cdn is None:
+                raise FakeError(404, u'Not Found', 'itemNotFound')
+            base = u'https://{0}.cdn.example.com'.format(uuid.uuid4().hex)
+            return 204, None, {
+                'X-Cdn-Enabled': 'True',
+                'X-Ttl': cdn['ttl'],
+                'X-Log-Retention': six.text_type(cdn['log_retention']),
+                'X-Cdn-Uri': base,
+                'X-Cdn-Ssl-Uri': base,
+                'X-Cdn-Streaming-Uri': base,
+                'X-Cdn-Ios-Uri': base,
+            }
+
+    ## Cloud Load Balancers
+    def _lb_node(self, spec):
+        return {
+            'id': next(self.ids),
+            'address': spec['address'],
+            'port': int(spec['port']),
+            'condition': spec.get('condition', 'ENABLED'),
+            'weight': spec.get('weight', 1),
+            'type': spec.get('type', 'PRIMARY'),
+            'status': 'ONLINE',
+        }
+
+    def _lb_view(self, lb, nodes=False):
+        view = dict((key, value) for key, value in lb.items()
+                    if key != 'nodes')
+        view['nodeCount'] = len(lb['nodes'])
+        if nodes:
+            view['nodes'] = lb['nodes']
+        return view
+
+    def _lb(self, method, region, parts, query, body):
+        with self.lock:
+            if parts[:1] != ['loadbalancers']:
+                raise FakeError(404, u'Not found', 'itemNotFound')
+            lbs = self.lbs[region]
+            if len(parts) == 1 and method == 'GET':
+                page, _ = self._page('lb', list(lbs.values()), query)
+                return 200, {'loadBalancers': [self._lb_view(lb)
+                                               for lb in page]}, {}
+            try:
+                lb = lbs[int(parts[1])]
+            except (KeyError, ValueError, IndexError):
+                raise FakeError(404, u'Load balancer not found',
+                                'itemNotFound')
+            rest = parts[2:]
+            if not rest and method == 'GET':
+                return 200, {'loadBalancer': self._lb_view(lb, True)}, {}
+            if not rest and method == 'DELETE':
+                del lbs[lb['id']]
+                return 202, None, {}
+            if rest[:1] == ['stats'] and method == 'GET':
+                return 200, {'connectTimeOut': 0, 'connectError': 0,
+                             'connectFailure': 0, 'dataTimedOut': 0,
+                             'keepAliveTimedOut': 0, 'maxConn': 0,
+                             'currentConn': 0}, {}
+            if rest[:1] != ['nodes']:
+                raise FakeError(405, u'Method not allowed')
+
+            lb['updated'] = {'time': _timestamp()}
+            if len(rest) == 1:
+                if method == 'GET':
+                    return 200, {'nodes': lb['nodes']}, {}
+                if method == 'POST':
+                    added = [self._lb_node(spec)
+                             for spec in (body or {}).get('nodes', [])]
+                    lb['nodes'].extend(added)
+                    return 202, {'nodes': added}, {}
+                if method == 'DELETE':
+                    ids = set(int(node_id) for node_id in
+                              query.get('id', '').split(',') if node_id)
+                    lb['nodes'] = [node for node in lb['nodes']
+                                   if node['id'] not in ids]
+                    return 202, None, {}
+            else:
+                for node in lb['nodes']:
+                    if six.text_type(node['id']) != rest[1]:
+                        continue
+                    if method == 'PUT':
+                        node.update((body or {}).get('node', {}))
+                        return 202, None, {}
+                    if method == 'DELETE':
+                        lb['nodes'].remove(node)
+                        return 202, None, {}
+                raise FakeError(404, u'Node not found', 'itemNotFound')
+            raise FakeError(405, u'Method not allowed')
+
+
+class _Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def _dispatch(self):
+        split = urlsplit(self.path)
+        query = {}
+        for key, value in parse_qsl(split.query, keep_blank_values=True):
+            #Repeated keys, ex. the node ids of a bulk delete, are joined
+            query[key] = u'{0},{1}'.format(query[key], value) \
+                if key in query else value
+        #CDN requests carry their settings as headers
+        for key, value in self.headers.items():
+            if key.lower().startswith('x-cdn') or key.lower() == 'x-ttl':
+                query[key] = value
+
+        length = int(self.headers.get('Content-Length') or 0)
+        body = None
+        if length:
+            raw = self.rfile.read(length)
+            try:
+                body = json.loads(raw.decode('utf-8'))
+            except ValueError:
+                body = None
+
+        status, output, headers = self.server.fake.handle(
+            self.command, split.path, query, body)
+
+        payload = b''
+        if output is not None:
+            payload = json.dumps(output).encode('utf-8')
+        self.send_response(status)
+        if output is not None:
+            self.send_header('Content-Type', 'application/json')
+        for key, value in headers.items():
+            self.send_header(key, six.text_type(value))
+        self.send_header('Content-Length', six.text_type(len(payload)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(payload)
+
+    do_GET = do_POST = do_PUT = do_DELETE = do_HEAD = do_PATCH = _dispatch
+
+
+class FakeRackspaceServer(socketserver.ThreadingMixIn,
+                          BaseHTTPServer.HTTPServer):
+    """
+    A threaded HTTP server for FakeRackspace, listening on 127.0.0.1
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 128
+
+    def __init__(self, port=0, **settings):
+        BaseHTTPServer.HTTPServer.__init__(self, ('127.0.0.1', port),
+                                           _Handler)
+        self.url = u'http://127.0.0.1:{0}'.format(self.server_address[1])
+        self.fake = FakeRackspace(self.url, **settings)
+
+    def start(self):
+        """
+        Serves from a daemon thread
+        :return: The base URL of the server
+        """
+        thread = threading.Thread(target=self.serve_forever)
+        thread.daemon = True
+        thread.start()
+        return self.url
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split(
+        '\n')[0])
+    parser.add_argument('--port', type=int, default=8900)
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='Seconds added to every request')
+    args = parser.parse_args()
+
+    server = FakeRackspaceServer(args.port, latency=args.latency)
+    print(u'Serving on {0}, identity at {0}/identity/v2.0/'.format(
+        server.url))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
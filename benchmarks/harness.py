@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""
+Loads the rackspace execution, state and runner modules and the DNS beacon
+outside of a minion and points them, through pyrax, at a FakeRackspaceServer
+running in a child process.
+
+Each scenario gets freshly loaded modules, an empty __context__ and a
+freshly seeded server, so module level caches never leak between scenarios.
+"""
+
+# Import Python libs
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+
+import requests
+import salt.state
+import salt.utils.args
+
+import fake_rackspace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULE_PATH = os.path.join(ROOT, 'salt', '_modules', 'rackspace.py')
+STATE_PATH = os.path.join(ROOT, 'salt', '_states', 'rackspace.py')
+RUNNER_PATH = os.path.join(ROOT, 'salt', '_runners', 'rackspace.py')
+BEACON_PATH = os.path.join(ROOT, 'salt', '_beacons', 'rackspace_dns.py')
+
+#Scenarios and the server are forked, the harness isn't picklable
+FORK = multiprocessing.get_context('fork')
+
+PILLAR = {'rackspace': {'username': 'benchmark', 'apikey': 'benchmark'}}
+
+
+def _serve(port, settings, pipe):
+    server = fake_rackspace.FakeRackspaceServer(port, **settings)
+    pipe.send(server.url)
+    pipe.close()
+    server.serve_forever()
+
+
+def _load_source(name, path):
+    try:
+        import importlib.util
+    except ImportError:
+        import imp
+        return imp.load_source(name, path)
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def _gen_tag(low):
+    return u'{0[state]}_|-{0[__id__]}_|-{0[name]}_|-{0[fun]}'.format(low)
+
+
+class Salt(dict):
+    """
+    A __salt__ that resolves rackspace.* from the loaded execution module,
+    serves config.get from the benchmark pillar and records fired events
+    """
+
+    def __init__(self, env):
+        super(Salt, self).__init__()
+        self.env = env
+        self.events = []
+        self['config.get'] = self._config_get
+        self['event.send'] = self._event
+        self['event.fire'] = self._event
+
+    def __missing__(self, key):
+        module, _, name = key.partition('.')
+        if module != 'rackspace':
+            raise KeyError(key)
+        return getattr(self.env.module, name)
+
+    def _config_get(self, key, default=''):
+        return PILLAR.get(key, self.env.opts.get(key, default))
+
+    def _event(self, data, tag, *args, **kwargs):
+        self.events.append((tag, data))
+        return True
+
+
+class Environment(object):
+    """
+    A freshly loaded execution module, state module and DNS beacon sharing
+    one __context__, __opts__ and __salt__, and the runner calling the
+    execution module through salt.cmd the way it does on the master
+    """
+    _loads = 0
+
+    def __init__(self, cachedir, test=False):
+        Environment._loads += 1
+        suffix = Environment._loads
+        self.context = {}
+        self.opts = {'test': test, 'cachedir': cachedir, 'id': 'benchmark'}
+        self.salt = Salt(self)
+
+        self.module = _load_source(
+            'benchmark_rackspace_module_{0}'.format(suffix), MODULE_PATH)
+        self.states = _load_source(
+            'benchmark_rackspace_state_{0}'.format(suffix), STATE_PATH)
+        for module in (self.module, self.states):
+            module.__salt__ = self.salt
+            module.__opts__ = self.opts
+            module.__context__ = self.context
+            module.__pillar__ = PILLAR
+            module.__grains__ = {}
+        self.states.__utils__ = {'state.gen_tag': _gen_tag}
+
+        self.runner = _load_source(
+            'benchmark_rackspace_runner_{0}'.format(suffix), RUNNER_PATH)
+        self.runner.__opts__ = self.opts
+        self.runner.__salt__ = {'salt.cmd': self._salt_cmd}
+
+        self.beacon = _load_source(
+            'benchmark_rackspace_beacon_{0}'.format(suffix), BEACON_PATH)
+        self.beacon.__salt__ = self.salt
+        self.beacon.__opts__ = self.opts
+        self.beacon.__context__ = self.context
+
+    def _salt_cmd(self, fun, *args, **kwargs):
+        return self.salt[fun](*args, **kwargs)
+
+    def state(self, fun, *args, **kwargs):
+        """
+        Calls a state function and returns its return dict
+        """
+        return getattr(self.states, fun)(*args, **kwargs)
+
+    def run(self, chunks, aggregate=False):
+        """
+        Runs low chunks in order the way the state system does, passing them
+        as __lowstate__ and each as __low__, and calling mod_aggregate first
+        when aggregate is set
+        :return: A list of the return dicts, in order
+        """
+        self.states.__lowstate__ = chunks
+        running = {}
+        results = []
+        for low in chunks:
+            if aggregate and '__agg__' not in low:
+                low = self.states.mod_aggregate(low, chunks, running)
+                low['__agg__'] = True
+            #Mapped to the state's arguments the way the state system does,
+            # raising SaltInvocationError for arguments it doesn't take
+            call = salt.utils.args.format_call(
+                getattr(self.states, low['fun']), low,
+                initial_ret={'full': u'rackspace.' + low['fun']},
+                expected_extra_kws=salt.state.STATE_INTERNAL_KEYWORDS)
+            self.states.__low__ = low
+            ret = self.state(low['fun'], *call['args'], **call['kwargs'])
+            running[_gen_tag(low)] = ret
+            results.append(ret)
+        return results
+
+
+class Harness(object):
+    """
+    Owns the fake server process and hands out fresh environments
+    """
+
+    def __init__(self, settings=None, port=0):
+        self.settings = settings or {}
+        parent, child = FORK.Pipe()
+        self.process = FORK.Process(
+            target=_serve, args=(port, self.settings, child))
+        self.process.daemon = True
+        self.process.start()
+        self.url = parent.recv()
+        self.cachedir = tempfile.mkdtemp(prefix='rackspace-benchmark-')
+
+        import pyrax
+        pyrax.set_setting('identity_type', 'rackspace')
+        pyrax.set_setting('auth_endpoint',
+                          u'{0}/identity/v2.0/'.format(self.url))
+        pyrax.set_setting('verify_ssl', False)
+
+    def control(self, action, body=None):
+        """
+        Calls a /_fake control endpoint
+        :return: The request counters of the server
+        """
+        url = u'{0}/_fake/{1}'.format(self.url, action)
+        #No shared session, scenarios call this from forked children
+        if action == 'stats':
+            resp = requests.get(url)
+        else:
+            resp = requests.post(url, json=body or {})
+        resp.raise_for_status()
+        return resp.json()
+
+    def prepare(self, fixtures, test=False):
+        """
+        Resets and seeds the server, then loads a fresh environment
+        :return: An Environment
+        """
+        self.control('reset')
+        self.control('seed', fixtures)
+        return Environment(self.cachedir, test=test)
+
+    def close(self):
+        self.process.terminate()
+        self.process.join()
+        shutil.rmtree(self.cachedir, ignore_errors=True)
@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+"""
+Runs the benchmark scenarios against the fake Rackspace API and compares
+API calls, wall time and peak memory with benchmarks/baseline.json.
+
+    python benchmarks/run.py                    # run and compare
+    python benchmarks/run.py -k dns             # only scenarios matching dns
+    python benchmarks/run.py --update-baseline  # record a new baseline
+
+API call counts are deterministic; more calls than in the baseline is a
+regression, fewer is not. Wall time and peak memory are allowed to grow by
+--tolerance before they are flagged. The process exits non zero on a
+regression or a failed scenario.
+"""
+
+# Import Python libs
+from __future__ import print_function
+
+import argparse
+import json
+import logging
+import os
+import resource
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+
+import harness
+import scenarios
+
+BASELINE_PATH = os.path.join(HERE, 'baseline.json')
+DEFAULT_TOLERANCE = 0.25
+#Absolute slack so millisecond scenarios don't flap on noise
+TIME_SLACK = 0.05
+MEMORY_SLACK = 256 * 1024
+
+
+def _max_rss():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    #Linux reports KiB, macOS bytes
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+
+def _run_child(bench, scenario, pipe):
+    env = bench.prepare(scenario.fixtures)
+    bench.control('reset_calls')
+
+    rss = _max_rss()
+    start = time.time()
+    try:
+        result = scenario.run(env)
+        error = None
+    except Exception as e:
+        result = None
+        error = u'{0}: {1}'.format(type(e).__name__, e)
+    wall = time.time() - start
+    peak = _max_rss() - rss
+
+    server = bench.control('stats')
+    pipe.send({
+        'api_calls': server['total'],
+        'calls': server['calls'],
+        'over_limit': server['over_limit'],
+        'wall_time': round(wall, 3),
+        'peak_memory': peak,
+        'result': result,
+        'error': error,
+    })
+    pipe.close()
+
+
+def run_scenario(bench, scenario):
+    """
+    Runs a scenario in a forked child, so module and pyrax globals start
+    clean and the child's peak RSS growth is the scenario's peak memory
+
+    :return: A dict of the api calls, wall time, peak memory and result of
+    the scenario
+    """
+    parent, child = harness.FORK.Pipe(duplex=False)
+    process = harness.FORK.Process(target=_run_child,
+                                      args=(bench, scenario, child))
+    process.start()
+    child.close()
+    try:
+        return parent.recv()
+    except EOFError:
+        return {'api_calls': 0, 'calls': {}, 'over_limit': 0,
+                'wall_time': 0, 'peak_memory': 0, 'result': None,
+                'error': u'Scenario process exited with {0}'.format(
+                    process.exitcode)}
+    finally:
+        process.join()
+
+
+def compare(name, current, baseline, tolerance):
+    """
+    :return: A list of regression messages, empty if there are none
+    """
+    if current['error']:
+        return [u'failed: {0}'.format(current['error'])]
+    if baseline is None:
+        return []
+
+    output = []
+    if current['api_calls'] > baseline['api_calls']:
+        output.append(u'api calls {0} > {1}'.format(current['api_calls'],
+                                                     baseline['api_calls']))
+    limit = baseline['wall_time'] * (1 + tolerance) + TIME_SLACK
+    if current['wall_time'] > limit:
+        output.append(u'wall time {0:.3f}s > {1:.3f}s'.format(
+            current['wall_time'], limit))
+    limit = baseline['peak_memory'] * (1 + tolerance) + MEMORY_SLACK
+    if current['peak_memory'] > limit:
+        output.append(u'peak memory {0} > {1:.0f}'.format(
+            current['peak_memory'], limit))
+    return output
+
+
+def _settings(args):
+    return {
+        'latency': args.latency,
+        'page_sizes': {'dns': args.dns_page_size, 'db': args.db_page_size,
+                       'files': args.files_page_size},
+        'rate_limits': json.loads(args.rate_limits) if args.rate_limits
+        else {},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=u'Benchmarks the rackspace modules against a fake API')
+    parser.add_argument('-k', dest='match', default='',
+                        help=u'Only run scenarios whose name contains this')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--update-baseline', action='store_true',
+                        help=u'Write the results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help=u'Allowed relative growth of time and memory')
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help=u'Seconds the server adds to every request')
+    parser.add_argument('--dns-page-size', type=int, default=100)
+    parser.add_argument('--db-page-size', type=int, default=20)
+    parser.add_argument('--files-page-size', type=int, default=10000)
+    parser.add_argument('--rate-limits', default='',
+                        help=u'JSON of service -> verb -> [value, unit], ex. '
+                             u'{"dns": {"GET": [600, "MINUTE"]}}')
+    parser.add_argument('--json', action='store_true',
+                        help=u'Print the results as JSON')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.CRITICAL)
+    settings = _settings(args)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as handle:
+            baseline = json.load(handle)
+    compared = baseline.get('settings') == settings and \
+        not args.update_baseline
+    if baseline and not compared and not args.update_baseline:
+        print(u'Server settings differ from the baseline, not comparing',
+              file=sys.stderr)
+
+    selected = [scenario for scenario in scenarios.SCENARIOS
+                if args.match in scenario.name]
+    bench = harness.Harness(settings)
+    results = {}
+    failures = {}
+    try:
+        for scenario in selected:
+            current = run_scenario(bench, scenario)
+            results[scenario.name] = current
+            previous = baseline.get('scenarios', {}).get(scenario.name) \
+                if compared else None
+            problems = compare(scenario.name, current, previous,
+                               args.tolerance)
+            if problems:
+                failures[scenario.name] = problems
+            if not args.json:
+                print(u'{0:<26} {1:>7} calls {2:>8.3f}s {3:>9.1f} KiB  '
+                      u'{4}'.format(scenario.name, current['api_calls'],
+                                    current['wall_time'],
+                                    current['peak_memory'] / 1024.0,
+                                    u'; '.join(problems) or u'ok'))
+    finally:
+        bench.close()
+
+    if args.json:
+        print(json.dumps({'settings': settings, 'scenarios': results,
+                          'regressions': failures}, indent=2,
+                         sort_keys=True))
+
+    if args.update_baseline:
+        errors = dict((name, result['error'])
+                      for name, result in results.items() if result['error'])
+        if errors:
+            print(u'Not updating the baseline, scenarios failed: {0}'.format(
+                errors), file=sys.stderr)
+            return 1
+        recorded = baseline.get('scenarios', {}) \
+            if baseline.get('settings') == settings else {}
+        recorded.update(results)
+        with open(args.baseline, 'w') as handle:
+            json.dump({'settings': settings, 'scenarios': recorded}, handle,
+                      indent=2, sort_keys=True)
+            handle.write('\n')
+        print(u'Baseline written to {0}'.format(args.baseline))
+        return 0
+
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,723 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark scenarios. Each one seeds the fake account, drives real module or
+state functions and checks the result, so a scenario that gets faster by
+returning less fails instead of passing.
+"""
+
+# Import Python libs
+import collections
+import json
+import subprocess
+import sys
+import time
+
+import salt.exceptions
+import six
+
+import fake_rackspace
+import harness
+
+Scenario = collections.namedtuple('Scenario',
+                                  ['name', 'description', 'fixtures', 'run'])
+
+ZONE = 'example.com'
+ZONE_RECORDS = 5000
+CONTAINERS = 20000
+DB_INSTANCES = 10
+LB_NODES = 40
+DEGRADED_STATES = 10
+TAIL_LOOKUPS = 60
+LOOKUP_TIMEOUT = 0.3
+INVENTORY_ZONES = ['example.com', 'example.org']
+INVENTORY_REGIONS = ['DFW', 'ORD', 'IAD']
+REVERSE_ZONES = 20
+REVERSE_LOOKUPS = 10
+PTR_SERVERS = 200
+DRIFT_RECORDS = 5
+
+
+#Loads both modules and calls __virtual__ in a fresh interpreter, as a minion
+# start or a sync does. Salt itself is imported first, a minion has it loaded
+LOAD_SCRIPT = u"""
+import importlib.util, json, sys, time
+import salt.utils, six
+try:
+    import salt.utils.decorators
+except ImportError:
+    pass
+start = time.time()
+functions = {}
+for index, path in enumerate(sys.argv[1:]):
+    spec = importlib.util.spec_from_file_location(
+        'rackspace_{0}'.format(index), path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    #The states find the execution module's functions in __salt__
+    module.__salt__ = dict(functions)
+    module.__virtual__()
+    functions.update(('rackspace.' + name, func)
+                     for name, func in vars(module).items()
+                     if callable(func) and not name.startswith('_'))
+print(json.dumps({'load_time': round(time.time() - start, 3),
+                  'pyrax_imported': 'pyrax' in sys.modules}))
+"""
+
+
+def _check(condition, message):
+    if not condition:
+        raise AssertionError(message)
+
+
+def dns_record_list(env):
+    records = env.module.dns_record_list(ZONE)
+    _check(len(records) == ZONE_RECORDS,
+           u'Expected {0} records, got {1}'.format(ZONE_RECORDS, len(records)))
+    return {'records': len(records)}
+
+
+def _chunks(fun, items):
+    chunks = []
+    for kwargs in items:
+        chunk = {'state': 'rackspace', 'fun': fun, '__id__': kwargs['name']}
+        chunk.update(kwargs)
+        chunks.append(chunk)
+    return chunks
+
+
+def _dns_record_chunks():
+    """
+    20 dns_record_exists states against the large zone: 10 in sync, 5 with
+    changed data and 5 new records
+    """
+    items = []
+    for index in range(10):
+        items.append({'name': u'host-{0}.{1}'.format(index, ZONE),
+                      'data': u'10.0.0.{0}'.format(index)})
+    for index in range(10, 15):
+        items.append({'name': u'host-{0}.{1}'.format(index, ZONE),
+                      'data': u'192.0.2.{0}'.format(index)})
+    for index in range(5):
+        items.append({'name': u'new-{0}.{1}'.format(index, ZONE),
+                      'data': u'192.0.2.{0}'.format(100 + index)})
+    for item in items:
+        item.update({'zone_name': ZONE, 'record_type': 'A'})
+    return _chunks('dns_record_exists', items)
+
+
+def dns_records_state(env, aggregate=False):
+    results = env.run(_dns_record_chunks(), aggregate=aggregate)
+    changed = [ret for ret in results if ret['changes']]
+    _check(all(ret['result'] for ret in results), u'A state failed')
+    _check(len(changed) == 10,
+           u'Expected 10 changed records, got {0}'.format(len(changed)))
+    return {'states': len(results), 'changed': len(changed)}
+
+
+def cf_container_list(env):
+    containers = env.module.cf_container_list()
+    _check(len(containers) == CONTAINERS,
+           u'Expected {0} containers, got {1}'.format(CONTAINERS,
+                                                      len(containers)))
+    cdn = sum(1 for container in containers if container['cdn_enabled'])
+    return {'containers': len(containers), 'cdn_enabled': cdn}
+
+
+def cf_containers_state(env, aggregate=False):
+    """
+    20 cf_container_exists states: 15 existing containers, 5 new ones
+    """
+    names = [u'container-{0:06d}'.format(index * 7) for index in range(15)]
+    names += [u'new-container-{0}'.format(index) for index in range(5)]
+    results = env.run(_chunks('cf_container_exists',
+                              [{'name': name} for name in names]),
+                      aggregate=aggregate)
+    _check(all(ret['result'] for ret in results), u'A state failed')
+    changed = [ret for ret in results if ret['changes']]
+    _check(len(changed) == 5,
+           u'Expected 5 new containers, got {0}'.format(len(changed)))
+    return {'states': len(results), 'changed': len(changed)}
+
+
+def dns_records_aggregated(env):
+    return dns_records_state(env, aggregate=True)
+
+
+def cf_containers_aggregated(env):
+    return cf_containers_state(env, aggregate=True)
+
+
+def db_instances(env):
+    """
+    Lists the instances, then runs a db_instance_exists state for each
+    """
+    instances = env.module.db_instance_list()
+    _check(len(instances) == DB_INSTANCES,
+           u'Expected {0} instances, got {1}'.format(DB_INSTANCES,
+                                                     len(instances)))
+    results = [env.state('db_instance_exists', instance['name'],
+                         '512MB Instance', 5) for instance in instances]
+    _check(all(ret['result'] and not ret['changes'] for ret in results),
+           u'An existing instance was changed')
+    return {'instances': len(instances)}
+
+
+def lb_nodes_sync(env):
+    """
+    Keeps 30 of 40 nodes and adds 10 new ones through lb_nodes_managed
+    """
+    nodes = [u'10.1.0.{0}:80'.format(index) for index in range(10, 40)]
+    nodes += [u'10.2.0.{0}:80'.format(index) for index in range(10)]
+    ret = env.state('lb_nodes_managed', 'lb-0', nodes)
+    _check(ret['result'], ret['comment'])
+    _check(len(ret['changes'].get('added', [])) == 10, u'Expected 10 adds')
+    _check(len(ret['changes'].get('removed', [])) == 10,
+           u'Expected 10 removals')
+    current = env.module.lb_nodes_list('lb-0')
+    _check(len(current) == 40,
+           u'Expected 40 nodes, got {0}'.format(len(current)))
+    return {'nodes': len(current)}
+
+
+def lb_list_regions(env):
+    lbs = env.module.lb_list(regions='ALL')
+    total = sum(len(region) for region in lbs.values())
+    _check(total == 150, u'Expected 150 load balancers, got {0}'.format(
+        total))
+    return {'regions': len(lbs), 'load_balancers': total}
+
+
+def db_instances_accounts(env):
+    """
+    Lists the instances of the default account and two more profiles
+    concurrently, each profile authenticating with its own credentials
+    """
+    harness.PILLAR['rackspace']['accounts'] = dict(
+        (name, {'username': name, 'apikey': name})
+        for name in ('staging', 'dr'))
+    instances = env.module.db_instance_list(accounts='ALL')
+    accounts = sorted(set(instance['account'] for instance in instances))
+    _check(accounts == ['default', 'dr', 'staging'],
+           u'Expected instances of 3 accounts, got {0}'.format(accounts))
+    _check(len(instances) == DB_INSTANCES * 3,
+           u'Expected {0} instances, got {1}'.format(DB_INSTANCES * 3,
+                                                     len(instances)))
+    return {'accounts': len(accounts), 'instances': len(instances)}
+
+
+def degraded_region(env):
+    """
+    Runs lb_exists states alternating between ORD, where every request
+    fails after a delay, and DFW. The ORD states fail fast once its breaker
+    opens while the DFW ones carry on.
+    """
+    failed = []
+    for index in range(DEGRADED_STATES):
+        for region in ('ORD', 'DFW'):
+            try:
+                ret = env.state('lb_exists', u'lb-{0}'.format(index % 5),
+                                80, 'HTTP', region=region)
+                _check(ret['result'], ret['comment'])
+            except Exception as e:
+                _check(region == 'ORD', u'{0} failed: {1}'.format(region, e))
+                failed.append(six.text_type(e))
+    breakers = env.module.circuit_breaker_stats()
+    _check(breakers['load_balancer ORD']['state'] == 'open',
+           u'Expected the ORD breaker to be open')
+    _check(breakers['load_balancer DFW']['state'] == 'closed',
+           u'Expected the DFW breaker to be closed')
+    fast = sum(1 for error in failed if u'Not sending' in error)
+    return {'failed': len(failed), 'failed_fast': fast}
+
+
+def tail_lookups(env, hedge=False):
+    """
+    Looks up containers one by one while every 20th request to Cloud Files
+    takes half a second, hedging them past their p90 when hedge is set
+    """
+    if hedge:
+        harness.PILLAR['rackspace']['hedge_percentile'] = 90
+    for index in range(TAIL_LOOKUPS):
+        name = u'container-{0:06d}'.format(index)
+        container = env.module.cf_container_get(name)
+        _check(container['name'] == name,
+               u'Expected {0}, got {1}'.format(name, container['name']))
+    stats = env.module.hedge_stats()
+    _check(bool(stats['hedged']) == hedge,
+           u'Expected {0}hedged lookups'.format(u'' if hedge else u'no '))
+    return {'lookups': TAIL_LOOKUPS, 'hedged': stats['hedged'],
+            'hedge_won': stats['hedge_won']}
+
+
+def tail_lookups_hedged(env):
+    return tail_lookups(env, hedge=True)
+
+
+def state_lookup_timeout(env):
+    """
+    States run through salt's argument mapping while every Cloud Files
+    request takes 2s. A timeout argument is rejected, as salt rejects it, and
+    a cf_container_exists state with a lookup_timeout gives up at it.
+    """
+    try:
+        env.run([{'state': 'rackspace', 'fun': 'dns_zone_exists',
+                  '__id__': ZONE, 'name': ZONE, 'timeout': LOOKUP_TIMEOUT}])
+    except salt.exceptions.SaltInvocationError:
+        rejected = True
+    else:
+        rejected = False
+    _check(rejected, u'Expected timeout to be an invalid argument')
+
+    start = time.time()
+    try:
+        env.run([{'state': 'rackspace', 'fun': 'cf_container_exists',
+                  '__id__': u'container-000000', 'name': u'container-000000',
+                  'lookup_timeout': LOOKUP_TIMEOUT}])
+        error = None
+    except Exception as e:
+        error = six.text_type(e)
+    elapsed = time.time() - start
+    _check(error is not None, u'Expected the lookup to time out')
+    _check(elapsed < 1, u'The lookup gave up after {0:.3f}s'.format(elapsed))
+    return {'error': error, 'deadline_exceeded':
+            env.module.hedge_stats()['deadline_exceeded']}
+
+
+def _run_forked(env, low, pipe):
+    pipe.send(env.run([low])[0])
+    pipe.close()
+
+
+def parallel_states(env):
+    """
+    10 dns_record_exists states with parallel: True, each run by a process
+    forked from one that already authenticated, as the state system does
+    """
+    _check(env.module.dns_zone_exists(ZONE), u'The zone is missing')
+    processes = []
+    for low in _dns_record_chunks()[:10]:
+        parent, child = harness.FORK.Pipe(duplex=False)
+        process = harness.FORK.Process(target=_run_forked,
+                                       args=(env, low, child))
+        process.start()
+        child.close()
+        processes.append((process, parent))
+    results = []
+    for process, parent in processes:
+        results.append(parent.recv())
+        process.join()
+    _check(all(ret['result'] for ret in results), u'A state failed')
+    changed = [ret for ret in results if ret['changes']]
+    _check(not changed, u'An existing record was changed')
+    return {'states': len(results)}
+
+
+def render_lookups(env, prefetch=False):
+    """
+    The Jinja lookups of an SLS tree: the CDN URI of 10 containers and the
+    hostname of 10 database instances
+    """
+    containers = [u'container-{0:06d}'.format(index * 100)
+                  for index in range(10)]
+    instances = [u'db-{0}'.format(index) for index in range(DB_INSTANCES)]
+    if prefetch:
+        fetched = env.module.prefetch(
+            [['cf_container', name] for name in containers] +
+            [['db_instance', name] for name in instances])
+        _check(not fetched['failed'], fetched['failed'])
+    uris = [env.module.cf_container_get(name)['cdn_uri']
+            for name in containers]
+    hosts = [env.module.db_instance_get_by_name(name)['hostname']
+             for name in instances]
+    _check(all(uris), u'A container has no CDN URI')
+    _check(all(hosts), u'An instance has no hostname')
+    return {'lookups': len(uris) + len(hosts)}
+
+
+def render_lookups_prefetched(env):
+    return render_lookups(env, prefetch=True)
+
+
+def dry_run(env):
+    """
+    A test=True run of 20 record, 20 container and 10 instance states,
+    passed to the states as the run's __lowstate__
+    """
+    records = []
+    for index in range(15):
+        records.append({'name': u'host-{0}.{1}'.format(index, ZONE),
+                        'data': u'10.0.0.{0}'.format(index)})
+    for index in range(5):
+        records.append({'name': u'new-{0}.{1}'.format(index, ZONE),
+                        'data': u'192.0.2.{0}'.format(index)})
+    for record in records:
+        record.update({'zone_name': ZONE, 'record_type': 'A'})
+    chunks = _chunks('dns_record_exists', records)
+    chunks += _chunks('cf_container_exists',
+                      [{'name': u'container-{0:06d}'.format(index * 7)}
+                       for index in range(20)])
+    chunks += _chunks('db_instance_exists',
+                      [{'name': u'db-{0}'.format(index * 2),
+                        'flavor': '512MB Instance', 'size': 5}
+                       for index in range(DB_INSTANCES)])
+    env.opts['test'] = True
+
+    results = env.run(chunks)
+    changed = [ret for ret in results if ret['changes']]
+    _check(all(ret['result'] is not False for ret in results),
+           u'A state failed')
+    _check(all(ret['result'] is None for ret in changed),
+           u'A dry run reported a change as applied')
+    #5 new records and the 5 odd numbered instances that don't exist
+    _check(len(changed) == 10,
+           u'Expected 10 planned changes, got {0}'.format(len(changed)))
+    return {'states': len(results), 'changed': len(changed)}
+
+
+def nightly_inventory(env):
+    """
+    The CMDB export the inventory snapshot replaces: every list function
+    called one after another
+    """
+    zones = env.module.dns_zone_list(show_records=True)
+    instances = env.module.db_instance_list(regions='ALL')
+    containers = env.module.cf_container_list(regions='ALL')
+    lbs = env.module.lb_list(regions='ALL')
+    records = sum(len(zone['records']) for zone in zones)
+    _check(records == 2000 * len(INVENTORY_ZONES),
+           u'Expected {0} records, got {1}'.format(
+               2000 * len(INVENTORY_ZONES), records))
+    return {'zones': len(zones), 'records': records,
+            'instances': len(instances), 'containers': len(containers),
+            'load_balancers': sum(len(region) for region in lbs.values())}
+
+
+def inventory_snapshot(env):
+    """
+    Two snapshots with a record and a container created in between, then
+    the diff of the two
+    """
+    first = env.runner.snapshot()
+    rows = first['rows']
+    _check(rows['dns_records'] == 2000 * len(INVENTORY_ZONES),
+           u'Expected {0} records, got {1}'.format(
+               2000 * len(INVENTORY_ZONES), rows['dns_records']))
+    _check(rows['load_balancers'] == 50 * len(INVENTORY_REGIONS),
+           u'Expected {0} load balancers, got {1}'.format(
+               50 * len(INVENTORY_REGIONS), rows['load_balancers']))
+
+    env.module.dns_record_create(u'new.{0}'.format(INVENTORY_ZONES[0]),
+                                 INVENTORY_ZONES[0], 'A', '192.0.2.1')
+    env.module.cf_container_create('inventory-new')
+    second = env.runner.snapshot()
+    changes = second['changes']
+    _check(changes['dns_records']['added'] == 1,
+           u'Expected 1 added record, got {0}'.format(
+               changes['dns_records']))
+    #The fake serves the same containers in every region
+    _check(changes['cf_containers']['added'] == len(INVENTORY_REGIONS),
+           u'Expected {0} added containers, got {1}'.format(
+               len(INVENTORY_REGIONS), changes['cf_containers']))
+
+    diff = env.runner.diff()
+    #Adding the record also bumps the zone's updated time
+    _check(set(['cf_containers', 'dns_records']) <= set(diff) <=
+           set(['cf_containers', 'dns_records', 'dns_zones']),
+           u'Unexpected changes: {0}'.format(sorted(diff)))
+    return {'rows': sum(rows.values()),
+            'changes': dict((kind, dict((change, len(items))
+                                        for change, items in table.items()))
+                            for kind, table in diff.items()
+                            if kind != 'dns_zones')}
+
+
+def _reverse_addresses():
+    #Every zone is seeded with the same addresses
+    return [u'10.0.0.{0}'.format(index * 7)
+            for index in range(REVERSE_LOOKUPS)]
+
+
+def decommission_zone_lists(env):
+    """
+    The pre-decommission check dns_reverse_lookup replaces: every zone with
+    its records for each address
+    """
+    found = 0
+    for address in _reverse_addresses():
+        found += sum(1 for zone in env.module.dns_zone_list(show_records=True)
+                     for record in zone['records']
+                     if record['data'] == address and
+                     record['type'] in ('A', 'AAAA', 'CNAME'))
+    _check(found == REVERSE_ZONES * REVERSE_LOOKUPS,
+           u'Expected {0} records, got {1}'.format(
+               REVERSE_ZONES * REVERSE_LOOKUPS, found))
+    return {'lookups': REVERSE_LOOKUPS, 'records': found}
+
+
+def reverse_lookups(env):
+    """
+    The same lookups from the record index, then one more after a record
+    was added, refreshing only the zone it was added to
+    """
+    #Zones changed in the second they are indexed in are listed again
+    time.sleep(1)
+    found = 0
+    for address in _reverse_addresses():
+        found += len(env.module.dns_reverse_lookup(address))
+    _check(found == REVERSE_ZONES * REVERSE_LOOKUPS,
+           u'Expected {0} records, got {1}'.format(
+               REVERSE_ZONES * REVERSE_LOOKUPS, found))
+
+    address = _reverse_addresses()[0]
+    env.module.dns_record_create(u'alias.zone-0.example.com',
+                                 'zone-0.example.com', 'CNAME',
+                                 u'HOST-0.zone-0.example.com.')
+    records = env.module.dns_reverse_lookup(
+        [address, u'host-0.zone-0.example.com'], refresh=True)
+    _check(len(records) == REVERSE_ZONES + 1,
+           u'Expected {0} records, got {1}'.format(REVERSE_ZONES + 1,
+                                                   len(records)))
+    return {'lookups': REVERSE_LOOKUPS + 1, 'records': found + len(records)}
+
+
+def ptr_managed(env):
+    """
+    Reverse DNS for a fleet of servers, half of which have PTR records and
+    1 in 10 of those under an old name, and 5 load balancers. A second run
+    finds nothing left to change.
+    """
+    servers = {}
+    for index in range(PTR_SERVERS):
+        prefix = u'web' if index % 10 == 0 else u'server'
+        servers[fake_rackspace.server_id(index)] = {
+            fake_rackspace.ptr_address(index):
+                u'{0}-{1}.example.com'.format(prefix, index)}
+    load_balancers = dict(
+        (u'lb-{0}'.format(index),
+         {u'198.51.100.{0}'.format(index + 1):
+          u'lb-{0}.example.com'.format(index)})
+        for index in range(5))
+
+    ret = env.state('dns_ptr_managed', 'fleet', servers=servers,
+                    load_balancers=load_balancers)
+    _check(ret['result'], ret['comment'])
+    changes = dict((key, len(value)) for key, value in ret['changes'].items())
+    expected = {'added': PTR_SERVERS // 2 + 5, 'updated': PTR_SERVERS // 10}
+    _check(changes == expected, u'Expected {0}, got {1}'.format(expected,
+                                                               changes))
+    again = env.state('dns_ptr_managed', 'fleet', servers=servers,
+                      load_balancers=load_balancers)
+    _check(again['result'] and not again['changes'], again['comment'])
+    return changes
+
+
+def _drift_chunks():
+    """
+    dns_zone_exists states for the reverse lookup zones and 5
+    dns_record_exists states in each
+    """
+    zones = []
+    records = []
+    for index in range(REVERSE_ZONES):
+        zone = u'zone-{0}.example.com'.format(index)
+        zones.append({'name': zone, 'email_address': 'admin@example.com',
+                      'ttl': 300})
+        records += [{'name': u'host-{0}.{1}'.format(record, zone),
+                     'zone_name': zone, 'record_type': 'A',
+                     'data': u'10.0.0.{0}'.format(record), 'ttl': 300}
+                    for record in range(DRIFT_RECORDS)]
+    return _chunks('dns_zone_exists', zones) + \
+        _chunks('dns_record_exists', records)
+
+
+def dns_drift(env):
+    """
+    The DNS beacon on zones edited out of band between two polls: a changed
+    address, ttl and email address and a removed record, which drifted, and
+    an unmanaged record and a reverted edit, which didn't. A last poll finds
+    nothing new. The beacon names the default account, which the states
+    leave out.
+    """
+    env.salt['state.show_lowstate'] = _drift_chunks
+    config = [{'interval': 60}, {'account': 'default'}]
+    _check(env.beacon.beacon(config) == [], u'Drift found on the first poll')
+
+    module = env.module
+    module.dns_record_update(u'host-0.zone-0.example.com',
+                             'zone-0.example.com', 'A', u'192.0.2.1', ttl=300)
+    module.dns_record_update(u'host-1.zone-1.example.com',
+                             'zone-1.example.com', 'A', u'10.0.0.1', ttl=3600)
+    module.dns_record_update(u'host-100.zone-2.example.com',
+                             'zone-2.example.com', 'A', u'192.0.2.2', ttl=300)
+    for data in (u'192.0.2.3', u'10.0.0.3'):
+        module.dns_record_update(u'host-3.zone-3.example.com',
+                                 'zone-3.example.com', 'A', data, ttl=300)
+    module._dns_record_get_by_name(u'host-4.zone-4.example.com',
+                                   'zone-4.example.com', 'A')[0].delete()
+    module.dns_zone_update('zone-5.example.com',
+                           email_address='hostmaster@example.com', ttl=300)
+
+    events = env.beacon.beacon(config)
+    drifted = dict((event['zone'], [(drift['name'], drift['type'])
+                                    for drift in event['drift']])
+                   for event in events)
+    expected = {
+        'zone-0.example.com': [(u'host-0.zone-0.example.com', 'A')],
+        'zone-1.example.com': [(u'host-1.zone-1.example.com', 'A')],
+        'zone-4.example.com': [(u'host-4.zone-4.example.com', 'A')],
+        'zone-5.example.com': [('zone-5.example.com', 'ZONE')],
+    }
+    _check(drifted == expected, u'Expected {0}, got {1}'.format(expected,
+                                                               drifted))
+    _check(env.beacon.beacon(config) == [], u'Drift reported twice')
+    return {'polls': 3, 'drifts': len(events)}
+
+
+def module_load(env):
+    output = subprocess.check_output([sys.executable, '-c', LOAD_SCRIPT,
+                                      harness.MODULE_PATH,
+                                      harness.STATE_PATH])
+    result = json.loads(output.decode('utf-8'))
+    _check(not result['pyrax_imported'],
+           u'Loading the modules imported pyrax')
+    return result
+
+
+INVENTORY_FIXTURES = {
+    'dns_zones': [{'name': name, 'records': 2000}
+                  for name in INVENTORY_ZONES],
+    'containers': [{'count': 2000, 'cdn_every': 100}],
+    'db_instances': [{'count': DB_INSTANCES, 'region': region}
+                     for region in INVENTORY_REGIONS],
+    'load_balancers': [{'count': 50, 'region': region}
+                       for region in INVENTORY_REGIONS],
+}
+
+REVERSE_FIXTURES = {
+    'dns_zones': [{'name': u'zone-{0}.example.com'.format(index),
+                   'records': 250}
+                  for index in range(REVERSE_ZONES)],
+}
+
+SCENARIOS = [
+    Scenario('module_load',
+             u'Loads the execution and state modules in a fresh interpreter',
+             {}, module_load),
+    Scenario('dns_record_list_5k',
+             u'dns_record_list of a zone with 5000 records',
+             {'dns_zones': [{'name': ZONE, 'records': ZONE_RECORDS}]},
+             dns_record_list),
+    Scenario('dns_records_state_5k',
+             u'20 dns_record_exists states on a zone with 5000 records',
+             {'dns_zones': [{'name': ZONE, 'records': ZONE_RECORDS}]},
+             dns_records_state),
+    Scenario('cf_container_list_20k',
+             u'cf_container_list of 20000 containers, 1 in 100 on the CDN',
+             {'containers': [{'count': CONTAINERS, 'cdn_every': 100}]},
+             cf_container_list),
+    Scenario('cf_containers_state_20k',
+             u'20 cf_container_exists states among 20000 containers',
+             {'containers': [{'count': CONTAINERS, 'cdn_every': 100}]},
+             cf_containers_state),
+    Scenario('dns_records_aggregated_5k',
+             u'20 aggregated dns_record_exists states on a zone with 5000 '
+             u'records',
+             {'dns_zones': [{'name': ZONE, 'records': ZONE_RECORDS}]},
+             dns_records_aggregated),
+    Scenario('cf_containers_aggregated_20k',
+             u'20 aggregated cf_container_exists states among 20000 '
+             u'containers',
+             {'containers': [{'count': CONTAINERS, 'cdn_every': 100}]},
+             cf_containers_aggregated),
+    Scenario('db_instances_10',
+             u'db_instance_list and 10 db_instance_exists states',
+             {'db_instances': [{'count': DB_INSTANCES}]},
+             db_instances),
+    Scenario('lb_nodes_sync_40',
+             u'lb_nodes_managed adding 10 and removing 10 of 40 nodes',
+             {'load_balancers': [{'count': 5, 'nodes': LB_NODES}]},
+             lb_nodes_sync),
+    Scenario('lb_list_all_regions',
+             u'lb_list over 3 regions of 50 load balancers each',
+             {'load_balancers': [{'count': 50, 'region': region}
+                                 for region in ('DFW', 'ORD', 'IAD')]},
+             lb_list_regions),
+    Scenario('db_instances_3_accounts',
+             u'db_instance_list across 3 accounts of 10 instances each',
+             {'db_instances': [{'count': DB_INSTANCES}]},
+             db_instances_accounts),
+    Scenario('degraded_region_20',
+             u'20 lb_exists states, half of them in a region failing with '
+             u'slow 503s',
+             {'load_balancers': [{'count': 5, 'region': region}
+                                 for region in ('DFW', 'ORD')],
+              'faults': [{'service': 'lb', 'region': 'ORD', 'status': 503,
+                          'latency': 0.2}]},
+             degraded_region),
+    Scenario('tail_lookups_60',
+             u'60 cf_container_get, every 20th Cloud Files request taking '
+             u'0.5s',
+             {'containers': [{'count': TAIL_LOOKUPS, 'cdn_every': 10}],
+              'faults': [{'service': 'files', 'region': 'DFW',
+                          'latency': 0.5, 'every': 20}]},
+             tail_lookups),
+    Scenario('tail_lookups_hedged_60',
+             u'The same 60 lookups hedged past their p90 latency',
+             {'containers': [{'count': TAIL_LOOKUPS, 'cdn_every': 10}],
+              'faults': [{'service': 'files', 'region': 'DFW',
+                          'latency': 0.5, 'every': 20}]},
+             tail_lookups_hedged),
+    Scenario('state_lookup_timeout',
+             u'A cf_container_exists state with a lookup_timeout while Cloud '
+             u'Files takes 2s per request',
+             {'containers': [{'count': 1}],
+              'faults': [{'service': 'files', 'region': 'DFW',
+                          'latency': 2}]},
+             state_lookup_timeout),
+    Scenario('parallel_states_10',
+             u'10 dns_record_exists states run in parallel processes',
+             {'dns_zones': [{'name': ZONE, 'records': ZONE_RECORDS}]},
+             parallel_states),
+    Scenario('render_lookups_20',
+             u'20 container and instance lookups made one by one',
+             {'containers': [{'count': 1000, 'cdn_every': 100}],
+              'db_instances': [{'count': DB_INSTANCES}]},
+             render_lookups),
+    Scenario('render_lookups_prefetched_20',
+             u'The same 20 lookups made through one rackspace.prefetch',
+             {'containers': [{'count': 1000, 'cdn_every': 100}],
+              'db_instances': [{'count': DB_INSTANCES}]},
+             render_lookups_prefetched),
+    Scenario('dry_run_50_states',
+             u'A test=True run of 50 DNS, Cloud Files and database states',
+             {'dns_zones': [{'name': ZONE, 'records': ZONE_RECORDS}],
+              'containers': [{'count': CONTAINERS, 'cdn_every': 100}],
+              'db_instances': [{'count': DB_INSTANCES}]},
+             dry_run),
+    Scenario('nightly_inventory_lists',
+             u'dns_zone_list with records, then the database, container '
+             u'and load balancer lists of every region',
+             INVENTORY_FIXTURES, nightly_inventory),
+    Scenario('inventory_snapshot_x2',
+             u'Two rackspace.snapshot runs of the same account and their '
+             u'diff',
+             INVENTORY_FIXTURES, inventory_snapshot),
+    Scenario('decommission_zone_lists_10',
+             u'10 address lookups through dns_zone_list(show_records=True) '
+             u'over 20 zones of 250 records',
+             REVERSE_FIXTURES, decommission_zone_lists),
+    Scenario('reverse_lookups_10',
+             u'The same 10 lookups through dns_reverse_lookup, and one '
+             u'more after a record was added',
+             REVERSE_FIXTURES, reverse_lookups),
+    Scenario('ptr_managed_200',
+             u'Two dns_ptr_managed runs over 200 servers and 5 load '
+             u'balancers',
+             {'load_balancers': [{'count': 5}],
+              'ptr_records': [{'count': PTR_SERVERS, 'every': 2}]},
+             ptr_managed),
+    Scenario('dns_drift_20_zones',
+             u'Three DNS beacon polls of 20 zones of 250 records with 6 out '
+             u'of band edits before the second',
+             REVERSE_FIXTURES, dns_drift),
+]
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+Beacon to emit Rackspace Cloud DNS records and zones that drifted from the
+highstate onto the event bus.
+
+:depends: rackspace execution module
+:configuration:
+    The desired records and zones are those of the rackspace.dns_record_exists
+    and rackspace.dns_zone_exists states in the minion's highstate, read again
+    every refresh seconds. Each interval reads only the changes made to the
+    zones since the previous one, one request per zone, and one event is
+    fired per zone with the records or settings that no longer match::
+
+        beacons:
+          rackspace_dns:
+            zones:
+              - example.com
+            refresh: 3600
+            interval: 300
+
+    zones limits the zones watched, all zones of the states if it isn't
+    given. account names the rackspace profile to poll, the default account
+    if it isn't given, and only states for that account are watched, states
+    without an account being for the default one. Its name is added to every
+    event.
+"""
+
+# Import Python libs
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+__virtualname__ = 'rackspace_dns'
+
+#States the desired records and zones are read from
+DESIRED_STATES = {'dns_record_exists': 'records', 'dns_zone_exists': 'zones'}
+
+
+def __virtual__():
+    """
+    Errors from the rackspace module are logged on each poll
+    """
+    return __virtualname__
+
+
+def _config(config):
+    """
+    Merges the list of dicts beacon configuration format into a dict
+    """
+    if isinstance(config, list):
+        merged = {}
+        for item in config:
+            merged.update(item)
+        return merged
+    return config
+
+
+def _desired(config):
+    """
+    Reads the desired records and zones from the highstate, at most once per
+    refresh seconds
+    :return: A dict of the records and zones lists
+    """
+    cached = __context__.get('rackspace_dns.desired')
+    now = time.time()
+    if cached is not None and \
+            now - cached['time'] < config.get('refresh', 3600):
+        return cached
+
+    chunks = __salt__['state.show_lowstate']()
+    if not isinstance(chunks, list) or \
+            not all(isinstance(chunk, dict) for chunk in chunks):
+        raise ValueError(u'Unable to render the highstate: {0}'.format(
+            chunks))
+    zones = config.get('zones')
+    desired = {'time': now, 'records': [], 'zones': []}
+    for chunk in chunks:
+        #States of other accounts are skipped by the rackspace module,
+        # which knows the default account of states without one
+        if chunk.get('state') != 'rackspace' or \
+                chunk.get('fun') not in DESIRED_STATES:
+            continue
+        zone = chunk['zone_name'] if chunk['fun'] == 'dns_record_exists' \
+            else chunk['name']
+        if zones is not None and zone not in zones:
+            continue
+        desired[DESIRED_STATES[chunk['fun']]].append(chunk)
+    __context__['rackspace_dns.desired'] = desired
+    return desired
+
+
+def validate(config):
+    """
+    Validates the beacon configuration
+    """
+    config = _config(config)
+    if not isinstance(config, dict):
+        return False, u'Configuration for rackspace_dns beacon must be a dict'
+    if not isinstance(config.get('zones', []), list):
+        return False, u'zones for rackspace_dns beacon must be a list'
+    return True, u'Valid beacon configuration'
+
+
+__validate__ = validate
+
+
+def beacon(config):
+    """
+    Polls the changes of the zones and returns the drifts as events
+    """
+    config = _config(config)
+    try:
+        desired = _desired(config)
+        drifts = __salt__['rackspace.dns_drift_poll'](
+            records=desired['records'],
+            zones=desired['zones'],
+            account=config.get('account'))
+    except Exception as e:
+        logger.error(u'Unable to poll DNS changes: {0}'.format(e))
+        return []
+
+    ret = []
+    for zone, drift in sorted(drifts.items()):
+        event = {'tag': zone, 'zone': zone, 'drift': drift}
+        if config.get('account'):
+            event['account'] = config['account']
+        ret.append(event)
+    return ret
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+Beacon to emit Rackspace Cloud Load Balancer stats onto the event bus.
+
+:depends: rackspace execution module
+:configuration:
+    Only load balancers that changed, or whose last sample is older than
+    max_age seconds, are sampled on each interval. One event is fired per
+    region containing only the stats that changed since the previous
+    sample::
+
+        beacons:
+          rackspace_lb:
+            regions:
+              - DFW
+              - ORD
+            names:
+              - web
+            max_age: 300
+            history: 10
+            interval: 60
+
+    account names the rackspace profile to poll, the default account if it
+    isn't given. Its name is added to every event.
+"""
+
+# Import Python libs
+import logging
+
+logger = logging.getLogger(__name__)
+
+__virtualname__ = 'rackspace_lb'
+
+
+def __virtual__():
+    """
+    Errors from the rackspace module are logged on each poll
+    """
+    return __virtualname__
+
+
+def _config(config):
+    """
+    Merges the list of dicts beacon configuration format into a dict
+    """
+    if isinstance(config, list):
+        merged = {}
+        for item in config:
+            merged.update(item)
+        return merged
+    return config
+
+
+def validate(config):
+    """
+    Validates the beacon configuration
+    """
+    config = _config(config)
+    if not isinstance(config, dict):
+        return False, u'Configuration for rackspace_lb beacon must be a dict'
+    if not isinstance(config.get('regions', []), list):
+        return False, u'regions for rackspace_lb beacon must be a list'
+    return True, u'Valid beacon configuration'
+
+
+__validate__ = validate
+
+
+def beacon(config):
+    """
+    Polls load balancer stats and returns the changes as events
+    """
+    config = _config(config)
+    ret = []
+    for region in config.get('regions', ['DFW']):
+        try:
+            deltas = __salt__['rackspace.lb_stats_poll'](
+                region=region,
+                names=config.get('names'),
+                max_age=config.get('max_age', 300),
+                history=config.get('history', 10),
+                account=config.get('account'))
+        except Exception as e:
+            logger.error(u'Unable to poll load balancer stats in {0}: '
+                         u'{1}'.format(region, e))
+            continue
+        if deltas:
+            event = {'tag': region.upper(), 'region': region.upper(),
+                     'stats': deltas}
+            if config.get('account'):
+                event['account'] = config['account']
+            ret.append(event)
+    return ret
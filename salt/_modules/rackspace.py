@@ -13,6 +13,34 @@ Module to provide Rackspace infrastructure compatibility to Salt.
             username: USERNAME
             apikey: API_KEY
 
+    Several accounts can be configured as named profiles instead, or as well,
+    in which case the flat username and apikey are the account named
+    default::
+        rackspace:
+            default_account: prod
+            accounts:
+              prod:
+                username: USERNAME
+                apikey: API_KEY
+              staging:
+                username: USERNAME
+                apikey: API_KEY
+
+    Every function takes an account argument naming the profile to use,
+    default_account (or the only profile) if it isn't given. Each account
+    has its own token and drivers. The list functions also take an accounts
+    argument, 'ALL' or a list of profiles, to query several accounts
+    concurrently.
+
+    Lookups of zones, records, database instances and containers by name can
+    be hedged: a lookup still unanswered after the given percentile of the
+    latencies seen so far is sent a second time and the first answer used::
+        rackspace:
+            hedge_percentile: 95
+
+    The lookups of a state with a lookup_timeout argument, ex.
+    ``lookup_timeout: 20``, give up once the state has run for that long.
+
     The various functions generally follow the following format:
         driver_type_action
         dns_record_list
@@ -20,24 +48,88 @@ Module to provide Rackspace infrastructure compatibility to Salt.
 """
 
 # Import Python libs
+import bisect
+import calendar
+import collections
+import copy
+import datetime
+import functools
+import importlib
+import inspect
+import json
+import os
+import random
+import re
 import six
 import logging
+import sqlite3
+import threading
+import time
+from multiprocessing.pool import ThreadPool
 
 logger = logging.getLogger(__name__)
 
 # Import salt libs
 import salt.utils
-
-#Import pyrax
-HAS_PYRAX = False
 try:
-    import pyrax
-    import pyrax.exceptions as exc
-
-    HAS_PYRAX = True
-    pyrax.set_setting("identity_type", "rackspace")
+    from salt.utils.decorators import identical_signature_wrapper
 except ImportError:
-    logger.error("Could not import Pyrax")
+    identical_signature_wrapper = None
+
+
+class _LazyModule(object):
+    """
+    Stands in for a module and imports it when one of its attributes is first
+    used. pyrax pulls in novaclient and keyring and takes longer to import
+    than the rest of the module, so minions that never call it don't pay for
+    it on start or on every sync.
+    """
+    _lock = threading.Lock()
+
+    def __init__(self, name, setup=None):
+        self.__dict__.update(_name=name, _setup=setup, _module=None)
+
+    def _load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    module = importlib.import_module(self._name)
+                    if self._setup is not None:
+                        self._setup(module)
+                    self.__dict__['_module'] = module
+        return self._module
+
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
+
+
+def _module_available(name):
+    """
+    Finds a module without importing it
+    """
+    try:
+        from importlib.util import find_spec
+    except ImportError:
+        import imp
+        try:
+            imp.find_module(name)
+        except ImportError:
+            return False
+        return True
+    return find_spec(name) is not None
+
+
+def _pyrax_setup(module):
+    module.set_setting("identity_type", "rackspace")
+
+
+#Import pyrax
+HAS_PYRAX = _module_available('pyrax')
+if not HAS_PYRAX:
+    logger.error("Could not find Pyrax")
+pyrax = _LazyModule('pyrax', setup=_pyrax_setup)
+exc = _LazyModule('pyrax.exceptions')
+requests_exceptions = _LazyModule('requests.exceptions')
 
 #TODO: Add Absent Modules
 #TODO: Add Get Modules
@@ -49,10 +141,161 @@ MAX_DB_VOLUME_SIZE = 150
 MINIMUM_TTL = 300
 PAGE_SIZE = 100
 TIMEOUT = 30
+MAX_WORKERS = 8
+#Seconds a prefetched lookup is served to the *_get functions
+PREFETCH_TTL = 120
+#Seconds before token expiry at which a cached token is no longer reused
+TOKEN_EXPIRY_MARGIN = 300
+#Token lifetime to assume if the identity doesn't report an expiry
+DEFAULT_TOKEN_LIFETIME = 3600
+
+#Instrumentation
+STATS_EVENT_TAG = 'rackspace/stats'
+STATS_TIME_BOUNDS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+                     30, 60, 300)
+STATS_COUNT_BOUNDS = (0, 1, 2, 5, 10, 20, 50, 100, 500, 1000)
+STATS_BYTES_BOUNDS = (0, 1024, 10240, 102400, 1048576, 10485760)
+#Public functions that feed or report the stats and aren't instrumented
+STATS_UNINSTRUMENTED = ['stats', 'stats_begin', 'stats_end', 'stats_emit',
+                        'single_flight_stats', 'circuit_breaker_stats',
+                        'hedge_stats']
+
+#Rate limiting
+RATE_LIMIT_RETRIES = 6
+RATE_LIMIT_BACKOFF = 1
+RATE_LIMIT_MAX_BACKOFF = 60
+RATE_LIMIT_UNITS = {'SECOND': 1, 'MINUTE': 60, 'HOUR': 3600, 'DAY': 86400}
+
+#Hedged reads. A lookup is only hedged once HEDGE_MIN_SAMPLES latencies of
+# its helper were recorded, and while fewer than HEDGE_MAX_ATTEMPTS attempts
+# of the helper, abandoned ones included, are still running
+HEDGE_PERCENTILE = None
+HEDGE_MIN_SAMPLES = 10
+HEDGE_MAX_ATTEMPTS = 8
+
+#Circuit breaking, per service and region. A breaker opens once at least
+# BREAKER_MIN_CALLS of the last BREAKER_WINDOW_CALLS requests, sent within
+# BREAKER_WINDOW seconds, are recorded and BREAKER_FAILURE_RATE of them
+# failed or took BREAKER_SLOW_CALL seconds or more. It then fails requests
+# without sending them for BREAKER_COOLDOWN seconds before probing.
+BREAKER_WINDOW = 300
+BREAKER_WINDOW_CALLS = 20
+BREAKER_MIN_CALLS = 5
+BREAKER_FAILURE_RATE = 0.5
+BREAKER_SLOW_CALL = 10
+BREAKER_COOLDOWN = 30
+
+#Cloud Servers
+CS_BUILD_TIMEOUT = 1800
+CS_POLL_INTERVAL = 10
+CS_NETWORK_ALIASES = {
+    'public': '00000000-0000-0000-0000-000000000000',
+    'private': '11111111-1111-1111-1111-111111111111',
+}
+
+#Cloud Networks
+NET_ID_RE = re.compile(r'^[0-9a-f]{8}-([0-9a-f]{4}-){3}[0-9a-f]{12}$', re.I)
+
+#Cloud Load Balancers
+LB_BULK_DELETE_LIMIT = 10
+LB_NODE_CONDITIONS = ['ENABLED', 'DISABLED', 'DRAINING']
+#Number of stats samples kept per load balancer
+LB_STATS_HISTORY = 10
+#Seconds after which an unchanged load balancer is sampled again
+LB_STATS_MAX_AGE = 300
+#Stats fields reported as values rather than as counter deltas
+LB_STATS_GAUGES = ['currentConn', 'averageNumConnections']
+
+#Cloud Block Storage
+BS_TIMEOUT = 600
+BS_POLL_INTERVAL = 5
+
+#Cloud Monitoring
+MON_PAGE_SIZE = 1000
+#Concurrent writes kept low to stay inside the monitoring API rate limits
+MON_WORKERS = 4
+MON_CHECK_FIELDS = ['type', 'details', 'period', 'timeout', 'target_alias',
+                    'target_hostname', 'target_resolver',
+                    'monitoring_zones_poll', 'disabled', 'metadata']
+MON_ALARM_FIELDS = ['criteria', 'notification_plan_id', 'disabled',
+                    'metadata']
+
+#Cloud Files
+CF_LISTING_LIMIT = 10000
 
 #DNS
 VALID_RECORD_TYPES = ['A', 'AAAA', 'CNAME', 'MX' 'NS', 'PTR', 'SRV', 'TXT']
 PRIORITY_RECORD_TYPES = ["MX", 'SRV']
+#Record types dns_reverse_lookup matches by default
+DNS_REVERSE_LOOKUP_TYPES = ['A', 'AAAA', 'CNAME']
+#Seconds after which dns_reverse_lookup refreshes the record index
+DNS_INDEX_MAX_AGE = 300
+#Devices PTR records live on: their service catalog name, the path of
+# their URL and their rdns service name
+DNS_PTR_DEVICES = {
+    'server': ('compute', 'servers', 'cloudServersOpenStack'),
+    'load_balancer': ('load_balancer', 'loadbalancers', 'cloudLoadBalancers'),
+}
+DNS_JOB_TIMEOUT = 300
+DNS_JOB_POLL_INTERVAL = 1
+#Format of the since parameter of the zone changes feed
+DNS_CHANGES_TIME_FORMAT = '%Y-%m-%dT%H:%M:%S.000+0000'
+
+#The account of the flat username and apikey in pillar
+DEFAULT_ACCOUNT = 'default'
+
+#Maps driver types to their service catalog names
+SERVICE_NAMES = {
+    'lb': 'load_balancer',
+    'cs': 'compute',
+    'mon': 'monitor',
+    'db': 'database',
+    'cf': 'object_store',
+    'bs': 'volume',
+    'dns': 'dns',
+    'net': 'compute',
+}
+
+_AUTH_LOCK = threading.Lock()
+#Serializes authentication per account
+_AUTH_LOCKS = {}
+_NET_LOCK = threading.RLock()
+_RATE_LOCK = threading.Lock()
+#Serializes reading the /limits of each (account, service, region)
+_RATE_LIMIT_LOCKS = {}
+#Parsed /limits per (account, service, region) and token buckets per
+# (account, service, region, limit, verb), shared by every client in the
+# process
+_RATE_LIMITS = {}
+_RATE_BUCKETS = {}
+_BREAKER_LOCK = threading.Lock()
+#Circuit breakers per (service, region), endpoints are shared by accounts
+_BREAKERS = {}
+_FLIGHT_LOCK = threading.Lock()
+#Reads currently being fetched, keyed by helper name and arguments
+_IN_FLIGHT = {}
+_FLIGHT_STATS = {'calls': 0, 'coalesced': 0}
+_HEDGE_LOCK = threading.Lock()
+#Marks call frame settings that weren't read yet
+_UNSET = object()
+#Latencies of the hedged read helpers, and their attempts still running on
+# hedging threads, keyed by helper name, and the threads, created on first use
+_HEDGE_LATENCIES = {}
+_HEDGE_ATTEMPTS = {}
+_HEDGE_THREADS = None
+_HEDGE_STATS = {'calls': 0, 'hedged': 0, 'hedge_won': 0,
+                'deadline_exceeded': 0}
+_STATS_LOCK = threading.Lock()
+#Aggregated call stats keyed by (kind, function name)
+_STATS = {}
+#Per thread stack of the instrumented calls in progress, and the deadline of
+# the hedged read being sent from the thread
+_CALLS = threading.local()
+#Per thread drivers of the current identity
+_CLIENTS = threading.local()
+#The process the locks above belong to
+_PID = os.getpid()
+_clock = getattr(time, 'perf_counter', time.time)
 
 
 def __virtual__():
@@ -64,922 +307,4604 @@ def __virtual__():
     return False
 
 
-### CLOUD SERVERS
-def cs_images_list():
+class _Flight(object):
     """
-    Generated a list of all cloud server images in the default region
-    :return: A list of image names
+    A read in progress that concurrent callers can wait on
     """
-    driver = _get_driver('cs')
-    output = []
-    for image in driver.flavors.list():
-        output.append(image.name)
-    return {'images': output}
+    __slots__ = ('done', 'result', 'error')
 
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
 
-###CLOUD LBS
-def lb_list():
+
+def _single_flight(func):
     """
-    Generates a list of dicts of all load balancers in a given region
-    :return: A dict keyed by name of the LB
+    Decorates a read helper so that concurrent calls with the same arguments
+    share one in-flight request and its result (or exception) instead of each
+    sending their own.
+
+    Calls with unhashable arguments are not coalesced.
     """
-    driver = _get_driver('lb')
-    output = {}
-    for lb in driver.list():
-        out = {lb.name: {'port': lb.port, 'status': lb.status}}
-        output.update(out)
-    return output
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        key = (func.__name__, _current_account(), args,
+               tuple(sorted(kwargs.items())))
+        try:
+            hash(key)
+        except TypeError:
+            return func(*args, **kwargs)
+
+        with _FLIGHT_LOCK:
+            flight = _IN_FLIGHT.get(key)
+            leader = flight is None
+            if leader:
+                flight = _IN_FLIGHT[key] = _Flight()
+                _FLIGHT_STATS['calls'] += 1
+            else:
+                _FLIGHT_STATS['coalesced'] += 1
+                _count_cache_hit()
 
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
 
-def _lb_to_dict(lb):
-    assert isinstance(lb, pyrax.CloudLoadBalancerClient)
-    #out = {'name': lb.name, 'port': lb.port, 'status': lb.status}
-    out = {}
-    return out
+        try:
+            flight.result = func(*args, **kwargs)
+            return flight.result
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with _FLIGHT_LOCK:
+                del _IN_FLIGHT[key]
+            flight.done.set()
+    return wrapper
 
 
-### CLOUD DNS
-def dns_zone_list(show_records=False):
+def _hedged(func):
     """
-    Generate a list of all DNS Domains on this account
-    :param show_records: Boolean if the listed zones should display all of
-    their records
-    :return:
+    Decorates an idempotent read helper so that a call still unanswered after
+    the hedge_percentile of the helper's latencies is sent a second time and
+    the first answer used, and so that callers stop waiting at the deadline
+    of the current call.
+
+    Calls that aren't hedged are made from the calling thread, their requests
+    timing out at the deadline. Helpers called by a hedged call aren't hedged
+    themselves.
     """
-    driver = _get_driver('dns')
-    assert isinstance(driver, pyrax.clouddns.CloudDNSClient)
-    output = []
-    for zone in _dns_zone_list():
-        output.append(_dns_zone_to_dict(zone, show_records))
-    return output
+    name = func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        frame = _current_call()
+        deadline = frame.deadline if frame is not None else None
+        if not getattr(_CALLS, 'hedging', False):
+            delay = _hedge_delay(name)
+            if delay is not None and _hedge_acquire(name):
+                return _hedge_call(func, args, kwargs, delay, deadline)
+        previous = getattr(_CALLS, 'deadline', None)
+        _CALLS.deadline = deadline
+        started = _clock()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _CALLS.deadline = previous
+            _hedge_record(name, _clock() - started)
+    return wrapper
 
 
-def dns_zone_create(name, email_address, ttl=False):
+def _hedge_delay(name):
     """
-    Crease the specified DNS zone
-    :param name: Name of the DNS zone
-    :param email_address: Email address to associate with the zone
-    :param ttl: Default ttl value for all records on the zone
-    :return: A dict representation of the created zone
+    :return: Seconds after which a call of the helper is sent again, None
+    if it isn't hedged
     """
-    driver = _get_driver('dns')
-    assert isinstance(driver, pyrax.clouddns.CloudDNSClient)
+    percentile = _hedge_percentile()
+    if not percentile:
+        return None
+    with _HEDGE_LOCK:
+        latencies = _HEDGE_LATENCIES.get(name)
+        if latencies is None or sum(latencies.counts) < HEDGE_MIN_SAMPLES:
+            return None
+        return latencies.percentile(float(percentile))
 
-    if not ttl:
-        dom = driver.create(name=name, emailAddress=email_address)
-    else:
-        dom = driver.create(name=name, emailAddress=email_address, ttl=ttl)
-    return _dns_zone_to_dict(dom)
 
+def _hedge_record(name, elapsed):
+    with _HEDGE_LOCK:
+        latencies = _HEDGE_LATENCIES.get(name)
+        if latencies is None:
+            latencies = _HEDGE_LATENCIES[name] = _Histogram(STATS_TIME_BOUNDS)
+        latencies.add(elapsed)
 
-def dns_zone_exists(name, **kwargs):
+
+def _hedge_percentile():
     """
-    Determines if a dns Zone exists
-    :param name: Name of the dns zone
-    :param kwargs:
-    :return:
+    :return: The hedge_percentile setting, read once per instrumented call
     """
-    try:
-        zone = _dns_zone_get_by_name(name)
-    except exc.NotFound:
-        return False
-
-    email_address = kwargs.get('email_address', zone.emailAddress)
-    ttl = kwargs.get('ttl', zone.ttl)
+    frame = _current_call()
+    if frame is not None and frame.hedge_percentile is not _UNSET:
+        return frame.hedge_percentile
+    rackspace = __salt__['config.get']('rackspace') or {}
+    percentile = rackspace.get('hedge_percentile', HEDGE_PERCENTILE)
+    if frame is not None:
+        frame.hedge_percentile = percentile
+    return percentile
 
-    if zone.ttl != ttl or zone.emailAddress != email_address:
-        return False
 
-    return True
+def _hedge_threads():
+    global _HEDGE_THREADS
+    with _HEDGE_LOCK:
+        if _HEDGE_THREADS is None:
+            _HEDGE_THREADS = _HedgeThreads()
+        return _HEDGE_THREADS
 
 
-def dns_zone_update(name, **kwargs):
+def _hedge_acquire(name):
     """
-    Updates a dns zone based on the provided kwargs
-    :param name: The name of the zone
-    :param kwargs: email_address, ttl
-    :return: A dict of the updated zone
+    Reserves an attempt of a helper on the hedging threads
+    :return: False if HEDGE_MAX_ATTEMPTS attempts of it are still running
     """
-    zone = _dns_zone_get_by_name(name)
-    assert isinstance(zone, pyrax.clouddns.CloudDNSDomain)
+    with _HEDGE_LOCK:
+        running = _HEDGE_ATTEMPTS.get(name, 0)
+        if running >= HEDGE_MAX_ATTEMPTS:
+            return False
+        _HEDGE_ATTEMPTS[name] = running + 1
+        return True
 
-    field_types = ['emailAddress', 'ttl']
 
-    if not set(field_types).intersection(set(kwargs)):
-        raise TypeError(
-            u"Must provide one of the following: {}".format(field_types))
+def _hedge_release(name):
+    with _HEDGE_LOCK:
+        _HEDGE_ATTEMPTS[name] -= 1
 
-    comment = kwargs.get('comment', '')
-    email_address = kwargs.get('email_address', zone.emailAddress)
-    ttl = kwargs.get('ttl', zone.ttl)
 
-    if ttl < MINIMUM_TTL:
-        raise ValueError(u'ttl has a minimum value of {}'.format(MINIMUM_TTL))
+def _deadline_timeout(timeout=None):
+    """
+    :param timeout: The timeout the request would be sent with
+    :return: The timeout of a request of a hedged read, cut to the time left
+    until its deadline
+    :raise ClientException: A 408 if the deadline has passed
+    """
+    deadline = getattr(_CALLS, 'deadline', None)
+    if deadline is None:
+        return timeout
+    remaining = deadline - _clock()
+    if remaining <= 0:
+        with _HEDGE_LOCK:
+            _HEDGE_STATS['deadline_exceeded'] += 1
+        raise exc.ClientException(408, u'Ran out of time before sending the '
+                                       u'request')
+    return remaining if timeout is None else min(timeout, remaining)
+
+
+def _hedge_call(func, args, kwargs, delay, deadline):
+    """
+    Sends a read from a hedging thread, once more if it is still unanswered
+    after delay seconds and another attempt of the helper can be reserved,
+    and returns the first answer. A late answer is discarded, the request
+    can't be cancelled but times out at the deadline.
 
-    zone.update(emailAddress=email_address, ttl=ttl, comment=comment)
-    zone.reload()
-    return _dns_zone_to_dict(zone)
+    The first attempt must already be reserved with _hedge_acquire.
 
+    :param delay: Seconds before hedging
+    :param deadline: The _clock() time to stop waiting at, or None
+    :raise ClientException: A 408 if there was no answer by the deadline
+    """
+    parent = _current_call()
+    answers = six.moves.queue.Queue()
+
+    def attempt(hedge):
+        _CALLS.hedging = True
+        _CALLS.deadline = deadline
+        frame = None
+        if parent is not None:
+            frame = _CallFrame(parent.kind, parent.name, parent.account,
+                               parent.deadline)
+            _call_stack().append(frame)
+        started = _clock()
+        try:
+            answers.put((hedge, None, func(*args, **kwargs)))
+        except Exception as e:
+            answers.put((hedge, e, None))
+        finally:
+            _hedge_record(func.__name__, _clock() - started)
+            _hedge_release(func.__name__)
+            _CALLS.hedging = False
+            _CALLS.deadline = None
+            if frame is not None:
+                _call_stack().pop()
+                with _STATS_LOCK:
+                    parent.merge(frame)
+
+    def start(hedge):
+        _hedge_threads().submit(attempt, hedge)
+
+    start(False)
+    with _HEDGE_LOCK:
+        _HEDGE_STATS['calls'] += 1
+
+    hedged = delay is None
+    while True:
+        wait = None if hedged else delay
+        if deadline is not None:
+            remaining = max(deadline - _clock(), 0)
+            wait = remaining if wait is None else min(wait, remaining)
+        try:
+            hedge, error, result = answers.get(timeout=wait)
+        except six.moves.queue.Empty:
+            if deadline is not None and _clock() >= deadline:
+                with _HEDGE_LOCK:
+                    _HEDGE_STATS['deadline_exceeded'] += 1
+                raise exc.ClientException(408, u'{0} ran out of time waiting '
+                                               u'for {1}'.format(
+                                                   getattr(parent, 'name',
+                                                           u'The call'),
+                                                   func.__name__))
+            hedged = True
+            if _hedge_acquire(func.__name__):
+                start(True)
+                with _HEDGE_LOCK:
+                    _HEDGE_STATS['hedged'] += 1
+            continue
+
+        if hedge:
+            with _HEDGE_LOCK:
+                _HEDGE_STATS['hedge_won'] += 1
+        if error is not None:
+            raise error
+        return result
+
+
+class _HedgeThreads(object):
+    """
+    The threads hedged attempts run on. An attempt is given an idle thread,
+    or a new one if they are all busy, so attempts left running never hold
+    up other lookups. Threads are kept for reuse, with their drivers.
+    """
 
-def dns_zone_get(name, show_records=False):
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.idle = []
+
+    def submit(self, func, *args):
+        with self.lock:
+            tasks = self.idle.pop() if self.idle else None
+        if tasks is None:
+            tasks = six.moves.queue.Queue()
+            thread = threading.Thread(target=self._run, args=(tasks,))
+            thread.daemon = True
+            thread.start()
+        tasks.put((func, args))
+
+    def _run(self, tasks):
+        while True:
+            func, args = tasks.get()
+            func(*args)
+            with self.lock:
+                self.idle.append(tasks)
+
+
+class _Histogram(object):
     """
-    Retrieves a specific DNS zone by name
-    :param name: The name of the zone
-    :return: A dict of the zone.
+    Counts of values falling in fixed buckets, the last bucket being
+    everything above the largest bound.
+    """
+    __slots__ = ('bounds', 'counts', 'total', 'max')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0
+        self.max = 0
+
+    def add(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, percent):
+        """
+        :return: The upper bound of the bucket holding the percentile, or the
+        maximum seen for the last bucket
+        """
+        target = sum(self.counts) * percent / 100.0
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= target:
+                if index < len(self.bounds):
+                    return min(self.bounds[index], self.max)
+                return self.max
+        return 0
+
+    def to_dict(self):
+        buckets = ['<={0}'.format(bound) for bound in self.bounds]
+        buckets.append('>{0}'.format(self.bounds[-1]))
+        return {
+            'total': self.total,
+            'max': self.max,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'p99': self.percentile(99),
+            'buckets': dict((bucket, count) for bucket, count in
+                            zip(buckets, self.counts) if count),
+        }
+
+
+class _CallFrame(object):
+    """
+    The counters of one instrumented call in progress
+    """
+    __slots__ = ('kind', 'name', 'account', 'deadline', 'requests',
+                 'bytes_in', 'bytes_out', 'retries', 'cache_hits', 'started',
+                 'hedge_percentile')
+
+    def __init__(self, kind, name, account=None, deadline=None):
+        self.kind = kind
+        self.name = name
+        self.account = account
+        self.deadline = deadline
+        self.hedge_percentile = _UNSET
+        self.requests = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.retries = 0
+        self.cache_hits = 0
+        self.started = _clock()
+
+    def merge(self, other):
+        self.requests += other.requests
+        self.bytes_in += other.bytes_in
+        self.bytes_out += other.bytes_out
+        self.retries += other.retries
+        self.cache_hits += other.cache_hits
+
+
+class _CallStats(object):
     """
+    Aggregated stats of every call of one function
+    """
+    __slots__ = ('calls', 'errors', 'time', 'requests', 'bytes_in',
+                 'bytes_out', 'retries', 'cache_hits')
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.time = _Histogram(STATS_TIME_BOUNDS)
+        self.requests = _Histogram(STATS_COUNT_BOUNDS)
+        self.bytes_in = _Histogram(STATS_BYTES_BOUNDS)
+        self.bytes_out = _Histogram(STATS_BYTES_BOUNDS)
+        self.retries = _Histogram(STATS_COUNT_BOUNDS)
+        self.cache_hits = _Histogram(STATS_COUNT_BOUNDS)
+
+    def add(self, frame, elapsed, failed):
+        self.calls += 1
+        if failed:
+            self.errors += 1
+        self.time.add(elapsed)
+        self.requests.add(frame.requests)
+        self.bytes_in.add(frame.bytes_in)
+        self.bytes_out.add(frame.bytes_out)
+        self.retries.add(frame.retries)
+        self.cache_hits.add(frame.cache_hits)
+
+    def to_dict(self):
+        output = {'calls': self.calls, 'errors': self.errors}
+        for field in ('time', 'requests', 'bytes_in', 'bytes_out', 'retries',
+                      'cache_hits'):
+            output[field] = getattr(self, field).to_dict()
+        return output
+
+
+def _call_stack():
+    stack = getattr(_CALLS, 'stack', None)
+    if stack is None:
+        stack = _CALLS.stack = []
+    return stack
+
+
+def _current_call():
+    stack = getattr(_CALLS, 'stack', None)
+    return stack[-1] if stack else None
+
+
+def _current_account():
+    """
+    :return: The account the current call was made for, None for the default
+    """
+    frame = _current_call()
+    return frame.account if frame is not None else None
 
-    zone = _dns_zone_get_by_name(name)
-    assert isinstance(zone, pyrax.clouddns.CloudDNSDomain)
-    return _dns_zone_to_dict(zone, show_records=show_records)
 
+def _count_cache_hit():
+    frame = _current_call()
+    if frame is not None:
+        frame.cache_hits += 1
 
-def dns_zone_delete(name, delete_subdomains=False):
+
+def _call_begin(kind, name, account=None, deadline=None):
     """
-    Removes specified dns zone
-    :param name: The name of the zone
-    :param delete_subdomains: Determines if subdomains should be deleted
-    :return: A Dict with all the names of a zones dealt with
+    Starts an instrumented call. Calls made without an account use the
+    account of the call they are made from, and no call ends later than the
+    deadline of the call it is made from.
     """
-    driver = _get_driver('dns')
-    assert isinstance(driver, pyrax.clouddns.CloudDNSClient)
-
+    #Checked here rather than with a fork hook, which the loader would add
+    # again on every reload of the module
+    if _PID != os.getpid():
+        _after_fork()
+    parent = _current_call()
+    if parent is not None:
+        if account is None:
+            account = parent.account
+        if parent.deadline is not None and \
+                (deadline is None or parent.deadline < deadline):
+            deadline = parent.deadline
+    frame = _CallFrame(kind, name, account, deadline)
+    if parent is not None:
+        frame.hedge_percentile = parent.hedge_percentile
+    _call_stack().append(frame)
+    return frame
+
+
+def _call_end(frame, failed=False):
+    """
+    Finishes an instrumented call, rolling its counters up into the calling
+    instrumented function if there is one
+    """
+    elapsed = _clock() - frame.started
+    stack = _call_stack()
+    if stack and stack[-1] is frame:
+        stack.pop()
+    with _STATS_LOCK:
+        key = (frame.kind, frame.name)
+        call_stats = _STATS.get(key)
+        if call_stats is None:
+            call_stats = _STATS[key] = _CallStats()
+        call_stats.add(frame, elapsed, failed)
+        if stack:
+            stack[-1].merge(frame)
+
+
+def _instrumented(func, kind='module'):
+    """
+    Decorates a public function to record its wall time, HTTP requests,
+    bytes sent and received, retries and cache hits per call, and to make
+    its account argument the account of everything it calls.
+    """
+    name = func.__name__
     try:
-        zone = _dns_zone_get_by_name(name)
-    except exc.NotFound:
-        raise
-    assert isinstance(zone, pyrax.clouddns.CloudDNSDomain)
+        arg_names = inspect.getfullargspec(func).args
+    except AttributeError:
+        arg_names = inspect.getargspec(func).args
+    account_index = arg_names.index('account') \
+        if 'account' in arg_names else None
+
+    def wrapper(*args, **kwargs):
+        account = kwargs.get('account')
+        if account is None and account_index is not None and \
+                len(args) > account_index:
+            account = args[account_index]
+        frame = _call_begin(kind, name, account)
+        failed = True
+        try:
+            result = func(*args, **kwargs)
+            failed = False
+            return result
+        finally:
+            _call_end(frame, failed)
 
-    output = {}
+    #Salt maps arguments using the function signature, so it has to survive
+    if identical_signature_wrapper is not None:
+        return identical_signature_wrapper(func, wrapper)
+    return functools.wraps(func)(wrapper)
 
-    if delete_subdomains:
-        for subdomain in driver.get_subdomain_iterator(zone):
-            sub_name = subdomain.name
-            subdomain.delete()
-            output[sub_name] = True
 
-    zone.delete()
-    output[name] = True
+def stats(reset=False):
+    """
+    Returns the call stats of every instrumented function called since the
+    module was loaded or last reset.
 
+    :param reset: Boolean to clear the stats after reading them
+    :return: A dict keyed by "kind.function" of call and error counts and
+    histograms of wall time, requests, bytes in, bytes out, retries and
+    cache hits per call
+    """
+    with _STATS_LOCK:
+        output = dict((u'{0}.{1}'.format(kind, name), call_stats.to_dict())
+                      for (kind, name), call_stats in _STATS.items())
+        if reset:
+            _STATS.clear()
     return output
 
 
-def dns_record_list(zone_name):
+def stats_begin(kind, name, timeout=None):
     """
-    Returns a list of Records for the given DNS zone.
+    Starts recording a call made outside this module, like a state.
 
-    :param zone_name: A str/unicode object that represents the zone's name
-    Ex. example.com
+    :param kind: The kind of function. Ex. state
+    :param name: The function name
+    :param timeout: Seconds after which lookups made for the call give up
+    :return: A token to pass to stats_end
+    """
+    deadline = _clock() + timeout if timeout else None
+    return _call_begin(kind, name, deadline=deadline)
 
-    :return: A list of all records based on the zone name.
+
+def stats_end(token, failed=False):
     """
-    zone = _dns_zone_get_by_name(zone_name)
-    all_records = _dns_record_list(zone)
-    output = []
-    for record in all_records:
-        output.append(_dns_record_to_dict(record))
-    return output
+    Finishes recording a call started with stats_begin.
 
+    :param token: The token returned by stats_begin
+    :param failed: Boolean if the call raised an exception
+    :return: True
+    """
+    _call_end(token, failed)
+    return True
 
-def dns_record_create(name,
-                      zone_name,
-                      record_type,
-                      data,
-                      ttl=False,
-                      priority=None,
-                      comment=False):
+
+def stats_emit(tag=STATS_EVENT_TAG, reset=True):
     """
-    Creates the specified record.
-    :param zone_name: A str/unicode object that represents the zone's name
-    Ex. example.com
-    :param name: A str/unicode object that represents the record's name.
-    Ex subdomain.example.com
-    :param record_type: A sty/unicode object of a valid records type.
-    Ex. A AAAA CNAME etc
-    :param data: A str/unicode object that is the data associated with the
-    record. Ex. "127.0.0.1"
-    :param ttl: An integer  that represents the records ttl
-    :param priority: An integer that represents the MX/SRV priority
-    :param comment: A str/unicode object for the comment on the record
-    :return: A dict of the created record
+    Sends a summary of the call stats onto the Salt event bus.
+
+    :param tag: The event tag
+    :param reset: Boolean to clear the stats once sent, so each run reports
+    only its own calls
+    :return: The summary sent
     """
-    driver = _get_driver('dns')
-    assert isinstance(driver, pyrax.clouddns.CloudDNSClient)
+    summary = {}
+    for name, call_stats in stats(reset=reset).items():
+        summary[name] = {
+            'calls': call_stats['calls'],
+            'errors': call_stats['errors'],
+            'time': dict((key, call_stats['time'][key])
+                         for key in ('total', 'p50', 'p95', 'max')),
+        }
+        for field in ('requests', 'bytes_in', 'bytes_out', 'retries',
+                      'cache_hits'):
+            summary[name][field] = call_stats[field]['total']
+    __salt__['event.send'](tag, {'stats': summary})
+    return summary
+
+
+def single_flight_stats():
+    """
+    Reports how many read requests were sent and how many concurrent
+    identical reads were coalesced into them since the module was loaded.
 
-    if not _dns_is_valid_record_type(record_type):
-        raise TypeError(u"Not a valid record type: {}".format(record_type))
+    :return: A dict with calls, coalesced and in_flight counts
+    """
+    with _FLIGHT_LOCK:
+        output = dict(_FLIGHT_STATS)
+        output['in_flight'] = len(_IN_FLIGHT)
+    return output
 
-    record_dict = {
-        'type': record_type,
-        'name': name,
-        'data': data,
-    }
 
-    if ttl:
-        record_dict['ttl'] = ttl
+def hedge_stats():
+    """
+    Reports how many lookups were sent from the hedging threads since the
+    module was loaded, how many of them were hedged, how often the hedge
+    answered first and how many ran out of time.
 
-    if comment:
-        record_dict['comment'] = comment
+    :return: A dict with calls, hedged, hedge_won and deadline_exceeded
+    counts, and the latencies of each hedged helper
+    """
+    with _HEDGE_LOCK:
+        output = dict(_HEDGE_STATS)
+        output['latencies'] = dict((name, latencies.to_dict())
+                                   for name, latencies in
+                                   _HEDGE_LATENCIES.items())
+    return output
 
-    #looking for records valid for use with priority
-    if record_type in PRIORITY_RECORD_TYPES:
-        if priority is None:
-            raise ValueError("priority required for MX records")
-        else:
-            record_dict['priority'] = priority
 
-    dom = _dns_zone_get_by_name(name=zone_name)
-    recs = dom.add_records([record_dict])
-    return [_dns_record_to_dict(record) for record in recs]
+def circuit_breaker_stats():
+    """
+    Reports the circuit breaker of every service and region requests were
+    sent to since the module was loaded.
 
+    :return: A dict keyed by "service region" of the breaker state, the
+    recorded requests, how many of them failed or were slow and the seconds
+    until an open breaker probes the service again
+    """
+    with _BREAKER_LOCK:
+        breakers = list(_BREAKERS.items())
+    return dict((u'{0} {1}'.format(service, region), breaker.to_dict())
+                for (service, region), breaker in breakers)
 
-def dns_record_exists(name,
-                      zone_name,
-                      record_type,
-                      data,
-                      ttl=False,
-                      priority=False):
+
+### CLOUD SERVERS
+def cs_images_list(regions=None, accounts=None, account=None):
     """
-    Determines if a DNS Record exists on this account.
-    :param zone_name: A str/unicode object that represents the zone's name
-    Ex. example.com
-    :param name: A str/unicode object that represents the record's name.
-    Ex subdomain.example.com
-    :param record_type: A sty/unicode object of a valid records type.
-    Ex. A AAAA CNAME etc
-    :param data: A str/unicode object that is the data associated with the
-    record. Ex. "127.0.0.1"
-    :param ttl: An integer  that represents the records ttl
-    :param priority: An integer that represents the MX/SRV priority
-    :return: True/False if the specified record is found.
+    Generated a list of all cloud server images in the default region
+    :param regions: 'ALL' or a list of regions to query concurrently instead
+    of the default region
+    :param accounts: 'ALL' or a list of accounts to query concurrently instead
+    of the default account. The result is then keyed by account.
+    :return: A list of image names, keyed by region if regions is provided
     """
-    try:
-        records = _dns_record_get_by_name(name=name,
-                                          zone_name=zone_name,
-                                          record_type=record_type,
-                                          data=data)
-    except exc.NotFound:
-        return False
+    if accounts is not None:
+        return _merge_account_results(_fan_out_accounts(
+            accounts,
+            lambda name: cs_images_list(regions=regions, account=name)))
+    if regions is not None:
+        return dict(_fan_out_regions('cs', regions, _cs_images_list))
+    return _cs_images_list()
 
-    #comparing specific values for records since we can only search by type,
-    # name and data
-    for record in records:
-        found = True
-        if ttl:
-            if record.ttl != ttl:
-                found = False
 
-        if priority:
-            if record_type in PRIORITY_RECORD_TYPES:
-                if record.priority != priority:
-                    found = False
-            else:
-                logger.warning(u'Record type does not use priority: {}'.format(
-                    record_type))
+def _cs_images_list(region='DFW'):
+    driver = _get_driver('cs', region)
+    output = []
+    for image in driver.images.list():
+        output.append(image.name)
+    return {'images': output}
 
-        if found:
-            return True
 
-    return False
+def cs_flavors_list(regions=None, accounts=None, account=None):
+    """
+    Generated a list of all cloud server flavors in the default region
+    :param regions: 'ALL' or a list of regions to query concurrently instead
+    of the default region
+    :param accounts: 'ALL' or a list of accounts to query concurrently instead
+    of the default account. The result is then keyed by account.
+    :return: A list of flavor names, keyed by region if regions is provided
+    """
+    if accounts is not None:
+        return _merge_account_results(_fan_out_accounts(
+            accounts,
+            lambda name: cs_flavors_list(regions=regions, account=name)))
+    if regions is not None:
+        return dict(_fan_out_regions('cs', regions, _cs_flavors_list))
+    return _cs_flavors_list()
 
 
-def dns_record_update(name,
-                      zone_name,
-                      record_type,
-                      data,
-                      ttl=False,
-                      priority=False,
-                      comment=''):
+def _cs_flavors_list(region='DFW'):
+    driver = _get_driver('cs', region)
+    return {'flavors': [flavor.name for flavor in driver.flavors.list()]}
+
+
+def cs_server_list(region='DFW', accounts=None, account=None):
     """
-    Updates a record that matches the specified zone and record type
-    :param zone_name: A str/unicode object that represents the zone's name
-    Ex. example.com
-    :param name: A str/unicode object that represents the record's name.
-    Ex subdomain.example.com
-    :param record_type: A sty/unicode object of a valid records type.
-    Ex. A AAAA CNAME etc
-    :param data: A str/unicode object that is the data associated with the
-    record. Ex. "127.0.0.1"
-    :param ttl: An integer  that represents the records ttl
-    :param priority: An integer that represents the MX/SRV priority
-    :param comment: A str/unicode object for the comment on the record
-    :return: A dict of the now updated record
+    Lists all cloud servers with a single detailed listing
+    :param region: The region of the servers
+    :param accounts: 'ALL' or a list of accounts to query concurrently instead
+    of the default account. Each result is then tagged with its account.
+    :return: A list of server dicts
     """
-    record = _dns_record_get_by_name(name, zone_name, record_type,
-                                     allow_multiple_records=False)[0]
-    assert isinstance(record, pyrax.clouddns.CloudDNSRecord)
-
-    record.update(data=data, priority=priority, ttl=ttl, comment=comment)
-    return _dns_record_to_dict(record)
+    if accounts is not None:
+        return _merge_account_results(_fan_out_accounts(
+            accounts,
+            lambda name: cs_server_list(region=region, account=name)))
+    driver = _get_driver('cs', region, account)
+    return [_cs_server_to_dict(server)
+            for server in driver.servers.list(detailed=True)]
+
+
+def cs_servers_create(names, image, flavor, networks=None, metadata=None,
+                      region='DFW', timeout=CS_BUILD_TIMEOUT,
+                      fire_events=False, account=None):
+    """
+    Creates servers concurrently and waits for them to become ACTIVE.
+
+    All builds are tracked by a single polling loop over the detailed server
+    listing rather than by polling each server.
+
+    :param names: A list of server names to create
+    :param image: The name or id of the image
+    :param flavor: The name or id of the flavor
+    :param networks: A list of network labels or ids, or public/private
+    :param metadata: A dict of metadata to set on each server
+    :param region: The region to create the servers in
+    :param timeout: Seconds to wait for the builds to finish
+    :param fire_events: Boolean to fire a rackspace/cs/server/active event
+    with the addresses of each server as soon as it is ACTIVE
+    :return: A dict with the created servers keyed by name and the servers
+    that failed keyed by name with the error
+    """
+    driver = _get_driver('cs', region, account)
+    image_id = _cs_resolve(driver.images.list(), image, u'image')
+    flavor_id = _cs_resolve(driver.flavors.list(), flavor, u'flavor')
+    nics = [{'net-id': net_id} for net_id in _net_resolve(networks, region)]
 
+    def create(name):
+        try:
+            server = driver.servers.create(name, image_id, flavor_id,
+                                           meta=metadata, nics=nics or None)
+            return server, None
+        except Exception as e:
+            logger.error(u'Unable to create server {0}: {1}'.format(name, e))
+            return None, e
+
+    failed = {}
+    building = {}
+    for name, (server, error) in zip(names, _parallel_map(create, names)):
+        if error is not None:
+            failed[name] = six.text_type(error)
+        else:
+            building[server.id] = name
 
-def dns_record_delete(name, zone_name, record_type):
-    record = _dns_record_get_by_name(name, zone_name, record_type)
-    record.delete()
-    return True
+    active, errors = _cs_servers_wait(driver, building, timeout,
+                                      fire_events=fire_events)
+    failed.update(errors)
+    return {'servers': active, 'failed': failed}
 
 
-def _dns_record_get_by_name(name,
-                            zone_name,
-                            record_type,
-                            data=None,
-                            allow_multiple_records=True):
+def _cs_servers_wait(driver, building, timeout=CS_BUILD_TIMEOUT,
+                     fire_events=False):
     """
-    Finds a record based on the record name
+    Waits for servers to finish building with one detailed listing per
+    interval for all of them.
+
+    :param driver: A cloud servers driver
+    :param building: A dict of server id to server name
+    :param timeout: Seconds to wait for all builds
+    :param fire_events: Boolean to fire an event for each ACTIVE server
+    :return: A tuple of a dict of ACTIVE server dicts keyed by name and a dict
+    of errors keyed by name
+    """
+    pending = dict(building)
+    active = {}
+    errors = {}
+    deadline = time.time() + timeout
+    while pending:
+        for server in driver.servers.list(detailed=True):
+            name = pending.get(server.id)
+            if name is None:
+                continue
+            if server.status == 'ACTIVE':
+                del pending[server.id]
+                active[name] = _cs_server_to_dict(server)
+                logger.info(u'Server {0} is ACTIVE'.format(name))
+                if fire_events:
+                    __salt__['event.fire'](active[name],
+                                           'rackspace/cs/server/active')
+            elif server.status == 'ERROR':
+                del pending[server.id]
+                errors[name] = u'Server build failed'
+        if not pending:
+            break
+        if time.time() >= deadline:
+            for name in pending.values():
+                errors[name] = u'Timed out waiting for build'
+            break
+        time.sleep(CS_POLL_INTERVAL)
+    return active, errors
 
-    :param zone_name: A str/unicode object that represents the zone's name
-    Ex. example.com
-    :param name: A str/unicode object that represents the record's name.
-    Ex subdomain.example.com
-    :param record_type: A sty/unicode object of a valid records type.
-    Ex. A AAAA CNAME etc
-    :param data: A str/unicode object that is the data associated with the
-    record. Ex. "127.0.0.1"
-    :param allow_multiple_records: Boolean that determines if multiple records
-     should occur with the same record name
-     and type
-    :return: A list of DNS Record objects that match the specified names,
-    type and data
+
+def _cs_resolve(items, name_or_id, kind):
     """
-    try:
-        zone = _dns_zone_get_by_name(zone_name)
-        assert isinstance(zone, pyrax.clouddns.CloudDNSDomain)
-    except exc.NotFound as e:
-        error_msg = u"Zone Not Found: {}".format(zone_name)
-        logger.error(error_msg)
-        raise e
+    Finds the id of an image or flavor by name or id
+    :raise ValueError: If nothing matches
+    """
+    for item in items:
+        if name_or_id in (item.id, item.name):
+            return item.id
+    raise ValueError(u'No {0} found by: {1}'.format(kind, name_or_id))
 
-    #Checking if the record is of valid type
-    if not _dns_is_valid_record_type(record_type):
-        error_msg = u"Not Valid Record Type: {}".format(record_type)
-        logger.error(error_msg)
-        raise TypeError(error_msg)
-    record_type = record_type.upper()
 
-    if allow_multiple_records:
-        records = zone.search_records(record_type, name=name, data=data)
-    else:
-        try:
-            records = [
-                zone.find_record(record_type, name=name, data=data)]
-        except exc.DomainRecordNotUnique:
-            logger.warning(
-                u'Multiple records found for {}: {}: {}'.format(name,
-                                                                record_type,
-                                                                data))
-            raise
-    return records
+def _cs_server_to_dict(server):
+    """
+    Renders a cloud server as a dict
+    :param server: A novaclient server object
+    :return: A dict
+    """
+    addresses = dict(
+        (network, [address['addr'] for address in entries])
+        for network, entries in (getattr(server, 'addresses', None) or
+                                 {}).items())
+    return {
+        'name': server.name,
+        'id': server.id,
+        'status': server.status,
+        'accessIPv4': getattr(server, 'accessIPv4', None),
+        'accessIPv6': getattr(server, 'accessIPv6', None),
+        'addresses': addresses,
+        'metadata': getattr(server, 'metadata', {}),
+    }
 
 
-def _dns_zone_get_by_name(name):
+###CLOUD LBS
+def lb_list(regions=None, accounts=None, account=None):
     """
-    Returns a DNS Domain object matching the specified name.
+    Generates a list of dicts of all load balancers in a given region
+    :param regions: 'ALL' or a list of regions to query concurrently instead
+    of the default region
+    :param accounts: 'ALL' or a list of accounts to query concurrently instead
+    of the default account. The result is then keyed by account.
+    :return: A dict keyed by name of the LB, keyed by region first if regions
+    is provided
+    """
+    if accounts is not None:
+        return _merge_account_results(_fan_out_accounts(
+            accounts, lambda name: lb_list(regions=regions, account=name)))
+    if regions is not None:
+        return dict(_fan_out_regions('lb', regions, _lb_list))
+    return _lb_list()
 
-    :param name: A Str/unicode object of the zone name.
-    :return: Returns a DNS Domain object matching the specified name.
+
+def _lb_list(region='DFW'):
+    driver = _get_driver('lb', region)
+    output = {}
+    for lb in driver.list():
+        out = {lb.name: {'port': lb.port, 'status': lb.status}}
+        output.update(out)
+    return output
+
+
+def lb_get(name, region='DFW', account=None):
     """
-    driver = _get_driver('dns')
-    assert isinstance(driver, pyrax.clouddns.CloudDNSClient)
+    Retrieves a load balancer by name
+    :param name: The name of the load balancer
+    :param region: The region of the load balancer
+    :return: A dict representation of the load balancer
+    """
+    cached = _prefetched('lb', name, region)
+    if cached is not None:
+        return cached
+    return _lb_to_dict(_lb_get_by_name(name, region))
 
+
+def lb_exists(name, port=None, protocol=None, region='DFW', account=None):
+    """
+    Determines if a load balancer exists
+    :param name: The name of the load balancer
+    :param port: If provided the port must match as well
+    :param protocol: If provided the protocol must match as well
+    :param region: The region of the load balancer
+    :return: True/False if the load balancer is found
+    """
     try:
-        dom = driver.find(name=name)
+        lb = _lb_find_by_name(name, region)
     except exc.NotFound:
-        logger.error(u"No Zone found for {}".format(name))
-        raise
-    return dom
+        return False
 
+    if port is not None and lb.port != port:
+        return False
 
-def _dns_record_list(zone):
-    """
-    Returns a list of DNS Record objects for the specified zone
+    if protocol is not None and lb.protocol != protocol.upper():
+        return False
 
-    :param zone: A pyrax DNS Domain object
-    :return: A list of DNS Record objects
+    return True
+
+
+def lb_create(name, port, protocol, virtual_ips='PUBLIC', nodes=None,
+              algorithm=None, region='DFW', account=None):
     """
-    driver = _get_driver('dns')
-    assert isinstance(driver, pyrax.clouddns.CloudDNSClient)
-    all_records = list(driver.get_record_iterator(zone))
+    Creates a load balancer and waits for it to become ACTIVE
+    :param name: The name of the load balancer
+    :param port: The port the load balancer listens on
+    :param protocol: The protocol of the load balancer. Ex. HTTP
+    :param virtual_ips: PUBLIC or SERVICENET
+    :param nodes: A list of node dicts with address, port and optionally
+    condition and weight, or "address:port" strings. Nodes are ENABLED unless
+    they set a condition.
+    :param algorithm: The balancing algorithm. Ex. ROUND_ROBIN
+    :param region: The region to create the load balancer in
+    :return: A dict representation of the created load balancer
+    :raise ValueError: If a load balancer with that name exists
+    """
+    _prefetch_evict('lb', [name], region)
+    driver = _get_driver('lb', region, account)
 
-    return all_records
+    if lb_exists(name, region=region, account=account):
+        raise ValueError(u"Load balancer Already Exists")
 
+    kwargs = {
+        'port': port,
+        'protocol': protocol.upper(),
+        'virtual_ips': [driver.VirtualIP(type=virtual_ips.upper())],
+    }
+    if nodes:
+        kwargs['nodes'] = [driver.Node(**_lb_node_new(node))
+                           for node in _lb_nodes_normalize(nodes).values()]
+    if algorithm:
+        kwargs['algorithm'] = algorithm.upper()
+
+    lb = driver.create(name, **kwargs)
+    pyrax.utils.wait_until(lb, "status", "ACTIVE", interval=1,
+                           attempts=TIMEOUT)
+    return _lb_to_dict(lb)
 
-def _dns_zone_list():
-    """
-    Returns a list of all domains for the configured account
 
-    :return: A list of DNS Domain objects
+def lb_delete(name, region='DFW', account=None):
     """
-    driver = _get_driver('dns')
-    assert isinstance(driver, pyrax.clouddns.CloudDNSClient)
-    all_zones = driver.list(limit=PAGE_SIZE)
-    while True:
-        try:
-            all_zones += driver.list_next_page()
-        except exc.NoMoreResults:
-            break
-    return all_zones
+    Deletes a load balancer
+    :param name: The name of the load balancer
+    :param region: The region of the load balancer
+    :return: True if the load balancer was deleted
+    """
+    _prefetch_evict('lb', [name], region)
+    lb = _lb_find_by_name(name, region)
+    lb.delete()
+    return True
 
 
-def _dns_zone_to_dict(zone, show_records=False):
+def lb_nodes_list(name, region='DFW', account=None):
     """
-    Renders a DNS Zone as a dict
+    Lists the nodes of a load balancer
+    :param name: The name of the load balancer
+    :param region: The region of the load balancer
+    :return: A list of node dicts
+    """
+    lb = _lb_get_by_name(name, region)
+    return [_lb_node_to_dict(node) for node in lb.nodes]
 
-    :param zone: A pyrax DNS Domain object
-    :param show_records: Boolean to determine if records of the zone should be
-    included in output
-    :return: A dict
+
+def lb_nodes_sync(name, nodes, region='DFW', remove_unlisted=True,
+                  test=False, account=None):
+    """
+    Makes the node pool of a load balancer match the provided nodes.
+
+    The current pool is read from a single load balancer lookup. All missing
+    nodes are added in one request and unlisted nodes are removed with bulk
+    deletes of up to LB_BULK_DELETE_LIMIT nodes each. Every change waits for
+    the load balancer to leave PENDING_UPDATE before it is sent.
+
+    Condition and weight changes of existing nodes aren't batched: the API
+    updates one node per request, so draining or re-enabling N nodes takes N
+    updates, each waiting for the load balancer. They aren't folded into a
+    bulk delete and add either, which would drop the connections draining is
+    meant to let finish.
+
+    :param name: The name of the load balancer
+    :param nodes: A list of node dicts with address, port and optionally
+    condition and weight, or "address:port" strings. Added nodes are ENABLED
+    unless they set a condition, the condition of existing nodes is only
+    changed if they set one.
+    :param region: The region of the load balancer
+    :param remove_unlisted: Boolean to remove nodes not present in nodes
+    :param test: Boolean to only report the changes that would be made
+    :return: A dict of the added, updated and removed nodes
     """
+    _prefetch_evict('lb', [name], region)
+    driver = _get_driver('lb', region, account)
+    lb = _lb_get_by_name(name, region)
+
+    desired = _lb_nodes_normalize(nodes)
+    current = dict(((node.address, node.port), node)
+                   for node in getattr(lb, 'nodes', []))
+
+    to_add = [_lb_node_new(spec) for key, spec in desired.items()
+              if key not in current]
+    to_update = []
+    for key, node in current.items():
+        spec = desired.get(key)
+        if spec is None:
+            continue
+        changed = dict((field, value) for field, value in spec.items()
+                       if field in ('condition', 'weight') and
+                       getattr(node, field, None) != value)
+        if changed:
+            to_update.append((node, changed))
+    to_remove = []
+    if remove_unlisted:
+        to_remove = [node for key, node in current.items()
+                     if key not in desired]
+
     output = {
-        'name': zone.name,
-        'nameservers': [ns['name'] for ns in zone.nameservers],
-        'id': zone.id,
-        'email': zone.emailAddress,
-        'ttl': zone.ttl,
+        'added': to_add,
+        'updated': [dict(_lb_node_to_dict(node), **changed)
+                    for node, changed in to_update],
+        'removed': [_lb_node_to_dict(node) for node in to_remove],
     }
+    if test:
+        return output
+
+    changes = []
+    if to_add:
+        changes.append(lambda: lb.add_nodes(
+            [driver.Node(**spec) for spec in to_add]))
+    for node, changed in to_update:
+        changes.append(_lb_node_update_change(node, changed))
+    for start in range(0, len(to_remove), LB_BULK_DELETE_LIMIT):
+        batch = to_remove[start:start + LB_BULK_DELETE_LIMIT]
+        changes.append(_lb_bulk_delete_change(driver, lb, batch))
+
+    _lb_apply_changes(lb, changes)
+    return output
 
-    if show_records:
-        output['records'] = [_dns_record_to_dict(record) for record in
-                             _dns_record_list(zone)]
 
+def lb_stats(names=None, region='DFW', account=None):
+    """
+    Collects the stats and current usage of load balancers concurrently
+    :param names: A list of load balancer names, all load balancers if None
+    :param region: The region of the load balancers
+    :return: A dict of stats keyed by load balancer name
+    """
+    driver = _get_driver('lb', region, account)
+    lbs = [lb for lb in driver.list() if names is None or lb.name in names]
+    samples = _parallel_map(lambda lb: _lb_stats_sample(driver, lb), lbs)
+    return dict((lb.name, sample) for lb, sample in zip(lbs, samples))
+
+
+def lb_stats_poll(region='DFW', names=None, max_age=LB_STATS_MAX_AGE,
+                  history=LB_STATS_HISTORY, account=None):
+    """
+    Incrementally samples load balancer stats and returns what changed since
+    the previous poll.
+
+    Each poll lists the load balancers once. Only load balancers that are new,
+    whose status or update time changed, or whose last sample is older than
+    max_age are sampled, concurrently. Samples are kept in a ring buffer of
+    the given size per load balancer in __context__.
+
+    :param region: The region of the load balancers
+    :param names: A list of load balancer names, all load balancers if None
+    :param max_age: Seconds after which an unchanged load balancer is sampled
+    :param history: The number of samples kept per load balancer
+    :return: A dict keyed by load balancer name of the stats that changed.
+    Counters are reported as deltas, gauges as their new value.
+    """
+    driver = _get_driver('lb', region, account)
+    polls = __context__.setdefault('rackspace.lb_stats', {})
+    known = polls.setdefault((_account(account)[0], region.upper()), {})
+    now = time.time()
+
+    due = []
+    seen = set()
+    for lb in driver.list():
+        if names is not None and lb.name not in names:
+            continue
+        seen.add(lb.id)
+        version = (lb.status, _lb_updated(lb))
+        entry = known.get(lb.id)
+        if entry is None or entry['samples'].maxlen != history:
+            previous = entry['samples'] if entry else []
+            entry = known[lb.id] = {
+                'version': None,
+                'sampled': 0,
+                'samples': collections.deque(previous, maxlen=history),
+            }
+        if entry['version'] != version or now - entry['sampled'] >= max_age:
+            entry['version'] = version
+            due.append(lb)
+
+    for lb_id in set(known) - seen:
+        del known[lb_id]
+
+    samples = _parallel_map(lambda lb: _lb_stats_sample(driver, lb), due)
+
+    output = {}
+    for lb, sample in zip(due, samples):
+        entry = known[lb.id]
+        previous = entry['samples'][-1] if entry['samples'] else None
+        entry['samples'].append(sample)
+        entry['sampled'] = now
+        delta = _lb_stats_delta(previous, sample)
+        if delta:
+            output[lb.name] = delta
     return output
 
 
-def _dns_record_to_dict(record):
+def _lb_stats_sample(driver, lb):
     """
-    Renders a DNS record object as a dict
+    Reads the stats and current usage of a load balancer
+    :param driver: A load balancer driver
+    :param lb: A pyrax load balancer object
+    :return: A dict of stats fields, status and sample time
+    """
+    sample = dict(driver.get_stats(lb))
+    _, body = driver.method_get(
+        u'/loadbalancers/{0}/usage/current'.format(lb.id))
+    records = (body or {}).get('loadBalancerUsageRecords') or [{}]
+    for field in ('incomingTransfer', 'outgoingTransfer',
+                  'averageNumConnections'):
+        sample[field] = records[-1].get(field, 0)
+    sample['status'] = lb.status
+    sample['time'] = time.time()
+    return sample
+
+
+def _lb_stats_delta(previous, sample):
+    """
+    Computes the compact difference between two stats samples
+    :param previous: The previous sample dict or None
+    :param sample: The new sample dict
+    :return: A dict of the changed fields only
+    """
+    delta = {}
+    if previous is None or previous['status'] != sample['status']:
+        delta['status'] = sample['status']
+    for field, value in sample.items():
+        if field in ('status', 'time') or not isinstance(value, (int, float)):
+            continue
+        old = previous.get(field, 0) if previous else 0
+        if field in LB_STATS_GAUGES:
+            if previous is None or value != old:
+                delta[field] = value
+        elif value != old:
+            #Counters that went down were reset so the new value is the delta
+            delta[field] = value - old if value > old else value
+    return delta
+
+
+def _lb_updated(lb):
+    updated = getattr(lb, 'updated', None)
+    if isinstance(updated, dict):
+        return updated.get('time')
+    return updated
+
+
+@_single_flight
+def _lb_find_by_name(name, region='DFW'):
+    """
+    Finds a load balancer by name from the load balancer listing
+    :param name: The name of the load balancer
+    :param region: The region of the load balancer
+    :return: A pyrax load balancer object without node details
+    :raise NotFound: If no load balancer has that name
+    """
+    driver = _get_driver('lb', region)
+    for lb in driver.list():
+        if lb.name == name:
+            return lb
+    raise exc.NotFound(404, u'Load balancer {0} not found.'.format(name))
 
-    :param record: A pyrax DNS record object
-    :return: A DNS record rendered as a dict. Keyed by the record name.
+
+def _lb_get_by_name(name, region='DFW'):
     """
-    assert isinstance(record, pyrax.clouddns.CloudDNSRecord)
-    output = {'name': record.name, 'data': record.data, 'type': record.type,
-              'ttl': record.ttl, 'id': record.id}
+    Retrieves the full details, including nodes, of a load balancer by name
+    :param name: The name of the load balancer
+    :param region: The region of the load balancer
+    :return: A pyrax load balancer object
+    """
+    driver = _get_driver('lb', region)
+    return driver.get(_lb_find_by_name(name, region).id)
+
+
+def _lb_nodes_normalize(nodes):
+    """
+    Converts node specs to dicts keyed by (address, port)
+    :param nodes: A list of node dicts or "address:port" strings
+    :return: A dict of (address, port) to node spec dicts
+    :raise ValueError: If a node is missing its address or port
+    """
+    output = {}
+    for node in nodes:
+        if isinstance(node, six.string_types):
+            address, _, port = node.rpartition(':')
+            node = {'address': address, 'port': port}
+        spec = dict(node)
+        if not spec.get('address') or not spec.get('port'):
+            raise ValueError(u'Nodes require an address and port: {}'.format(
+                node))
+        spec['port'] = int(spec['port'])
+        #No default, so nodes drained or disabled out of band stay so
+        if spec.get('condition') is None:
+            spec.pop('condition', None)
+        else:
+            spec['condition'] = spec['condition'].upper()
+            if spec['condition'] not in LB_NODE_CONDITIONS:
+                raise ValueError(u'Not a valid node condition: {}'.format(
+                    spec['condition']))
+        output[(spec['address'], spec['port'])] = spec
+    return output
+
+
+def _lb_node_new(spec):
+    """
+    :return: The spec of a node to add, ENABLED unless it sets a condition
+    """
+    if 'condition' not in spec:
+        return dict(spec, condition='ENABLED')
+    return spec
+
+
+def _lb_node_update_change(node, changed):
+    def change():
+        for field, value in changed.items():
+            setattr(node, field, value)
+        node.update()
+    return change
+
+
+def _lb_bulk_delete_change(driver, lb, nodes):
+    def change():
+        query = six.moves.urllib.parse.urlencode(
+            [('id', node.id) for node in nodes])
+        driver.method_delete(u'/loadbalancers/{0}/nodes?{1}'.format(lb.id,
+                                                                    query))
+    return change
+
+
+def _lb_apply_changes(lb, changes):
+    """
+    Applies queued changes one after another, each once the load balancer is
+    ACTIVE again. Changes rejected with a 422 because the load balancer is
+    still immutable are retried until TIMEOUT.
+
+    :param lb: A pyrax load balancer object
+    :param changes: A list of callables that each send one request
+    """
+    for change in changes:
+        for attempt in range(TIMEOUT):
+            pyrax.utils.wait_until(lb, "status", "ACTIVE", interval=1,
+                                   attempts=TIMEOUT)
+            try:
+                change()
+                break
+            except exc.ClientException as e:
+                if getattr(e, 'code', None) != 422 or attempt == TIMEOUT - 1:
+                    raise
+                logger.debug(u'Load balancer {0} is immutable, retrying: '
+                             u'{1}'.format(lb.name, e))
+                time.sleep(1)
+
+
+def _lb_node_to_dict(node):
+    return {
+        'id': node.id,
+        'address': node.address,
+        'port': node.port,
+        'condition': node.condition,
+        'weight': getattr(node, 'weight', None),
+        'status': getattr(node, 'status', None),
+    }
+
+
+def _lb_to_dict(lb):
+    """
+    Renders a load balancer as a dict
+    :param lb: A pyrax load balancer object
+    :return: A dict
+    """
+    return {
+        'name': lb.name,
+        'id': lb.id,
+        'port': lb.port,
+        'protocol': lb.protocol,
+        'algorithm': lb.algorithm,
+        'status': lb.status,
+        'virtual_ips': [vip.address for vip in lb.virtual_ips],
+        'nodes': [_lb_node_to_dict(node) for node in getattr(lb, 'nodes', [])],
+    }
+
+
+### CLOUD DNS
+def dns_zone_list(show_records=False, accounts=None, account=None):
+    """
+    Generate a list of all DNS Domains on this account
+    :param show_records: Boolean if the listed zones should display all of
+    their records
+    :param accounts: 'ALL' or a list of accounts to query concurrently instead
+    of the default account. Each result is then tagged with its account.
+    :return:
+    """
+    if accounts is not None:
+        return _merge_account_results(_fan_out_accounts(
+            accounts,
+            lambda name: dns_zone_list(show_records=show_records,
+                                       account=name)))
+    driver = _get_driver('dns', account=account)
+    assert isinstance(driver, pyrax.clouddns.CloudDNSClient)
+    output = []
+    for zone in _dns_zone_list():
+        output.append(_dns_zone_to_dict(zone, show_records))
     return output
 
 
-def _dns_is_valid_record_type(record_type):
+def dns_zone_create(name, email_address, ttl=False, account=None):
+    """
+    Crease the specified DNS zone
+    :param name: Name of the DNS zone
+    :param email_address: Email address to associate with the zone
+    :param ttl: Default ttl value for all records on the zone
+    :return: A dict representation of the created zone
+    """
+    _prefetch_evict('dns_zone', [name])
+    driver = _get_driver('dns', account=account)
+    assert isinstance(driver, pyrax.clouddns.CloudDNSClient)
+
+    if not ttl:
+        dom = driver.create(name=name, emailAddress=email_address)
+    else:
+        dom = driver.create(name=name, emailAddress=email_address, ttl=ttl)
+    return _dns_zone_to_dict(dom)
+
+
+def dns_zone_exists(name, account=None, **kwargs):
+    """
+    Determines if a dns Zone exists
+    :param name: Name of the dns zone
+    :param kwargs:
+    :return:
+    """
+    try:
+        zone = _dns_zone_get_by_name(name)
+    except exc.NotFound:
+        return False
+
+    email_address = kwargs.get('email_address', zone.emailAddress)
+    ttl = kwargs.get('ttl', zone.ttl)
+
+    if zone.ttl != ttl or zone.emailAddress != email_address:
+        return False
+
+    return True
+
+
+def dns_zone_update(name, account=None, **kwargs):
+    """
+    Updates a dns zone based on the provided kwargs
+    :param name: The name of the zone
+    :param kwargs: email_address, ttl
+    :return: A dict of the updated zone
+    """
+    _prefetch_evict('dns_zone', [name])
+    zone = _dns_zone_get_by_name(name)
+    assert isinstance(zone, pyrax.clouddns.CloudDNSDomain)
+
+    field_types = ['emailAddress', 'ttl']
+
+    if not set(field_types).intersection(set(kwargs)):
+        raise TypeError(
+            u"Must provide one of the following: {}".format(field_types))
+
+    comment = kwargs.get('comment', '')
+    email_address = kwargs.get('email_address', zone.emailAddress)
+    ttl = kwargs.get('ttl', zone.ttl)
+
+    if ttl < MINIMUM_TTL:
+        raise ValueError(u'ttl has a minimum value of {}'.format(MINIMUM_TTL))
+
+    zone.update(emailAddress=email_address, ttl=ttl, comment=comment)
+    zone.reload()
+    return _dns_zone_to_dict(zone)
+
+
+def dns_zone_get(name, show_records=False, account=None):
+    """
+    Retrieves a specific DNS zone by name
+    :param name: The name of the zone
+    :return: A dict of the zone.
+    """
+    if not show_records:
+        cached = _prefetched('dns_zone', name)
+        if cached is not None:
+            return cached
+
+    zone = _dns_zone_get_by_name(name)
+    assert isinstance(zone, pyrax.clouddns.CloudDNSDomain)
+    return _dns_zone_to_dict(zone, show_records=show_records)
+
+
+def dns_zone_delete(name, delete_subdomains=False, account=None):
+    """
+    Removes specified dns zone
+    :param name: The name of the zone
+    :param delete_subdomains: Determines if subdomains should be deleted
+    :return: A Dict with all the names of a zones dealt with
+    """
+    _prefetch_evict('dns_zone', [name])
+    driver = _get_driver('dns', account=account)
+    assert isinstance(driver, pyrax.clouddns.CloudDNSClient)
+
+    try:
+        zone = _dns_zone_get_by_name(name)
+    except exc.NotFound:
+        raise
+    assert isinstance(zone, pyrax.clouddns.CloudDNSDomain)
+
+    output = {}
+
+    if delete_subdomains:
+        for subdomain in driver.get_subdomain_iterator(zone):
+            sub_name = subdomain.name
+            subdomain.delete()
+            output[sub_name] = True
+
+    zone.delete()
+    output[name] = True
+
+    return output
+
+
+def dns_record_list(zone_name, account=None):
+    """
+    Returns a list of Records for the given DNS zone.
+
+    :param zone_name: A str/unicode object that represents the zone's name
+    Ex. example.com
+
+    :return: A list of all records based on the zone name.
+    """
+    zone = _dns_zone_get_by_name(zone_name)
+    all_records = _dns_record_list(zone)
+    output = []
+    for record in all_records:
+        output.append(_dns_record_to_dict(record))
+    return output
+
+
+def dns_record_create(name,
+                      zone_name,
+                      record_type,
+                      data,
+                      ttl=False,
+                      priority=None,
+                      comment=False, account=None):
+    """
+    Creates the specified record.
+    :param zone_name: A str/unicode object that represents the zone's name
+    Ex. example.com
+    :param name: A str/unicode object that represents the record's name.
+    Ex subdomain.example.com
+    :param record_type: A sty/unicode object of a valid records type.
+    Ex. A AAAA CNAME etc
+    :param data: A str/unicode object that is the data associated with the
+    record. Ex. "127.0.0.1"
+    :param ttl: An integer  that represents the records ttl
+    :param priority: An integer that represents the MX/SRV priority
+    :param comment: A str/unicode object for the comment on the record
+    :return: A dict of the created record
+    """
+    _prefetch_evict('dns_zone', [zone_name])
+    driver = _get_driver('dns', account=account)
+    assert isinstance(driver, pyrax.clouddns.CloudDNSClient)
+
+    if not _dns_is_valid_record_type(record_type):
+        raise TypeError(u"Not a valid record type: {}".format(record_type))
+
+    record_dict = {
+        'type': record_type,
+        'name': name,
+        'data': data,
+    }
+
+    if ttl:
+        record_dict['ttl'] = ttl
+
+    if comment:
+        record_dict['comment'] = comment
+
+    #looking for records valid for use with priority
+    if record_type in PRIORITY_RECORD_TYPES:
+        if priority is None:
+            raise ValueError("priority required for MX records")
+        else:
+            record_dict['priority'] = priority
+
+    dom = _dns_zone_get_by_name(name=zone_name)
+    recs = dom.add_records([record_dict])
+    return [_dns_record_to_dict(record) for record in recs]
+
+
+def dns_record_exists(name,
+                      zone_name,
+                      record_type,
+                      data,
+                      ttl=False,
+                      priority=False, account=None):
+    """
+    Determines if a DNS Record exists on this account.
+    :param zone_name: A str/unicode object that represents the zone's name
+    Ex. example.com
+    :param name: A str/unicode object that represents the record's name.
+    Ex subdomain.example.com
+    :param record_type: A sty/unicode object of a valid records type.
+    Ex. A AAAA CNAME etc
+    :param data: A str/unicode object that is the data associated with the
+    record. Ex. "127.0.0.1"
+    :param ttl: An integer  that represents the records ttl
+    :param priority: An integer that represents the MX/SRV priority
+    :return: True/False if the specified record is found.
+    """
+    try:
+        records = _dns_record_get_by_name(name=name,
+                                          zone_name=zone_name,
+                                          record_type=record_type,
+                                          data=data)
+    except exc.NotFound:
+        return False
+
+    #comparing specific values for records since we can only search by type,
+    # name and data
+    for record in records:
+        found = True
+        if ttl:
+            if record.ttl != ttl:
+                found = False
+
+        if priority:
+            if record_type in PRIORITY_RECORD_TYPES:
+                if record.priority != priority:
+                    found = False
+            else:
+                logger.warning(u'Record type does not use priority: {}'.format(
+                    record_type))
+
+        if found:
+            return True
+
+    return False
+
+
+def dns_record_update(name,
+                      zone_name,
+                      record_type,
+                      data,
+                      ttl=False,
+                      priority=False,
+                      comment='', account=None):
+    """
+    Updates a record that matches the specified zone and record type
+    :param zone_name: A str/unicode object that represents the zone's name
+    Ex. example.com
+    :param name: A str/unicode object that represents the record's name.
+    Ex subdomain.example.com
+    :param record_type: A sty/unicode object of a valid records type.
+    Ex. A AAAA CNAME etc
+    :param data: A str/unicode object that is the data associated with the
+    record. Ex. "127.0.0.1"
+    :param ttl: An integer  that represents the records ttl
+    :param priority: An integer that represents the MX/SRV priority
+    :param comment: A str/unicode object for the comment on the record
+    :return: A dict of the now updated record
+    """
+    _prefetch_evict('dns_zone', [zone_name])
+    record = _dns_record_get_by_name(name, zone_name, record_type,
+                                     allow_multiple_records=False)[0]
+    assert isinstance(record, pyrax.clouddns.CloudDNSRecord)
+
+    record.update(data=data, priority=priority, ttl=ttl, comment=comment)
+    return _dns_record_to_dict(record)
+
+
+def dns_record_delete(name, zone_name, record_type, account=None):
+    _prefetch_evict('dns_zone', [zone_name])
+    record = _dns_record_get_by_name(name, zone_name, record_type)
+    record.delete()
+    return True
+
+
+def dns_records_ensure(zone_name, records, account=None):
+    """
+    Makes sure the given records exist in a zone. The zone's records are read
+    once, every missing record is added with one request and every record
+    that needs updating is updated with one more.
+
+    :param zone_name: A str/unicode object that represents the zone's name
+    Ex. example.com
+    :param records: A list of dicts with name, record_type, data and
+    optionally ttl, priority, comment and allow_multiple_records, as taken by
+    the dns_record_exists state
+    :return: A list with a dict for each record, in order, of the action taken
+    (None, created or updated), the resulting record and the error if it
+    failed
+    :raise NotFound: If the zone doesn't exist
+    """
+    _prefetch_evict('dns_zone', [zone_name])
+    zone = _dns_zone_get_by_name(zone_name)
+    current = []
+    for record in _dns_record_list(zone):
+        output = _dns_record_to_dict(record)
+        output['priority'] = record.priority \
+            if record.type in PRIORITY_RECORD_TYPES else None
+        current.append(output)
+
+    output = []
+    to_create = []
+    to_update = []
+    for spec in records:
+        result = {'action': None, 'record': None, 'error': None}
+        output.append(result)
+        record_type = spec['record_type']
+        if not _dns_is_valid_record_type(record_type):
+            result['error'] = u'Not a valid record type: {}'.format(
+                record_type)
+            continue
+        record_type = record_type.upper()
+        ttl = spec.get('ttl') or None
+        priority = spec.get('priority') or None
+
+        same = [record for record in current
+                if record['type'] == record_type and
+                record['name'].lower() == spec['name'].lower()]
+        matching = [record for record in same
+                    if record['data'] == spec['data']]
+        for record in matching:
+            if (ttl is None or record['ttl'] == ttl) and \
+                    (priority is None or record['priority'] == priority):
+                result['record'] = record
+                break
+        if result['record'] is not None:
+            continue
+
+        if not same or (not matching and
+                        spec.get('allow_multiple_records')):
+            if record_type in PRIORITY_RECORD_TYPES and priority is None:
+                result['error'] = u'priority required for {} records'.format(
+                    record_type)
+                continue
+            new = {'type': record_type, 'name': spec['name'],
+                   'data': spec['data']}
+            for key, value in (('ttl', ttl), ('priority', priority),
+                               ('comment', spec.get('comment'))):
+                if value:
+                    new[key] = value
+            result['action'] = 'created'
+            to_create.append((result, new))
+        else:
+            record = (matching or same)[0]
+            change = {'id': record['id'], 'name': record['name'],
+                      'data': spec['data']}
+            for key, value in (('ttl', ttl), ('priority', priority),
+                               ('comment', spec.get('comment'))):
+                if value:
+                    change[key] = value
+            result['action'] = 'updated'
+            result['record'] = dict(record, **change)
+            result['record'].pop('comment', None)
+            to_update.append((result, change))
+
+    if to_create:
+        try:
+            created = zone.add_records([new for _, new in to_create])
+            for (result, _), record in zip(to_create, created):
+                result['record'] = _dns_record_to_dict(record)
+        except Exception as e:
+            logger.error(u'Unable to add records to {0}: {1}'.format(
+                zone_name, e))
+            for result, _ in to_create:
+                result['action'] = None
+                result['error'] = six.text_type(e)
+    if to_update:
+        try:
+            zone.update_records([change for _, change in to_update])
+        except Exception as e:
+            logger.error(u'Unable to update records of {0}: {1}'.format(
+                zone_name, e))
+            for result, _ in to_update:
+                result['action'] = None
+                result['record'] = None
+                result['error'] = six.text_type(e)
+    return output
+
+
+def dns_index_refresh(full=False, account=None):
+    """
+    Brings the local index of the records of every zone up to date.
+
+    Zones are listed and only the records of zones that are new, or whose
+    updated time changed since they were last indexed, are listed again,
+    concurrently. Zones that no longer exist are dropped from the index.
+
+    :param full: Boolean to discard the index and list every zone again
+    :return: A dict with the number of zones, zones listed and records
+    indexed
+    """
+    zones = _dns_zone_list()
+    conn = _dns_index_connect()
+    try:
+        if full:
+            with conn:
+                conn.execute(u'DELETE FROM records')
+                conn.execute(u'DELETE FROM zones')
+        indexed = dict((zone_id, (updated, listed)) for zone_id, updated,
+                       listed in conn.execute(
+                           u'SELECT id, updated, listed FROM zones'))
+    finally:
+        conn.close()
+
+    stale = []
+    for zone in zones:
+        updated, listed = indexed.pop(six.text_type(zone.id), (None, None))
+        #A zone changed within the second it was listed in may still carry
+        # the updated time it was listed with
+        if updated is None or updated != zone._info.get('updated') or \
+                updated[:19] >= listed:
+            stale.append(zone)
+    gone = list(indexed)
+
+    def index(zone):
+        listed = datetime.datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%S')
+        return zone, listed, _dns_record_infos(zone)
+
+    listings = _parallel_map(index, stale)
+    conn = _dns_index_connect()
+    try:
+        with conn:
+            for zone_id in gone:
+                conn.execute(u'DELETE FROM records WHERE zone_id = ?',
+                             (zone_id,))
+                conn.execute(u'DELETE FROM zones WHERE id = ?', (zone_id,))
+            for zone, listed, infos in listings:
+                zone_id = six.text_type(zone.id)
+                conn.execute(u'DELETE FROM records WHERE zone_id = ?',
+                             (zone_id,))
+                conn.executemany(
+                    u'INSERT INTO records (zone_id, zone, id, name, type, '
+                    u'data, data_key, ttl) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                    [(zone_id, zone.name, info.get('id'), info['name'],
+                      info['type'], info.get('data'),
+                      _dns_index_key(info.get('data')), info.get('ttl'))
+                     for info in infos])
+                conn.execute(u'INSERT OR REPLACE INTO zones (id, name, '
+                             u'updated, listed) VALUES (?, ?, ?, ?)',
+                             (zone_id, zone.name, zone._info.get('updated'),
+                              listed))
+            conn.execute(u'INSERT OR REPLACE INTO meta (key, value) '
+                         u'VALUES (?, ?)', ('refreshed',
+                                            six.text_type(time.time())))
+        stored = conn.execute(u'SELECT COUNT(*) FROM records').fetchone()[0]
+    finally:
+        conn.close()
+
+    return {'zones': len(zones), 'listed': len(stale), 'records': stored}
+
+
+def dns_reverse_lookup(data, record_types=None, refresh=False,
+                       account=None):
+    """
+    Finds every record of every zone pointing at an address or hostname,
+    from the local record index.
+
+    The index is refreshed first if requested, if it was never built or if
+    it was last refreshed more than DNS_INDEX_MAX_AGE seconds ago.
+    Hostnames are matched regardless of case and trailing dot.
+
+    :param data: An address or hostname, or a list of them.
+    Ex. 10.0.0.1 or web1.example.com
+    :param record_types: A list of record types to match, A, AAAA and CNAME
+    by default
+    :param refresh: Boolean to refresh the index before the lookup
+    :return: A list of dicts with the zone, id, name, type, data and ttl of
+    each matching record
+    """
+    if isinstance(data, six.string_types):
+        data = [data]
+    record_types = [record_type.upper() for record_type in
+                    record_types or DNS_REVERSE_LOOKUP_TYPES]
+
+    conn = _dns_index_connect()
+    try:
+        row = conn.execute(u'SELECT value FROM meta WHERE key = ?',
+                           ('refreshed',)).fetchone()
+    finally:
+        conn.close()
+    if refresh or row is None or \
+            time.time() - float(row[0]) > DNS_INDEX_MAX_AGE:
+        dns_index_refresh(account=account)
+
+    keys = [_dns_index_key(item) for item in data]
+    conn = _dns_index_connect()
+    try:
+        rows = conn.execute(
+            u'SELECT zone, id, name, type, data, ttl FROM records '
+            u'WHERE data_key IN ({0}) AND type IN ({1}) '
+            u'ORDER BY zone, name'.format(u', '.join(u'?' for _ in keys),
+                                          u', '.join(u'?' for _ in
+                                                     record_types)),
+            keys + record_types).fetchall()
+    finally:
+        conn.close()
+
+    return [{'zone': zone, 'id': record_id, 'name': name,
+             'type': record_type, 'data': record_data, 'ttl': ttl}
+            for zone, record_id, name, record_type, record_data, ttl in rows]
+
+
+def dns_ptr_sync(servers=None, load_balancers=None, region='DFW',
+                 ttl=None, remove_unlisted=False, test=False, account=None):
+    """
+    Makes the PTR records of servers and load balancers match the provided
+    hostnames.
+
+    The current PTR records of every device are read concurrently. The
+    changes of each device are then submitted together, one request for its
+    new records, one for its changed records and one per removed record, or
+    one for all of them if the device keeps no records, as asynchronous jobs
+    that are all polled in the same loop.
+
+    :param servers: A dict of server name or id to a dict of IP address to
+    hostname. Ex. {'web1': {'198.51.100.10': 'web1.example.com'}}
+    :param load_balancers: A dict of load balancer name or id to a dict of
+    IP address to hostname
+    :param region: The region of the devices
+    :param ttl: The ttl of the records, left as is on existing records if
+    None
+    :param remove_unlisted: Boolean to remove PTR records of the listed
+    devices for addresses not present in their dict
+    :param test: Boolean to only report the changes that would be made
+    :return: A dict of the added, updated, removed and failed records, each
+    a dict of device, device_type, ip and name
+    :raise ValueError: If a device isn't found
+    """
+    devices = _dns_ptr_devices(servers or {}, load_balancers or {}, region)
+    current = _parallel_map(_dns_ptr_records, devices)
+
+    output = {'added': [], 'updated': [], 'removed': [], 'failed': []}
+    submissions = []
+    for device, records in zip(devices, current):
+        records = dict((record['data'], record) for record in records)
+        to_add = []
+        to_update = []
+        for ip, hostname in sorted(device['records'].items()):
+            record = records.get(ip)
+            if record is None:
+                to_add.append({'name': hostname, 'type': 'PTR', 'data': ip})
+            elif _dns_index_key(record['name']) != \
+                    _dns_index_key(hostname) or \
+                    (ttl is not None and record.get('ttl') != ttl):
+                to_update.append({'id': record.get('id'), 'name': hostname,
+                                  'type': 'PTR', 'data': ip})
+        for record in to_add + to_update:
+            if ttl is not None:
+                record['ttl'] = ttl
+        to_remove = []
+        if remove_unlisted:
+            to_remove = [record for ip, record in sorted(records.items())
+                         if ip not in device['records']]
+
+        if to_add:
+            submissions.append(
+                ('added', device, to_add, 'POST', u'/rdns', to_add))
+        if to_update:
+            submissions.append(
+                ('updated', device, to_update, 'PUT', u'/rdns', to_update))
+        # The jobs of a device finish in any order, a device wide delete
+        # could remove the records added next to it
+        if to_remove and len(to_remove) == len(records) and not to_add:
+            submissions.append(('removed', device, to_remove, 'DELETE',
+                                _dns_ptr_uri(device), None))
+        else:
+            submissions += [('removed', device, [record], 'DELETE',
+                             _dns_ptr_uri(device, record['data']), None)
+                            for record in to_remove]
+
+    if not test:
+        jobs = _dns_jobs_wait(_parallel_map(
+            lambda submission: _dns_ptr_submit(submission[1],
+                                               *submission[3:]),
+            submissions))
+    for index, (change, device, records, _, _, _) in \
+            enumerate(submissions):
+        error = None
+        if not test:
+            job = jobs[index]
+            if job.get('status') != 'COMPLETED':
+                error = (job.get('error') or {}).get('details') or \
+                    (job.get('error') or {}).get('message') or \
+                    u'Job {0}'.format(job.get('status', 'failed').lower())
+        for record in records:
+            item = {'device': device['name'], 'device_type': device['type'],
+                    'ip': record['data'], 'name': record['name']}
+            if error is None:
+                output[change].append(item)
+            else:
+                item['error'] = error
+                output['failed'].append(item)
+    return output
+
+
+def dns_drift_poll(records=None, zones=None, account=None):
+    """
+    Reads the changes made to zones since the previous poll and returns those
+    that moved their managed records or settings away from the desired ones.
+
+    The first poll of a zone finds it and lists its records once, keeping
+    only the records with a managed name and type in __context__. Later
+    polls read the zone changes feed since the time of the previous poll,
+    one request per zone, concurrently. Only the records and zones those
+    changes touched are read again and compared, so changes to unmanaged
+    records, or changes that were reverted or match the desired state, are
+    not reported.
+
+    :param records: A list of desired records, dicts of name, zone_name,
+    record_type, data and optionally ttl, as taken by the dns_record_exists
+    state
+    :param zones: A list of desired zones, dicts of name and optionally
+    email_address and ttl, as taken by the dns_zone_exists state
+    :param account: The account polled. Records and zones with another
+    account are skipped, those without one being for the default account.
+    :return: A dict keyed by zone name of the list of drifts found, dicts of
+    the name, type, desired and current values of the record or zone
+    """
+    account_name = _account(account)[0]
+    default = _accounts()[1]
+    records = [spec for spec in records or []
+               if (spec.get('account') or default) == account_name]
+    zones = [spec for spec in zones or []
+             if (spec.get('account') or default) == account_name]
+
+    desired = {}
+    for spec in records:
+        zone = desired.setdefault(_dns_index_key(spec['zone_name']),
+                                  {'records': {}, 'zone': {}})
+        zone['records'].setdefault(
+            (_dns_index_key(spec['name']), spec['record_type'].upper()),
+            []).append(spec)
+    for spec in zones:
+        desired.setdefault(_dns_index_key(spec['name']),
+                           {'records': {}, 'zone': {}})['zone'] = spec
+
+    polls = __context__.setdefault('rackspace.dns_drift', {})
+    for key in [key for key in polls
+                if key[0] == account_name and key[1] not in desired]:
+        del polls[key]
+
+    names = sorted(desired)
+    drifts = _parallel_map(
+        lambda name: _dns_drift_zone(polls, (account_name, name),
+                                     desired[name]),
+        names)
+    return dict((name, drift) for name, drift in zip(names, drifts) if drift)
+
+
+@_single_flight
+@_hedged
+def _dns_record_get_by_name(name,
+                            zone_name,
+                            record_type,
+                            data=None,
+                            allow_multiple_records=True):
+    """
+    Finds a record based on the record name
+
+    :param zone_name: A str/unicode object that represents the zone's name
+    Ex. example.com
+    :param name: A str/unicode object that represents the record's name.
+    Ex subdomain.example.com
+    :param record_type: A sty/unicode object of a valid records type.
+    Ex. A AAAA CNAME etc
+    :param data: A str/unicode object that is the data associated with the
+    record. Ex. "127.0.0.1"
+    :param allow_multiple_records: Boolean that determines if multiple records
+     should occur with the same record name
+     and type
+    :return: A list of DNS Record objects that match the specified names,
+    type and data
+    """
+    try:
+        zone = _dns_zone_get_by_name(zone_name)
+        assert isinstance(zone, pyrax.clouddns.CloudDNSDomain)
+    except exc.NotFound as e:
+        error_msg = u"Zone Not Found: {}".format(zone_name)
+        logger.error(error_msg)
+        raise e
+
+    #Checking if the record is of valid type
+    if not _dns_is_valid_record_type(record_type):
+        error_msg = u"Not Valid Record Type: {}".format(record_type)
+        logger.error(error_msg)
+        raise TypeError(error_msg)
+    record_type = record_type.upper()
+
+    if allow_multiple_records:
+        records = zone.search_records(record_type, name=name, data=data)
+    else:
+        try:
+            records = [
+                zone.find_record(record_type, name=name, data=data)]
+        except exc.DomainRecordNotUnique:
+            logger.warning(
+                u'Multiple records found for {}: {}: {}'.format(name,
+                                                                record_type,
+                                                                data))
+            raise
+    return records
+
+
+@_single_flight
+@_hedged
+def _dns_zone_get_by_name(name):
+    """
+    Returns a DNS Domain object matching the specified name.
+
+    :param name: A Str/unicode object of the zone name.
+    :return: Returns a DNS Domain object matching the specified name.
+    """
+    driver = _get_driver('dns')
+    assert isinstance(driver, pyrax.clouddns.CloudDNSClient)
+
+    try:
+        dom = driver.find(name=name)
+    except exc.NotFound:
+        logger.error(u"No Zone found for {}".format(name))
+        raise
+    return dom
+
+
+@_single_flight
+def _dns_record_list(zone):
+    """
+    Returns a list of DNS Record objects for the specified zone
+
+    :param zone: A pyrax DNS Domain object
+    :return: A list of DNS Record objects
+    """
+    driver = _get_driver('dns')
+    assert isinstance(driver, pyrax.clouddns.CloudDNSClient)
+    #Paged by offset: pyrax's record iterator doesn't support python 3 and
+    # its next page state lives on the zone's manager, which may be shared
+    # between threads
+    all_records = []
+    while True:
+        page = driver.list_records(zone, limit=PAGE_SIZE,
+                                   offset=len(all_records))
+        all_records += page
+        if len(page) < PAGE_SIZE:
+            break
+
+    return all_records
+
+
+@_single_flight
+def _dns_zone_list():
+    """
+    Returns a list of all domains for the configured account
+
+    :return: A list of DNS Domain objects
+    """
+    driver = _get_driver('dns')
+    assert isinstance(driver, pyrax.clouddns.CloudDNSClient)
+    all_zones = driver.list(limit=PAGE_SIZE)
+    while True:
+        try:
+            all_zones += driver.list_next_page()
+        except exc.NoMoreResults:
+            break
+    return all_zones
+
+
+def _dns_zone_to_dict(zone, show_records=False):
+    """
+    Renders a DNS Zone as a dict
+
+    :param zone: A pyrax DNS Domain object
+    :param show_records: Boolean to determine if records of the zone should be
+    included in output
+    :return: A dict
+    """
+    output = {
+        'name': zone.name,
+        'nameservers': [ns['name'] for ns in zone.nameservers],
+        'id': zone.id,
+        'email': zone.emailAddress,
+        'ttl': zone.ttl,
+    }
+
+    if show_records:
+        output['records'] = [_dns_record_to_dict(record) for record in
+                             _dns_record_list(zone)]
+
+    return output
+
+
+def _dns_record_to_dict(record):
+    """
+    Renders a DNS record object as a dict
+
+    :param record: A pyrax DNS record object
+    :return: A DNS record rendered as a dict. Keyed by the record name.
+    """
+    assert isinstance(record, pyrax.clouddns.CloudDNSRecord)
+    output = {'name': record.name, 'data': record.data, 'type': record.type,
+              'ttl': record.ttl, 'id': record.id}
+    return output
+
+
+def _dns_is_valid_record_type(record_type):
+    """
+    Checks to see if record_type is a valid str/unicode object and if it is a
+    valid type of record.
+        Example types of records:
+           'A', 'AAAA', 'CNAME', 'MX' 'NS', 'PTR', 'SRV', 'TXT'
+
+    :param record_type: A str or unicode object matching one of the above
+    types of records
+    :return: True/False If it is a valid record type
+    :raise TypeError: If records_type is not a valid str or unicode object
+    """
+    if not isinstance(record_type, six.string_types):
+        raise TypeError(u"record_type must be str or unicode object")
+
+    if record_type.upper() in VALID_RECORD_TYPES:
+        return True
+
+    return False
+
+
+def _dns_record_infos(zone):
+    """
+    Lists the records of a zone as the API returns them, without turning
+    them into pyrax objects
+
+    :param zone: A pyrax DNS Domain object
+    :return: A list of record dicts
+    """
+    driver = _get_driver('dns')
+    output = []
+    while True:
+        _, body = driver.method_get(
+            u'/domains/{0}/records?limit={1}&offset={2}'.format(
+                zone.id, PAGE_SIZE, len(output)))
+        page = body.get('records') or []
+        output += page
+        if len(page) < PAGE_SIZE:
+            return output
+
+
+def _dns_index_key(data):
+    """
+    :return: The record data as matched by dns_reverse_lookup
+    """
+    if data is None:
+        return None
+    return six.text_type(data).strip().rstrip(u'.').lower()
+
+
+def _dns_index_connect():
+    """
+    Opens the record index of the current account, creating its tables if
+    needed.
+
+    :return: A sqlite3 connection
+    """
+    directory = os.path.join(__opts__['cachedir'], 'rackspace', 'dns_index')
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    filename = six.moves.urllib.parse.quote(_account()[0], safe='')
+    conn = sqlite3.connect(os.path.join(directory, filename + '.sqlite'))
+    with conn:
+        conn.execute(u'CREATE TABLE IF NOT EXISTS records ('
+                     u'zone_id TEXT, zone TEXT, id TEXT, name TEXT, '
+                     u'type TEXT, data TEXT, data_key TEXT, ttl INTEGER)')
+        conn.execute(u'CREATE INDEX IF NOT EXISTS records_data_key '
+                     u'ON records (data_key)')
+        conn.execute(u'CREATE INDEX IF NOT EXISTS records_zone_id '
+                     u'ON records (zone_id)')
+        conn.execute(u'CREATE TABLE IF NOT EXISTS zones ('
+                     u'id TEXT PRIMARY KEY, name TEXT, updated TEXT, '
+                     u'listed TEXT)')
+        conn.execute(u'CREATE TABLE IF NOT EXISTS meta ('
+                     u'key TEXT PRIMARY KEY, value TEXT)')
+    return conn
+
+
+def _dns_ptr_devices(servers, load_balancers, region):
+    """
+    Resolves the devices of dns_ptr_sync, listing the servers or load
+    balancers of the region once if any of them is given by name
+
+    :return: A list of dicts with the type, name, URL, rdns service name and
+    desired records of each device
+    :raise ValueError: If a device isn't found
+    """
+    catalog = _auth()['catalog']
+    output = []
+    for device_type, specs in (('server', servers),
+                               ('load_balancer', load_balancers)):
+        if not specs:
+            continue
+        service, path, rel = DNS_PTR_DEVICES[device_type]
+        if device_type == 'server':
+            #Server ids are UUIDs, load balancer ids numbers
+            names = [name for name in specs
+                     if not NET_ID_RE.match(six.text_type(name))]
+        else:
+            names = [name for name in specs
+                     if not six.text_type(name).isdigit()]
+        ids = {}
+        if names:
+            if device_type == 'server':
+                listed = _get_driver('cs', region).servers.list(
+                    detailed=False)
+            else:
+                listed = _get_driver('lb', region).list()
+            ids = dict((device.name, device.id) for device in listed)
+            missing = [name for name in names if name not in ids]
+            if missing:
+                raise ValueError(u'No {0}s found by: {1}'.format(
+                    device_type.replace('_', ' '),
+                    u', '.join(sorted(missing))))
+        base = catalog.url(service, region)
+        for name, records in sorted(specs.items()):
+            output.append({
+                'type': device_type,
+                'name': name,
+                'href': u'{0}/{1}/{2}'.format(base, path,
+                                              ids.get(name, name)),
+                'rel': rel,
+                'records': dict((six.text_type(ip), hostname)
+                                for ip, hostname in records.items()),
+            })
+    return output
+
+
+def _dns_ptr_uri(device, ip=None):
+    #pyrax quotes request URIs itself
+    uri = u'/rdns/{0}?href={1}'.format(device['rel'], device['href'])
+    if ip is not None:
+        uri += u'&ip={0}'.format(ip)
+    return uri
+
+
+def _dns_ptr_records(device):
+    """
+    :param device: A device dict of _dns_ptr_devices
+    :return: A list of the PTR record dicts of the device
+    """
+    driver = _get_driver('dns')
+    try:
+        _, body = driver.method_get(_dns_ptr_uri(device))
+    except exc.NotFound:
+        return []
+    return (body or {}).get('records') or []
+
+
+def _dns_ptr_submit(device, method, uri, records):
+    """
+    Submits an rdns change without waiting for it to complete
+
+    :return: The job dict of the change, an ERROR job if it was refused
+    """
+    driver = _get_driver('dns')
+    try:
+        if method == 'DELETE':
+            _, job = driver.method_delete(uri)
+        else:
+            body = {'recordsList': {'records': records},
+                    'link': {'content': '', 'href': device['href'],
+                             'rel': device['rel']}}
+            _, job = (driver.method_post if method == 'POST'
+                      else driver.method_put)(uri, body=body)
+    except exc.ClientException as e:
+        logger.error(u'Unable to change PTR records of {0}: {1}'.format(
+            device['name'], e))
+        return {'status': 'ERROR', 'error': {'details': six.text_type(e)}}
+    return job or {'status': 'COMPLETED'}
+
+
+def _dns_jobs_wait(jobs, timeout=DNS_JOB_TIMEOUT):
+    """
+    Waits for asynchronous DNS jobs, polling the status of every job still
+    running once per DNS_JOB_POLL_INTERVAL
+
+    :param jobs: A list of job dicts, as returned when submitting them
+    :param timeout: Seconds to wait for the jobs to finish
+    :return: The list of final job dicts, in order. Jobs that didn't finish
+    in time are left RUNNING.
+    """
+    output = list(jobs)
+    deadline = time.time() + timeout
+    while True:
+        running = [index for index, job in enumerate(output)
+                   if job.get('status') in ('INITIALIZED', 'RUNNING')]
+        if not running or time.time() > deadline:
+            return output
+        polled = _parallel_map(
+            lambda index: _get_driver('dns').method_get(
+                u'/status/{0}?showDetails=true'.format(
+                    output[index]['jobId']))[1],
+            running)
+        for index, job in zip(running, polled):
+            output[index] = job
+        if any(job.get('status') in ('INITIALIZED', 'RUNNING')
+               for job in polled):
+            time.sleep(DNS_JOB_POLL_INTERVAL)
+
+
+def _dns_drift_zone(polls, key, desired):
+    """
+    Polls the changes feed of one zone, see dns_drift_poll
+
+    :param polls: The poll state of every zone, updated in place
+    :param key: The account and name of the zone
+    :param desired: A dict of the desired records, keyed by name and type,
+    and the desired zone settings
+    :return: A list of drift dicts
+    """
+    driver = _get_driver('dns')
+    managed = desired['records']
+    state = polls.get(key)
+    if state is None or state['managed'] != set(managed):
+        return _dns_drift_baseline(polls, key, desired)
+    if state['id'] is None:
+        # Reported missing already, only report it again once it is back
+        _dns_drift_baseline(polls, key, desired)
+        return []
+
+    started = datetime.datetime.utcnow().strftime(DNS_CHANGES_TIME_FORMAT)
+    try:
+        _, body = driver.method_get(u'/domains/{0}/changes?since={1}'.format(
+            state['id'], state['since']))
+    except exc.NotFound:
+        state['id'] = None
+        return [_dns_drift_missing(key[1])]
+    state['since'] = (body or {}).get('to') or started
+    # The feed has a one second resolution and includes its since time, so
+    # changes of the last second of the previous poll are returned again
+    changes = (body or {}).get('changes') or []
+    seen = state['seen']
+    state['seen'] = set(json.dumps(change, sort_keys=True)
+                        for change in changes)
+
+    record_ids = set()
+    zone_changed = False
+    for change in changes:
+        if json.dumps(change, sort_keys=True) in seen:
+            continue
+        if (change.get('targetType') or '').lower() == 'domain':
+            zone_changed = True
+            continue
+        record_id = six.text_type(change.get('targetId'))
+        changed_names = set(
+            _dns_index_key(detail.get(value))
+            for detail in change.get('changeDetails') or []
+            if detail.get('field') == 'name'
+            for value in ('originalValue', 'newValue'))
+        if record_id in state['records'] or any(
+                name in changed_names for name, _ in managed):
+            record_ids.add(record_id)
+
+    touched = set(state['records'][record_id]['key']
+                  for record_id in record_ids
+                  if record_id in state['records'])
+    record_ids = sorted(record_ids)
+    for record_id, record in zip(record_ids, _parallel_map(
+            lambda record_id: _dns_drift_record(state['id'], record_id),
+            record_ids)):
+        if record is not None and record['key'] in managed:
+            state['records'][record_id] = record
+            touched.add(record['key'])
+        else:
+            state['records'].pop(record_id, None)
+
+    output = []
+    if zone_changed and desired['zone']:
+        try:
+            _, zone = driver.method_get(
+                u'/domains/{0}?showRecords=false&showSubdomains=false'.format(
+                    state['id']))
+        except exc.NotFound:
+            state['id'] = None
+            return [_dns_drift_missing(key[1])]
+        spec = desired['zone']
+        wanted = dict((field, spec.get(name)) for field, name in
+                      (('emailAddress', 'email_address'), ('ttl', 'ttl'))
+                      if spec.get(name) is not None)
+        current = dict((field, zone.get(field)) for field in wanted)
+        if current != wanted:
+            output.append({'name': spec['name'], 'type': 'ZONE',
+                           'desired': wanted, 'current': current})
+
+    for record_key in sorted(touched):
+        current = [record for record in state['records'].values()
+                   if record['key'] == record_key]
+        for spec in managed[record_key]:
+            if not any(_dns_drift_matches(spec, record)
+                       for record in current):
+                output.append({
+                    'name': spec['name'], 'type': record_key[1],
+                    'desired': {'data': spec['data'],
+                                'ttl': spec.get('ttl')},
+                    'current': [{'data': record['data'],
+                                 'ttl': record['ttl']}
+                                for record in current]})
+    return output
+
+
+def _dns_drift_baseline(polls, key, desired):
+    """
+    Finds a zone and remembers its managed records, the changes feed of the
+    zone is then read from this point on
+
+    :return: A list holding the drift of a missing zone, empty otherwise
+    """
+    previous = polls.get(key)
+    started = datetime.datetime.utcnow().strftime(DNS_CHANGES_TIME_FORMAT)
+    try:
+        zone = _dns_zone_get_by_name(key[1])
+    except exc.NotFound:
+        polls[key] = {'id': None, 'managed': set(desired['records'])}
+        if previous is not None and previous['id'] is None:
+            return []
+        return [_dns_drift_missing(key[1])]
+
+    records = {}
+    for info in _dns_record_infos(zone):
+        record = _dns_drift_info(info)
+        if record['key'] in desired['records']:
+            records[six.text_type(info['id'])] = record
+    polls[key] = {'id': zone.id, 'since': started, 'records': records,
+                  'managed': set(desired['records']), 'seen': set()}
+    return []
+
+
+def _dns_drift_record(zone_id, record_id):
+    """
+    :return: The record of a zone as compared by dns_drift_poll, None if it
+    was removed
+    """
+    try:
+        _, info = _get_driver('dns').method_get(
+            u'/domains/{0}/records/{1}'.format(zone_id, record_id))
+    except exc.NotFound:
+        return None
+    return _dns_drift_info(info)
+
+
+def _dns_drift_info(info):
+    return {'key': (_dns_index_key(info.get('name')),
+                    (info.get('type') or '').upper()),
+            'data': info.get('data'), 'ttl': info.get('ttl')}
+
+
+def _dns_drift_matches(spec, record):
+    """
+    :return: True if a record has the data and, when given, the ttl of a
+    desired record. Data is compared as a hostname except for TXT records.
+    """
+    if spec['record_type'].upper() == 'TXT':
+        same_data = six.text_type(spec['data']) == \
+            six.text_type(record['data'])
+    else:
+        same_data = _dns_index_key(spec['data']) == \
+            _dns_index_key(record['data'])
+    return same_data and (spec.get('ttl') in (None, False) or
+                          int(spec['ttl']) == record['ttl'])
+
+
+def _dns_drift_missing(name):
+    return {'name': name, 'type': 'ZONE', 'desired': {'exists': True},
+            'current': None}
+
+
+##Cloud Databases
+def db_flavor_list(regions=None, accounts=None, account=None):
+    """
+    Retrieves a list of all current available flavors
+
+    :param regions: 'ALL' or a list of regions to query concurrently instead
+    of the default region. Each flavor is then tagged with its region.
+    :param accounts: 'ALL' or a list of accounts to query concurrently instead
+    of the default account. Each result is then tagged with its account.
+    :return: A dict of database flavors keyed by their name.
+    """
+    if accounts is not None:
+        return _merge_account_results(_fan_out_accounts(
+            accounts,
+            lambda name: db_flavor_list(regions=regions, account=name)))
+    if regions is not None:
+        return _merge_region_lists(
+            _fan_out_regions('db', regions, _db_flavor_list_dicts))
+    return _db_flavor_list_dicts()
+
+
+def _db_flavor_list_dicts(region='DFW'):
+    return [_db_flavor_to_dict(flavor) for flavor in _db_flavor_list(region)]
+
+
+def db_flavor_exists(name, account=None):
+    """
+    Determines if a DB flavor of the given name exists.
+
+    :param name: Name of the database flavor
+    :return: True/False if the instance already exists
+    """
+    flavor_list = _db_flavor_list()
+
+    for item in flavor_list:
+        if item.name == name:
+            return True
+    return False
+
+
+def db_flavor_get_by_name(name, account=None):
+    cached = _prefetched('db_flavor', name)
+    if cached is not None:
+        return cached
+    for flavor in _db_flavor_list():
+        if flavor.name == name:
+            return _db_flavor_to_dict(flavor)
+    error = u'Database flavor {0} not found.'.format(name)
+    raise exc.NotFound(error)
+
+
+def db_instance_list(regions=None, accounts=None, account=None):
+    """
+    Retrieves a list of rackspace cloud database instances
+
+    :param regions: 'ALL' or a list of regions to query concurrently instead
+    of the default region. Each instance is then tagged with its region.
+    :param accounts: 'ALL' or a list of accounts to query concurrently instead
+    of the default account. Each result is then tagged with its account.
+    :return: Dict of db instances
+    """
+    if accounts is not None:
+        return _merge_account_results(_fan_out_accounts(
+            accounts,
+            lambda name: db_instance_list(regions=regions, account=name)))
+    if regions is not None:
+        return _merge_region_lists(
+            _fan_out_regions('db', regions, _db_instance_list))
+    return _db_instance_list()
+
+
+def _db_instance_list(region='DFW'):
+    driver = _get_driver('db', region)
+    assert isinstance(driver, pyrax.CloudDatabaseClient)
+
+    output = []
+
+    for instance in driver.list():
+        output.append(_db_instance_to_dict(instance))
+    return output
+
+
+def db_instance_exists(name, account=None):
+    """
+    Determines if a DB instance of the given name is already present.
+
+    :param name: Name of the database instance
+    :return: True/False if the instance already exists
+    """
+    for instance in db_instance_list(account=account):
+        if instance['name'] == name:
+            return True
+    return False
+
+
+def db_instance_get_by_name(name, account=None):
+    """
+    Retrieves a DB instance by name.
+
+    :param name: This is the name of the instance
+    :return: A dict representation of the instance
+    """
+    cached = _prefetched('db_instance', name)
+    if cached is not None:
+        return cached
+    instance = _db_instance_get_by_name(name)
+
+    return _db_instance_to_dict(instance)
+
+
+def db_instance_create(name, flavor, size, account=None):
+    """
+    Creates a rackspace database instance
+
+    :param name: The intended name for the database instance
+    :param flavor: The name of the database flavor
+    :param size: The size in GB of the database instance
+    :return: A dict of the created database instance :raise ValueError:
+    """
+    _prefetch_evict('db_instance', [name])
+    driver = _get_driver('db', account=account)
+    assert isinstance(driver, pyrax.CloudDatabaseClient)
+
+    if db_instance_exists(name, account=account):
+        raise ValueError(u"Instance Already Exists")
+
+    if size > MAX_DB_VOLUME_SIZE:
+        raise ValueError(u"Volume size must be less than 150")
+
+    if not db_flavor_exists(flavor, account=account):
+        raise ValueError(u"Invalid Flavor")
+
+    instance = driver.create(name, flavor=_db_flavor_get_by_name(flavor),
+                             volume=size)
+    #waiting for instance to finish building or hit the timeout before
+    # continuing one
+    pyrax.utils.wait_until(instance, "status", "ACTIVE", interval=1,
+                           attempts=TIMEOUT)
+
+    return _db_instance_to_dict(instance)
+
+
+def db_instance_delete(name, account=None):
+    """
+    Deletes a given database instance.
+
+    :param name: The name of teh targeted instance
+    :return: Returns True if the instance was deleted.
+    """
+    _prefetch_evict('db_instance', [name])
+    instance = _db_instance_get_by_name(name)
+    instance.delete()
+    #TODO: test to make sure deletion went through correctly
+    return {name: {'deleted': True}}
+
+
+def db_database_create(name, instance_name, character_set=None, collate=None,
+                       account=None):
+    """
+    Creates a database on a given db instance
+    :param name: The name of the database to be created
+    :param instance_name: The name of the instance to build the db on
+    :param character_set:
+    :param collate:
+    :return: A dict representation of the DB
+    """
+    instance = _db_instance_get_by_name(instance_name)
+    if instance.status == "BUILD":
+        msg = u"{0} instance is still Building, waiting up to {1} seconds"
+        logger.info(msg.format(instance.name, TIMEOUT))
+        pyrax.utils.wait_until(instance, "status", "ACTIVE", interval=1,
+                               attempts=TIMEOUT)
+    database = instance.create_database(name, character_set, collate)
+
+    #TODO Test to see if DB created successfully
+    return _db_database_to_dict(database)
+
+
+def db_database_exists(name, instance_name, account=None):
+    instance = _db_instance_get_by_name(instance_name)
+
+    try:
+        instance.get_database(name)
+        return True
+    except exc.NoSuchDatabase:
+        return False
+
+
+def db_database_list(instance_name, account=None):
+    instance = _db_instance_get_by_name(instance_name)
+
+    output = []
+
+    for db in instance.list_databases():
+        output.append(_db_database_to_dict(db))
+    return {instance_name: output}
+
+
+def db_database_delete(name, instance_name, account=None):
+    instance = _db_instance_get_by_name(instance_name)
+    instance.delete_database(name)
+    #TODO: determine if DB was deleted
+    return True
+
+
+def db_database_get(name, instance_name, account=None):
+    instance = _db_instance_get_by_name(instance_name)
+    db = instance.get_database(name)
+    return _db_database_to_dict(db)
+
+
+def db_user_create(name, instance_name, password, database_names, host=None,
+                   account=None):
+    """
+    Creates a user in the given instance for all included databases
+    :param instance_name: Name of the instance to associate the user with
+    :param name: Name of the user
+    :param password: Password for the use
+    :param database_names: The name or list of banes of the database to give
+    this user privileges on
+    :param host: Mysql host expression
+    :return: A dict representation of the created user
+    """
+    instance = _db_instance_get_by_name(instance_name)
+    user = instance.create_user(name, password, database_names, host)
+    #TODO Possibly update the output here to reflect the instance associated
+    # with the user
+    return {instance: {'name': _db_user_to_dict(user), }}
+
+
+def db_user_list(instance_name, account=None):
+    instance = _db_instance_get_by_name(instance_name)
+
+    output = []
+
+    for user in instance.list_users():
+        output.append(_db_user_to_dict(user))
+
+    return {instance_name: output}
+
+
+def db_user_get(name, instance_name, account=None):
+    instance = _db_instance_get_by_name(instance_name)
+    user = instance.get_user(name)
+    return _db_user_to_dict(user)
+
+
+def db_user_delete(name, instance_name, account=None):
+    instance = _db_instance_get_by_name(instance_name)
+    instance.delete_user(name)
+    return True
+
+
+def db_user_update(name,
+                   instance_name,
+                   new_name=None,
+                   password=None,
+                   host=None, account=None):
+    instance = _db_instance_get_by_name(instance_name)
+    user = instance.get_user(name)
+    new_user = instance.update_user(
+        user,
+        name=new_name,
+        password=password,
+        host=host)
+    return _db_user_to_dict(new_user)
+
+
+@_single_flight
+@_hedged
+def _db_instance_get_by_name(name):
+    driver = _get_driver('db')
+    assert isinstance(driver, pyrax.CloudDatabaseClient)
+    try:
+        instance = driver.find(name=name)
+    except exc.NotFound:
+        instance = None
+    return instance
+
+
+def _db_database_to_dict(database):
+    assert isinstance(database, pyrax.clouddatabases.CloudDatabaseDatabase)
+    #TODO: Add additional DB Output
+    output = {'name': database.name}
+    return output
+
+
+def _db_user_to_dict(user):
+    assert isinstance(user, pyrax.clouddatabases.CloudDatabaseUser)
+    databases = [db['name'] for db in user.databases]
+    output = {'name': user.name, 'databases': databases, 'host': user.host}
+    return output
+
+
+def _db_instance_to_dict(instance):
+    """
+    Converts a database instance object to a dict
+    :param instance: A valid pyrax instance object
+    :return: A dict representation of the instance keyed by the instance name
+    """
+    assert isinstance(instance, pyrax.clouddatabases.CloudDatabaseInstance)
+    return {
+        'name': instance.name,
+        'id': instance.id,
+        'status': instance.status,
+        'flavor': instance.flavor.name,
+        'hostname': instance.hostname
+    }
+
+
+@_single_flight
+def _db_flavor_list(region='DFW'):
+    driver = _get_driver('db', region)
+    assert isinstance(driver, pyrax.CloudDatabaseClient)
+
+    return driver.list_flavors()
+
+
+def _db_flavor_get_by_name(name):
+    """
+    Retrieves a database flavor object by name
+    :param name: A str/unicode object of the flavor name
+    :return: A pyrax flavor object
+    :raise ValueError: If no valid flavors are found
+    """
+    for flavor in _db_flavor_list():
+        if flavor.name == name:
+            return flavor
+
+    raise ValueError(u"No Flavor by that name")
+
+
+def _db_flavor_to_dict(flavor):
+    """
+    Converts a flavor object to a dict
+    :param flavor: A valid pyrax flavor object
+    :return: A dict representation of the flavor keyed by the flavor name
+    """
+    assert isinstance(flavor, pyrax.clouddatabases.CloudDatabaseFlavor)
+    return {'name': flavor.name, 'ram': flavor.ram, 'id': flavor.id}
+
+
+### Cloud Files
+#TODO: Add Exception handling
+
+def cf_container_exists(name, cdn_enabled=None, ttl=None, account=None):
+    try:
+        container = _cf_container_get_by_name(name)
+    except exc.NoSuchContainer:
+        return False
+
+    if cdn_enabled is not None:
+        if cdn_enabled != container.cdn_enabled:
+            logger.debug(
+                u"CDN found to not match:: found: {0} -- provided {1}".format(
+                    container.cdn_enabled, cdn_enabled))
+            return False
+
+    if ttl is not None:
+        if ttl != container.cdn_ttl:
+            logger.debug(
+                u"CDN ttl not a match:: found: {0} -- provided {1}".format(
+                    container.cdn_ttl, ttl))
+            return False
+
+    return True
+
+
+def cf_container_list(regions=None, accounts=None, account=None):
+    """
+    Lists all containers
+    :param regions: 'ALL' or a list of regions to query concurrently instead
+    of the default region. Each container is then tagged with its region.
+    :param accounts: 'ALL' or a list of accounts to query concurrently instead
+    of the default account. Each result is then tagged with its account.
+    :return: A list of container dicts
+    """
+    if accounts is not None:
+        return _merge_account_results(_fan_out_accounts(
+            accounts,
+            lambda name: cf_container_list(regions=regions, account=name)))
+    if regions is not None:
+        return _merge_region_lists(
+            _fan_out_regions('cf', regions, _cf_container_list_dicts))
+    return _cf_container_list_dicts()
+
+
+def _cf_container_list_dicts(region='DFW'):
+    containers = _cf_container_list(region)
+    return [_cf_container_to_dict(container) for container in containers]
+
+
+def cf_container_create(name, cdn_enabled=None, ttl=None, account=None):
+    _prefetch_evict('cf_container', [name])
+    container = _cf_container_create(name, cdn_enabled=cdn_enabled, ttl=ttl)
+    return _cf_container_to_dict(container)
+
+
+def cf_container_get(name, account=None):
+    cached = _prefetched('cf_container', name)
+    if cached is not None:
+        return cached
+    container = _cf_container_get_by_name(name)
+    return _cf_container_to_dict(container)
+
+
+def cf_container_delete(name, account=None):
+    _prefetch_evict('cf_container', [name])
+    container = _cf_container_get_by_name(name)
+    return _cf_container_delete(container)
+
+
+def cf_container_update(name, cdn_enabled, ttl=None, account=None):
+    _prefetch_evict('cf_container', [name])
+    container = _cf_container_get_by_name(name)
+    if cdn_enabled:
+        _cf_container_make_public(container, ttl=ttl)
+    else:
+        _cf_container_make_private(container)
+    return _cf_container_to_dict(container)
+
+
+def cf_container_make_public(name, ttl=None, account=None):
+    _prefetch_evict('cf_container', [name])
+    container = _cf_container_get_by_name(name)
+    _cf_container_make_public(container, ttl)
+    return _cf_container_to_dict(container)
+
+
+def cf_container_make_private(name, account=None):
+    _prefetch_evict('cf_container', [name])
+    container = _cf_container_get_by_name(name)
+    _cf_container_make_private(container)
+    return _cf_container_to_dict(container)
+
+
+def cf_containers_ensure(containers, account=None):
+    """
+    Makes sure the given containers exist with their CDN settings. All
+    containers are read concurrently, then created or updated concurrently.
+
+    :param containers: A list of dicts with name and optionally cdn_enabled
+    and ttl, as taken by the cf_container_exists state
+    :return: A list with a dict for each container, in order, of the action
+    taken (None, created or updated), the created or updated container and
+    the error if it failed
+    """
+    _prefetch_evict('cf_container',
+                    [spec['name'] for spec in containers])
+
+    def ensure(spec):
+        result = {'action': None, 'container': None, 'error': None}
+        cdn_enabled = spec.get('cdn_enabled')
+        ttl = spec.get('ttl')
+        try:
+            try:
+                container = _cf_container_get_by_name(spec['name'])
+            except exc.NoSuchContainer:
+                container = _cf_container_create(spec['name'],
+                                                 cdn_enabled=cdn_enabled,
+                                                 ttl=ttl)
+                result['action'] = 'created'
+            else:
+                if (cdn_enabled is not None and
+                        cdn_enabled != container.cdn_enabled) or \
+                        (ttl is not None and ttl != container.cdn_ttl):
+                    if cdn_enabled:
+                        _cf_container_make_public(container, ttl=ttl)
+                    else:
+                        _cf_container_make_private(container)
+                    result['action'] = 'updated'
+            #Only rendered when changed, rendering reads the CDN settings
+            if result['action'] is not None:
+                result['container'] = _cf_container_to_dict(container)
+        except Exception as e:
+            logger.error(u'Unable to ensure container {0}: {1}'.format(
+                spec['name'], e))
+            result['action'] = None
+            result['error'] = six.text_type(e)
+        return result
+
+    return _parallel_map(ensure, containers)
+
+
+def cf_manifest_refresh(container_name, prefixes=None, full=False,
+                        account=None):
+    """
+    Brings the local object manifest of a container up to date.
+
+    By default only objects that sort after the stored marker are listed,
+    which picks up everything added since the last refresh. Objects that were
+    changed or removed under an already known name are only picked up when
+    their prefix is passed in prefixes or when doing a full refresh.
+
+    :param container_name: The name of the container
+    :param prefixes: A list of object name prefixes to re-list completely
+    :param full: Boolean to discard the manifest and re-list the container
+    :return: A dict with the number of objects listed and stored
+    """
+    container = _cf_container_get_by_name(container_name)
+    conn = _cf_manifest_connect(container_name)
+    try:
+        if full:
+            with conn:
+                conn.execute(u'DELETE FROM objects')
+                conn.execute(u'DELETE FROM meta')
+
+        listed = 0
+        for prefix in prefixes or []:
+            with conn:
+                conn.execute(
+                    u'DELETE FROM objects WHERE name >= ? '
+                    u'AND substr(name, 1, ?) = ?',
+                    (prefix, len(prefix), prefix))
+            listed += _cf_manifest_list(conn, container, prefix=prefix)[0]
+
+        marker = _cf_manifest_meta_get(conn, 'marker')
+        count, marker = _cf_manifest_list(conn, container, marker=marker)
+        listed += count
+
+        with conn:
+            _cf_manifest_meta_set(conn, 'marker', marker)
+            _cf_manifest_meta_set(conn, 'refreshed', time.time())
+        stored = conn.execute(u'SELECT COUNT(*) FROM objects').fetchone()[0]
+    finally:
+        conn.close()
+
+    return {'name': container_name, 'listed': listed, 'objects': stored}
+
+
+def cf_object_query(container_name, prefix=None, modified_since=None,
+                    refresh=False, account=None):
+    """
+    Queries the local object manifest of a container.
+
+    The manifest is only refreshed from the API if requested or if the
+    container has never been listed before.
+
+    :param container_name: The name of the container
+    :param prefix: Only return objects whose name starts with this prefix
+    :param modified_since: Only return objects modified at or after this ISO
+    8601 timestamp. Ex. 2014-05-01T00:00:00
+    :param refresh: Boolean to refresh the manifest before querying
+    :return: A list of dicts with the name, bytes, etag and last_modified of
+    each matching object
+    """
+    conn = _cf_manifest_connect(container_name)
+    try:
+        never_listed = _cf_manifest_meta_get(conn, 'refreshed') is None
+    finally:
+        conn.close()
+    if refresh or never_listed:
+        cf_manifest_refresh(container_name, account=account)
+
+    query = u'SELECT name, bytes, etag, last_modified FROM objects'
+    clauses = []
+    params = []
+    if prefix:
+        clauses.append(u'name >= ? AND substr(name, 1, ?) = ?')
+        params.extend([prefix, len(prefix), prefix])
+    if modified_since:
+        clauses.append(u'last_modified >= ?')
+        params.append(six.text_type(modified_since))
+    if clauses:
+        query += u' WHERE ' + u' AND '.join(clauses)
+    query += u' ORDER BY name'
+
+    conn = _cf_manifest_connect(container_name)
+    try:
+        rows = conn.execute(query, params).fetchall()
+    finally:
+        conn.close()
+
+    return [{'name': name, 'bytes': size, 'etag': etag,
+             'last_modified': last_modified}
+            for name, size, etag, last_modified in rows]
+
+
+@_single_flight
+def _cf_container_list(region='DFW'):
+    driver = _get_driver('cf', region)
+    #A single listing stops at CF_LISTING_LIMIT containers
+    containers = []
+    while True:
+        page = driver.get_all_containers(
+            limit=CF_LISTING_LIMIT,
+            marker=containers[-1].name if containers else None)
+        containers += page
+        if len(page) < CF_LISTING_LIMIT:
+            break
+    return containers
+
+
+@_single_flight
+@_hedged
+def _cf_container_get_by_name(name):
+    driver = _get_driver('cf')
+    container = driver.get_container(name)
+    return container
+
+
+def _cf_container_create(name, cdn_enabled=None, ttl=None):
+    driver = _get_driver('cf')
+    container = driver.create_container(name)
+    if cdn_enabled is not None and cdn_enabled:
+        _cf_container_make_public(container, ttl)
+    return container
+
+
+def _cf_container_delete(container):
+    container.delete()
+    return True
+
+
+def _cf_container_make_public(container, ttl=None):
+    container.make_public(ttl=ttl)
+    return True
+
+
+def _cf_container_make_private(container):
+    container.make_private()
+    return True
+
+
+def _cf_manifest_path(container_name):
+    """
+    Returns the path of the SQLite manifest for a container of the current
+    account, creating the parent directory if needed.
+
+    :param container_name: The name of the container
+    :return: A str path inside the minion cache directory
+    """
+    directory = os.path.join(__opts__['cachedir'], 'rackspace', 'cf_manifest')
+    account = _account()[0]
+    if account != DEFAULT_ACCOUNT:
+        directory = os.path.join(
+            directory, six.moves.urllib.parse.quote(account, safe=''))
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    filename = six.moves.urllib.parse.quote(container_name, safe='')
+    return os.path.join(directory, filename + '.sqlite')
+
+
+def _cf_manifest_connect(container_name):
+    """
+    Opens the manifest database of a container, creating its tables if needed.
+
+    :param container_name: The name of the container
+    :return: A sqlite3 connection
+    """
+    conn = sqlite3.connect(_cf_manifest_path(container_name))
+    with conn:
+        conn.execute(u'CREATE TABLE IF NOT EXISTS objects ('
+                     u'name TEXT PRIMARY KEY, bytes INTEGER, etag TEXT, '
+                     u'last_modified TEXT)')
+        conn.execute(u'CREATE INDEX IF NOT EXISTS objects_last_modified '
+                     u'ON objects (last_modified)')
+        conn.execute(u'CREATE TABLE IF NOT EXISTS meta ('
+                     u'key TEXT PRIMARY KEY, value TEXT)')
+    return conn
+
+
+def _cf_manifest_meta_get(conn, key):
+    row = conn.execute(u'SELECT value FROM meta WHERE key = ?',
+                       (key,)).fetchone()
+    return row[0] if row else None
+
+
+def _cf_manifest_meta_set(conn, key, value):
+    if value is None:
+        conn.execute(u'DELETE FROM meta WHERE key = ?', (key,))
+    else:
+        conn.execute(u'INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)',
+                     (key, six.text_type(value)))
+
+
+def _cf_manifest_list(conn, container, marker=None, prefix=None):
+    """
+    Lists a container page by page starting after marker and stores every
+    object found in the manifest.
+
+    :param conn: An open manifest connection
+    :param container: A pyrax container object
+    :param marker: The object name to start listing after
+    :param prefix: Only list objects starting with this prefix
+    :return: A tuple of the number of objects listed and the last name seen
+    """
+    count = 0
+    while True:
+        objects = container.get_objects(prefix=prefix, marker=marker,
+                                        limit=CF_LISTING_LIMIT)
+        if not objects:
+            break
+        with conn:
+            conn.executemany(
+                u'INSERT OR REPLACE INTO objects '
+                u'(name, bytes, etag, last_modified) VALUES (?, ?, ?, ?)',
+                [_cf_object_to_row(obj) for obj in objects])
+        count += len(objects)
+        marker = objects[-1].name
+        if len(objects) < CF_LISTING_LIMIT:
+            break
+    return count, marker
+
+
+def _cf_object_to_row(obj):
+    """
+    Converts a storage object to a manifest row
+    :param obj: A pyrax storage object
+    :return: A tuple of name, bytes, etag and last_modified
+    """
+    return (obj.name,
+            getattr(obj, 'bytes', getattr(obj, 'total_bytes', None)),
+            getattr(obj, 'hash', getattr(obj, 'etag', None)),
+            getattr(obj, 'last_modified', None))
+
+
+def _cf_container_to_dict(container):
+    return {
+        'name': container.name,
+        'cdn_enabled': container.cdn_enabled,
+        'cdn_ttl': container.cdn_ttl,
+        'cdn_log_retention': container.cdn_log_retention,
+        'cdn_uri': container.cdn_uri,
+        'cdn_ssl_uri': container.cdn_ssl_uri,
+        'cdn_streaming_uri': container.cdn_streaming_uri,
+        'cdn_ios_uri': container.cdn_ios_uri
+    }
+
+
+### Cloud Networks
+def net_list(region='DFW', accounts=None, account=None):
     """
-    Checks to see if record_type is a valid str/unicode object and if it is a
-    valid type of record.
-        Example types of records:
-           'A', 'AAAA', 'CNAME', 'MX' 'NS', 'PTR', 'SRV', 'TXT'
-
-    :param record_type: A str or unicode object matching one of the above
-    types of records
-    :return: True/False If it is a valid record type
-    :raise TypeError: If records_type is not a valid str or unicode object
+    Lists all networks and refreshes the cached label index
+    :param region: The region of the networks
+    :param accounts: 'ALL' or a list of accounts to query concurrently instead
+    of the default account. Each result is then tagged with its account.
+    :return: A list of network dicts
     """
-    if not isinstance(record_type, six.string_types):
-        raise TypeError(u"record_type must be str or unicode object")
+    if accounts is not None:
+        return _merge_account_results(_fan_out_accounts(
+            accounts, lambda name: net_list(region=region, account=name)))
+    return sorted(_net_index(region, refresh=True).values(),
+                  key=lambda network: network['label'])
 
-    if record_type.upper() in VALID_RECORD_TYPES:
-        return True
 
-    return False
+def net_get(label, region='DFW', account=None):
+    """
+    Retrieves a network by label from the cached label index
+    :param label: The label of the network
+    :param region: The region of the network
+    :return: A dict representation of the network
+    :raise NotFound: If no network has that label
+    """
+    network = _net_index(region).get(label)
+    if network is None:
+        raise exc.NotFound(404, u'Network {0} not found.'.format(label))
+    return dict(network)
 
 
-##Cloud Databases
-def db_flavor_list():
+def net_exists(label, cidr=None, region='DFW', account=None):
     """
-    Retrieves a list of all current available flavors
-
-    :return: A dict of database flavors keyed by their name.
+    Determines if a network exists using the cached label index
+    :param label: The label of the network
+    :param cidr: If provided the cidr must match as well
+    :param region: The region of the network
+    :return: True/False if the network is found
     """
-    output = []
-
-    for flavor in _db_flavor_list():
-        output.append(_db_flavor_to_dict(flavor))
-    return output
+    network = _net_index(region).get(label)
+    if network is None:
+        return False
+    return cidr is None or network['cidr'] == cidr
 
 
-def db_flavor_exists(name):
+def net_create(label, cidr, region='DFW', account=None):
     """
-    Determines if a DB flavor of the given name exists.
-
-    :param name: Name of the database flavor
-    :return: True/False if the instance already exists
+    Creates an isolated network
+    :param label: The label of the network
+    :param cidr: The cidr of the network. Ex. 192.168.0.0/24
+    :param region: The region to create the network in
+    :return: A dict representation of the network
+    :raise ValueError: If a network with that label exists
     """
-    flavor_list = _db_flavor_list()
+    if net_exists(label, region=region, account=account):
+        raise ValueError(u"Network Already Exists")
 
-    for item in flavor_list:
-        if item.name == name:
-            return True
-    return False
+    driver = _get_driver('net', region, account)
+    network = _net_to_dict(driver.create(label, cidr=cidr))
+    with _NET_LOCK:
+        _net_index(region)[label] = network
+    return dict(network)
 
 
-def db_flavor_get_by_name(name):
-    for flavor in _db_flavor_list():
-        if flavor.name == name:
-            return _db_flavor_to_dict(flavor)
-    error = u'Database flavor {0} not found.'.format(name)
-    raise exc.NotFound(error)
+def net_delete(label, region='DFW', account=None):
+    """
+    Deletes an isolated network
+    :param label: The label of the network
+    :param region: The region of the network
+    :return: True if the network was deleted
+    """
+    network = net_get(label, region=region, account=account)
+    driver = _get_driver('net', region, account)
+    driver.delete(network['id'])
+    with _NET_LOCK:
+        _net_index(region).pop(label, None)
+    return True
 
 
-def db_instance_list():
+def net_resolve(networks, region='DFW', account=None):
     """
-    Retrieves a list of rackspace cloud database instances
+    Resolves network labels to ids. Ids and the public/private aliases are
+    passed through without lookups and labels are read from the cached label
+    index, which is only built if it isn't already.
 
-    :return: Dict of db instances
+    :param networks: A list of network labels, ids or public/private
+    :param region: The region of the networks
+    :return: A list of network ids in the same order
     """
-    driver = _get_driver('db')
-    assert isinstance(driver, pyrax.CloudDatabaseClient)
+    return _net_resolve(networks, region)
 
-    output = []
 
-    for instance in driver.list():
-        output.append(_db_instance_to_dict(instance))
+def _net_resolve(networks, region='DFW'):
+    """
+    :raise ValueError: If a label isn't found
+    """
+    output = []
+    for network in networks or []:
+        if network in CS_NETWORK_ALIASES:
+            output.append(CS_NETWORK_ALIASES[network])
+        elif NET_ID_RE.match(network):
+            output.append(network)
+        else:
+            found = _net_index(region).get(network)
+            if found is None:
+                raise ValueError(u'No network found by: {}'.format(network))
+            output.append(found['id'])
     return output
 
 
-def db_instance_exists(name):
+def _net_index(region='DFW', refresh=False):
     """
-    Determines if a DB instance of the given name is already present.
+    Returns the per run index of network label to network dict, building it
+    from one network listing the first time it is needed.
 
-    :param name: Name of the database instance
-    :return: True/False if the instance already exists
+    :param region: The region of the networks
+    :param refresh: Boolean to rebuild the index from a new listing
+    :return: A dict of label to network dict
     """
-    for instance in db_instance_list():
-        if instance['name'] == name:
-            return True
-    return False
+    indexes = __context__.setdefault('rackspace.net_index', {})
+    region = region.upper()
+    key = (_account()[0], region)
+    with _NET_LOCK:
+        if refresh or key not in indexes:
+            driver = _get_driver('net', region)
+            indexes[key] = dict(
+                (network.label, _net_to_dict(network))
+                for network in driver.list())
+        else:
+            _count_cache_hit()
+        return indexes[key]
 
 
-def db_instance_get_by_name(name):
-    """
-    Retrieves a DB instance by name.
+def _net_to_dict(network):
+    return {'label': network.label, 'id': network.id,
+            'cidr': getattr(network, 'cidr', None)}
 
-    :param name: This is the name of the instance
-    :return: A dict representation of the instance
+
+### Cloud Block Storage
+def bs_volume_list(region='DFW', accounts=None, account=None):
     """
-    driver = _get_driver('db')
-    assert isinstance(driver, pyrax.CloudDatabaseClient)
+    Lists all block storage volumes
+    :param region: The region of the volumes
+    :param accounts: 'ALL' or a list of accounts to query concurrently instead
+    of the default account. Each result is then tagged with its account.
+    :return: A list of volume dicts
+    """
+    if accounts is not None:
+        return _merge_account_results(_fan_out_accounts(
+            accounts,
+            lambda name: bs_volume_list(region=region, account=name)))
+    return [_bs_volume_to_dict(volume) for volume in _bs_volume_list(region)]
 
-    instance = _db_instance_get_by_name(name)
 
-    return _db_instance_to_dict(instance)
+def bs_volume_get(name, region='DFW', account=None):
+    """
+    Retrieves a volume by name
+    :param name: The name of the volume
+    :param region: The region of the volume
+    :return: A dict representation of the volume
+    """
+    cached = _prefetched('bs_volume', name, region)
+    if cached is not None:
+        return cached
+    return _bs_volume_to_dict(_bs_volume_get_by_name(name, region))
 
 
-def db_instance_create(name, flavor, size):
+def bs_volume_exists(name, size=None, volume_type=None, region='DFW',
+                     account=None):
     """
-    Creates a rackspace database instance
-
-    :param name: The intended name for the database instance
-    :param flavor: The name of the database flavor
-    :param size: The size in GB of the database instance
-    :return: A dict of the created database instance :raise ValueError:
+    Determines if a volume exists
+    :param name: The name of the volume
+    :param size: If provided the size in GB must match as well
+    :param volume_type: If provided the type must match as well. Ex. SSD
+    :param region: The region of the volume
+    :return: True/False if the volume is found
     """
-    driver = _get_driver('db')
-    assert isinstance(driver, pyrax.CloudDatabaseClient)
+    try:
+        volume = _bs_volume_get_by_name(name, region)
+    except exc.NotFound:
+        return False
 
-    if db_instance_exists(name):
-        raise ValueError(u"Instance Already Exists")
+    if size is not None and volume.size != size:
+        return False
 
-    if size > MAX_DB_VOLUME_SIZE:
-        raise ValueError(u"Volume size must be less than 150")
+    if volume_type is not None and volume.volume_type != volume_type.upper():
+        return False
 
-    if not db_flavor_exists(flavor):
-        raise ValueError(u"Invalid Flavor")
+    return True
 
-    instance = driver.create(name, flavor=_db_flavor_get_by_name(flavor),
-                             volume=size)
-    #waiting for instance to finish building or hit the timeout before
-    # continuing one
-    pyrax.utils.wait_until(instance, "status", "ACTIVE", interval=1,
-                           attempts=TIMEOUT)
 
-    return _db_instance_to_dict(instance)
+def bs_volume_create(name, size, volume_type='SATA', server=None,
+                     mountpoint=None, region='DFW', timeout=BS_TIMEOUT,
+                     account=None):
+    """
+    Creates a volume, optionally attaching it to a server
+    :param name: The name of the volume
+    :param size: The size of the volume in GB
+    :param volume_type: SATA or SSD
+    :param server: The name or id of a server to attach the volume to
+    :param mountpoint: The device to attach the volume as. Ex. /dev/xvdb
+    :param region: The region to create the volume in
+    :param timeout: Seconds to wait for the volume to become available
+    :return: A dict representation of the volume
+    :raise ValueError: If the volume couldn't be created
+    """
+    result = bs_volumes_ensure([{'name': name, 'size': size,
+                                 'volume_type': volume_type,
+                                 'server': server,
+                                 'mountpoint': mountpoint}],
+                               region=region, timeout=timeout, account=account)
+    if name in result['failed']:
+        raise ValueError(result['failed'][name])
+    return bs_volume_get(name, region=region, account=account)
+
+
+def bs_volume_attach(name, server, mountpoint=None, region='DFW',
+                     timeout=BS_TIMEOUT, account=None):
+    """
+    Attaches a volume to a server
+    :param name: The name of the volume
+    :param server: The name or id of the server
+    :param mountpoint: The device to attach the volume as. Ex. /dev/xvdb
+    :param region: The region of the volume and server
+    :param timeout: Seconds to wait for the attachment
+    :return: A dict representation of the volume
+    :raise ValueError: If the volume couldn't be attached
+    """
+    result = bs_volumes_ensure([{'name': name, 'server': server,
+                                 'mountpoint': mountpoint}],
+                               region=region, timeout=timeout, account=account)
+    if name in result['failed']:
+        raise ValueError(result['failed'][name])
+    return bs_volume_get(name, region=region, account=account)
 
 
-def db_instance_delete(name):
+def bs_volume_detach(name, region='DFW', account=None):
     """
-    Deletes a given database instance.
-
-    :param name: The name of teh targeted instance
-    :return: Returns True if the instance was deleted.
+    Detaches a volume from its server
+    :param name: The name of the volume
+    :param region: The region of the volume
+    :return: True if the volume was detached
     """
-    instance = _db_instance_get_by_name(name)
-    instance.delete()
-    #TODO: test to make sure deletion went through correctly
-    return {name: {'deleted': True}}
+    _prefetch_evict('bs_volume', [name], region)
+    volume = _bs_volume_get_by_name(name, region)
+    volume.detach()
+    return True
 
 
-def db_database_create(name, instance_name, character_set=None, collate=None):
+def bs_volume_delete(name, region='DFW', account=None):
     """
-    Creates a database on a given db instance
-    :param name: The name of the database to be created
-    :param instance_name: The name of the instance to build the db on
-    :param character_set:
-    :param collate:
-    :return: A dict representation of the DB
+    Deletes a volume
+    :param name: The name of the volume
+    :param region: The region of the volume
+    :return: True if the volume was deleted
     """
-    instance = _db_instance_get_by_name(instance_name)
-    if instance.status == "BUILD":
-        msg = u"{0} instance is still Building, waiting up to {1} seconds"
-        logger.info(msg.format(instance.name, TIMEOUT))
-        pyrax.utils.wait_until(instance, "status", "ACTIVE", interval=1,
-                               attempts=TIMEOUT)
-    database = instance.create_database(name, character_set, collate)
+    _prefetch_evict('bs_volume', [name], region)
+    volume = _bs_volume_get_by_name(name, region)
+    volume.delete()
+    return True
 
-    #TODO Test to see if DB created successfully
-    return _db_database_to_dict(database)
 
+def bs_volumes_ensure(volumes, region='DFW', timeout=BS_TIMEOUT, test=False,
+                      account=None):
+    """
+    Makes sure the given volumes exist and are attached to their servers.
+
+    Existing volumes and servers are each read with one listing. Missing
+    volumes are created concurrently and attachments are made concurrently.
+    All waits are handled by one polling loop over the volume listing.
+
+    :param volumes: A list of dicts with name, size and optionally
+    volume_type, server and mountpoint
+    :param region: The region of the volumes
+    :param timeout: Seconds to wait for creations and attachments each
+    :param test: Boolean to only report the changes that would be made
+    :return: A dict of the created and attached volume names and the failed
+    volumes keyed by name with the error
+    """
+    _prefetch_evict('bs_volume',
+                    [spec['name'] for spec in volumes], region)
+    driver = _get_driver('bs', region, account)
+    existing = dict((volume.name, volume) for volume in driver.list())
+
+    server_ids = {}
+    if any(spec.get('server') for spec in volumes):
+        servers = _get_driver('cs', region, account).servers
+        for server in servers.list(detailed=True):
+            server_ids[server.name] = server.id
+            server_ids[server.id] = server.id
+
+    to_attach = []
+    failed = {}
+    for spec in volumes:
+        server = spec.get('server')
+        if not server:
+            continue
+        if server not in server_ids:
+            failed[spec['name']] = u'No server found by: {}'.format(server)
+            continue
+        volume = existing.get(spec['name'])
+        attached = [attachment.get('server_id') for attachment in
+                    getattr(volume, 'attachments', None) or []]
+        if server_ids[server] not in attached:
+            to_attach.append(spec)
+    to_create = [spec for spec in volumes
+                 if spec['name'] not in existing and
+                 spec['name'] not in failed]
 
-def db_database_exists(name, instance_name):
-    instance = _db_instance_get_by_name(instance_name)
+    output = {
+        'created': [spec['name'] for spec in to_create],
+        'attached': [spec['name'] for spec in to_attach],
+        'failed': failed,
+    }
+    if test:
+        return output
 
-    try:
-        instance.get_database(name)
-        return True
-    except exc.NoSuchDatabase:
-        return False
+    def create(spec):
+        try:
+            volume = driver.create(name=spec['name'], size=spec['size'],
+                                   volume_type=spec.get('volume_type',
+                                                        'SATA').upper())
+            return volume, None
+        except Exception as e:
+            logger.error(u'Unable to create volume {0}: {1}'.format(
+                spec['name'], e))
+            return None, e
+
+    creating = {}
+    for spec, (volume, error) in zip(to_create,
+                                     _parallel_map(create, to_create)):
+        if error is not None:
+            failed[spec['name']] = six.text_type(error)
+        else:
+            existing[spec['name']] = volume
+            creating[volume.id] = spec['name']
+    failed.update(_bs_wait(driver.list, creating, ['available'], timeout))
 
+    to_attach = [spec for spec in to_attach if spec['name'] not in failed]
 
-def db_database_list(instance_name):
-    instance = _db_instance_get_by_name(instance_name)
+    def attach(spec):
+        try:
+            existing[spec['name']].attach_to_instance(
+                server_ids[spec['server']], spec.get('mountpoint'))
+            return None
+        except Exception as e:
+            logger.error(u'Unable to attach volume {0}: {1}'.format(
+                spec['name'], e))
+            return e
+
+    attaching = {}
+    for spec, error in zip(to_attach, _parallel_map(attach, to_attach)):
+        if error is not None:
+            failed[spec['name']] = six.text_type(error)
+        else:
+            attaching[existing[spec['name']].id] = spec['name']
+    failed.update(_bs_wait(driver.list, attaching, ['in-use'], timeout))
 
-    output = []
+    output['created'] = [name for name in output['created']
+                         if name not in failed]
+    output['attached'] = [name for name in output['attached']
+                          if name not in failed]
+    return output
 
-    for db in instance.list_databases():
-        output.append(_db_database_to_dict(db))
-    return {instance_name: output}
 
+def bs_snapshot_list(region='DFW', accounts=None, account=None):
+    """
+    Lists all block storage snapshots
+    :param region: The region of the snapshots
+    :param accounts: 'ALL' or a list of accounts to query concurrently instead
+    of the default account. Each result is then tagged with its account.
+    :return: A list of snapshot dicts
+    """
+    if accounts is not None:
+        return _merge_account_results(_fan_out_accounts(
+            accounts,
+            lambda name: bs_snapshot_list(region=region, account=name)))
+    driver = _get_driver('bs', region, account)
+    return [_bs_snapshot_to_dict(snapshot)
+            for snapshot in driver.list_snapshots()]
+
+
+def bs_snapshots_create(volumes, name_pattern='{volume}', force=True,
+                        region='DFW', timeout=BS_TIMEOUT, wait=True,
+                        account=None):
+    """
+    Snapshots a set of volumes at as close to the same time as possible.
+
+    All snapshot requests are fired in parallel once the volumes have been
+    looked up. Completion is waited on with one polling loop over the
+    snapshot listing.
+
+    :param volumes: A list of volume names
+    :param name_pattern: The snapshot name, formatted with the volume name
+    :param force: Boolean to snapshot volumes that are attached
+    :param region: The region of the volumes
+    :param timeout: Seconds to wait for the snapshots to become available
+    :param wait: Boolean to wait for the snapshots to become available
+    :return: A dict of the created snapshots keyed by volume name, the
+    failures keyed by volume name and the seconds between the first and last
+    snapshot request
+    """
+    driver = _get_driver('bs', region, account)
+    existing = dict((volume.name, volume) for volume in driver.list())
+
+    failed = {}
+    targets = []
+    for name in volumes:
+        if name in existing:
+            targets.append(existing[name])
+        else:
+            failed[name] = u'No volume found by: {}'.format(name)
 
-def db_database_delete(name, instance_name):
-    instance = _db_instance_get_by_name(instance_name)
-    instance.delete_database(name)
-    #TODO: determine if DB was deleted
-    return True
+    def snapshot(volume):
+        started = time.time()
+        try:
+            created = driver.create_snapshot(
+                volume, name=name_pattern.format(volume=volume.name),
+                force=force)
+            return started, created, None
+        except Exception as e:
+            logger.error(u'Unable to snapshot volume {0}: {1}'.format(
+                volume.name, e))
+            return started, None, e
+
+    results = _parallel_map(snapshot, targets, workers=len(targets) or 1)
+
+    snapshots = {}
+    pending = {}
+    for volume, (_, created, error) in zip(targets, results):
+        if error is not None:
+            failed[volume.name] = six.text_type(error)
+        else:
+            snapshots[volume.name] = created
+            pending[created.id] = volume.name
 
+    if wait:
+        failed.update(_bs_wait(driver.list_snapshots, pending, ['available'],
+                               timeout))
 
-def db_database_get(name, instance_name):
-    instance = _db_instance_get_by_name(instance_name)
-    db = instance.get_database(name)
-    return _db_database_to_dict(db)
+    starts = [started for started, _, _ in results]
+    return {
+        'snapshots': dict((name, _bs_snapshot_to_dict(created))
+                          for name, created in snapshots.items()
+                          if name not in failed),
+        'failed': failed,
+        'spread': max(starts) - min(starts) if starts else 0,
+    }
 
 
-def db_user_create(name, instance_name, password, database_names, host=None):
+def bs_snapshot_delete(name, region='DFW', account=None):
     """
-    Creates a user in the given instance for all included databases
-    :param instance_name: Name of the instance to associate the user with
-    :param name: Name of the user
-    :param password: Password for the use
-    :param database_names: The name or list of banes of the database to give
-    this user privileges on
-    :param host: Mysql host expression
-    :return: A dict representation of the created user
+    Deletes a snapshot
+    :param name: The name of the snapshot
+    :param region: The region of the snapshot
+    :return: True if the snapshot was deleted
     """
-    instance = _db_instance_get_by_name(instance_name)
-    user = instance.create_user(name, password, database_names, host)
-    #TODO Possibly update the output here to reflect the instance associated
-    # with the user
-    return {instance: {'name': _db_user_to_dict(user), }}
+    driver = _get_driver('bs', region, account)
+    for snapshot in driver.list_snapshots():
+        if snapshot.name == name:
+            snapshot.delete()
+            return True
+    raise exc.NotFound(404, u'Snapshot {0} not found.'.format(name))
 
 
-def db_user_list(instance_name):
-    instance = _db_instance_get_by_name(instance_name)
+@_single_flight
+def _bs_volume_list(region='DFW'):
+    driver = _get_driver('bs', region)
+    return driver.list()
 
-    output = []
 
-    for user in instance.list_users():
-        output.append(_db_user_to_dict(user))
+def _bs_volume_get_by_name(name, region='DFW'):
+    """
+    Finds a volume by name
+    :raise NotFound: If no volume has that name
+    """
+    for volume in _bs_volume_list(region):
+        if volume.name == name:
+            return volume
+    raise exc.NotFound(404, u'Volume {0} not found.'.format(name))
 
-    return {instance_name: output}
+
+def _bs_wait(list_func, pending, statuses, timeout=BS_TIMEOUT):
+    """
+    Waits for volumes or snapshots to reach one of the given statuses, using
+    one listing per interval for all of them.
+
+    :param list_func: A callable returning all volumes or snapshots
+    :param pending: A dict of id to name of the items to wait on
+    :param statuses: A list of statuses that finish the wait
+    :param timeout: Seconds to wait
+    :return: A dict of errors keyed by name for items that didn't finish
+    """
+    pending = dict(pending)
+    errors = {}
+    deadline = time.time() + timeout
+    while pending:
+        for item in list_func():
+            name = pending.get(item.id)
+            if name is None:
+                continue
+            status = item.status.lower()
+            if status in statuses:
+                del pending[item.id]
+            elif status.startswith('error'):
+                del pending[item.id]
+                errors[name] = u'Status is {}'.format(item.status)
+        if not pending:
+            break
+        if time.time() >= deadline:
+            for name in pending.values():
+                errors[name] = u'Timed out waiting for {}'.format(
+                    u' or '.join(statuses))
+            break
+        time.sleep(BS_POLL_INTERVAL)
+    return errors
 
 
-def db_user_get(name, instance_name):
-    instance = _db_instance_get_by_name(instance_name)
-    user = instance.get_user(name)
-    return _db_user_to_dict(user)
+def _bs_volume_to_dict(volume):
+    return {
+        'name': volume.name,
+        'id': volume.id,
+        'size': volume.size,
+        'volume_type': volume.volume_type,
+        'status': volume.status,
+        'attachments': [
+            {'server_id': attachment.get('server_id'),
+             'device': attachment.get('device')}
+            for attachment in getattr(volume, 'attachments', None) or []],
+    }
 
 
-def db_user_delete(name, instance_name):
-    instance = _db_instance_get_by_name(instance_name)
-    instance.delete_user(name)
-    return True
+def _bs_snapshot_to_dict(snapshot):
+    return {
+        'name': snapshot.name,
+        'id': snapshot.id,
+        'volume_id': snapshot.volume_id,
+        'size': getattr(snapshot, 'size', None),
+        'status': snapshot.status,
+    }
 
 
-def db_user_update(name,
-                   instance_name,
-                   new_name=None,
-                   password=None,
-                   host=None):
-    instance = _db_instance_get_by_name(instance_name)
-    user = instance.get_user(name)
-    new_user = instance.update_user(
-        user,
-        name=new_name,
-        password=password,
-        host=host)
-    return _db_user_to_dict(new_user)
+### Cloud Monitoring
+def mon_entity_list(accounts=None, account=None):
+    """
+    Lists all monitoring entities on the account
+    :param accounts: 'ALL' or a list of accounts to query concurrently instead
+    of the default account. Each result is then tagged with its account.
+    :return: A list of entity dicts
+    """
+    if accounts is not None:
+        return _merge_account_results(_fan_out_accounts(
+            accounts, lambda name: mon_entity_list(account=name)))
+    driver = _get_driver('mon', account=account)
+    return [_mon_entity_to_dict(entity)
+            for entity in _mon_paginate(driver, u'/entities')]
 
 
-def _db_instance_get_by_name(name):
-    driver = _get_driver('db')
-    assert isinstance(driver, pyrax.CloudDatabaseClient)
-    try:
-        instance = driver.find(name=name)
-    except exc.NotFound:
-        instance = None
-    return instance
+def mon_overview(account=None):
+    """
+    Retrieves every entity with its checks and alarms using the paginated
+    overview listing
+    :return: A dict keyed by entity label with the entity, its checks keyed
+    by label and its alarms keyed by label
+    """
+    driver = _get_driver('mon', account=account)
+    return _mon_overview(driver)
 
 
-def _db_database_to_dict(database):
-    assert isinstance(database, pyrax.clouddatabases.CloudDatabaseDatabase)
-    #TODO: Add additional DB Output
-    output = {'name': database.name}
+def mon_checks_sync(entities, remove_unlisted=False, test=False, account=None):
+    """
+    Makes monitoring entities, checks and alarms match a declarative spec.
+
+    The current entities, checks and alarms are read once with the paginated
+    overview listing and diffed against the spec. Only the differences are
+    sent, concurrently, in three phases: entities, then checks, then alarms.
+
+    :param entities: A dict keyed by entity label of dicts with
+        checks: A dict keyed by check label of check fields
+        alarms: A dict keyed by alarm label of alarm fields. The check field
+        is the label of the check the alarm watches.
+        ip_addresses, agent_id, metadata: Used if the entity is created
+    :param remove_unlisted: Boolean to delete checks and alarms of the listed
+    entities that aren't in the spec
+    :param test: Boolean to only report the changes that would be made
+    :return: A dict of created, updated and removed entities, checks and
+    alarms as "entity/label" names, plus failures keyed by name
+    """
+    driver = _get_driver('mon', account=account)
+    current = _mon_overview(driver)
+
+    output = {'created': [], 'updated': [], 'removed': [], 'failed': {}}
+    entity_creates = []
+    check_changes = []
+    alarm_changes = []
+
+    for entity_label, spec in entities.items():
+        existing = current.get(entity_label)
+        if existing is None:
+            entity_creates.append((entity_label, spec))
+            existing = {'entity': None, 'checks': {}, 'alarms': {}}
+        check_changes.extend(_mon_diff(
+            entity_label, spec.get('checks', {}), existing['checks'],
+            MON_CHECK_FIELDS, remove_unlisted))
+
+        #Alarms reference checks by label, resolved to the id of the check
+        # if it already exists
+        alarms = {}
+        for label, alarm in spec.get('alarms', {}).items():
+            alarm = dict(alarm)
+            check = existing['checks'].get(alarm.get('check'))
+            if check is not None:
+                alarm['check_id'] = check['id']
+            alarms[label] = alarm
+        alarm_changes.extend(_mon_diff(
+            entity_label, alarms, existing['alarms'],
+            MON_ALARM_FIELDS + ['check_id'], remove_unlisted))
+
+    for entity_label, _ in entity_creates:
+        output['created'].append(entity_label)
+    for action, entity_label, label, _, _ in check_changes + alarm_changes:
+        output[action].append(u'{0}/{1}'.format(entity_label, label))
+    if test:
+        return output
+
+    entity_ids = dict((label, item['entity']['id'])
+                      for label, item in current.items())
+
+    def create_entity(item):
+        label, spec = item
+        body = {'label': label}
+        for field in ('ip_addresses', 'agent_id', 'metadata'):
+            if field in spec:
+                body[field] = spec[field]
+        resp, _ = driver.method_post(u'/entities', body=body)
+        return _mon_location_id(resp)
+
+    for (label, _), (entity_id, error) in zip(
+            entity_creates, _mon_apply(create_entity, entity_creates)):
+        if error is not None:
+            output['failed'][label] = error
+        else:
+            entity_ids[label] = entity_id
+
+    check_ids = {}
+    for label, item in current.items():
+        for check_label, check in item['checks'].items():
+            check_ids[(label, check_label)] = check['id']
+
+    def apply_check(change):
+        action, entity_label, label, spec, existing = change
+        uri = u'/entities/{0}/checks'.format(entity_ids[entity_label])
+        return _mon_write(driver, uri, action, label, spec, existing,
+                          MON_CHECK_FIELDS)
+
+    check_changes = _mon_skip_failed(check_changes, entity_ids, output)
+    for change, (check_id, error) in zip(
+            check_changes, _mon_apply(apply_check, check_changes)):
+        name = u'{0}/{1}'.format(change[1], change[2])
+        if error is not None:
+            output['failed'][name] = error
+        elif change[0] == 'created':
+            check_ids[(change[1], change[2])] = check_id
+
+    def apply_alarm(change):
+        action, entity_label, label, spec, existing = change
+        if spec is not None and 'check_id' not in spec:
+            spec = dict(spec, check_id=check_ids[(entity_label,
+                                                  spec['check'])])
+        uri = u'/entities/{0}/alarms'.format(entity_ids[entity_label])
+        return _mon_write(driver, uri, action, label, spec, existing,
+                          MON_ALARM_FIELDS + ['check_id'])
+
+    alarm_changes = _mon_skip_failed(alarm_changes, entity_ids, output)
+    for change, (_, error) in zip(alarm_changes,
+                                  _mon_apply(apply_alarm, alarm_changes)):
+        if error is not None:
+            output['failed'][u'{0}/{1}'.format(change[1], change[2])] = error
+
+    for action in ('created', 'updated', 'removed'):
+        output[action] = [name for name in output[action]
+                          if name not in output['failed']]
     return output
 
 
-def _db_user_to_dict(user):
-    assert isinstance(user, pyrax.clouddatabases.CloudDatabaseUser)
-    databases = [db['name'] for db in user.databases]
-    output = {'name': user.name, 'databases': databases, 'host': user.host}
+def _mon_paginate(driver, uri):
+    """
+    Reads every page of a monitoring listing
+    :param driver: A monitoring driver
+    :param uri: The listing URI. Ex. /entities
+    :return: A list of the listed values
+    """
+    values = []
+    marker = None
+    while True:
+        params = [('limit', MON_PAGE_SIZE)]
+        if marker:
+            params.append(('marker', marker))
+        _, body = driver.method_get(u'{0}?{1}'.format(
+            uri, six.moves.urllib.parse.urlencode(params)))
+        values.extend(body.get('values', []))
+        marker = body.get('metadata', {}).get('next_marker')
+        if not marker:
+            break
+    return values
+
+
+def _mon_overview(driver):
+    output = {}
+    for item in _mon_paginate(driver, u'/views/overview'):
+        output[item['entity']['label']] = {
+            'entity': item['entity'],
+            'checks': dict((check['label'], check)
+                           for check in item.get('checks', [])),
+            'alarms': dict((alarm['label'], alarm)
+                           for alarm in item.get('alarms', [])),
+        }
     return output
 
 
-def _db_instance_to_dict(instance):
+def _mon_diff(entity_label, desired, current, fields, remove_unlisted):
+    """
+    Diffs desired checks or alarms against the current ones
+    :return: A list of (action, entity label, label, spec, current) tuples
+    """
+    changes = []
+    for label, spec in desired.items():
+        existing = current.get(label)
+        if existing is None:
+            changes.append(('created', entity_label, label, spec, None))
+        elif any(existing.get(field) != spec[field] for field in fields
+                 if field in spec):
+            changes.append(('updated', entity_label, label, spec, existing))
+        elif 'check' in spec and 'check_id' not in spec:
+            #The alarm's check is about to be created
+            changes.append(('updated', entity_label, label, spec, existing))
+    if remove_unlisted:
+        for label, existing in current.items():
+            if label not in desired:
+                changes.append(('removed', entity_label, label, None,
+                                existing))
+    return changes
+
+
+def _mon_skip_failed(changes, entity_ids, output):
+    """
+    Drops changes for entities that failed to be created
+    """
+    kept = []
+    for change in changes:
+        if change[1] in entity_ids:
+            kept.append(change)
+        else:
+            output['failed'][u'{0}/{1}'.format(change[1], change[2])] = \
+                u'Entity {0} could not be created'.format(change[1])
+    return kept
+
+
+def _mon_write(driver, uri, action, label, spec, existing, fields):
+    """
+    Creates, updates or deletes a single check or alarm
+    :return: The id of the check or alarm
+    """
+    if action == 'removed':
+        driver.method_delete(u'{0}/{1}'.format(uri, existing['id']))
+        return existing['id']
+
+    body = dict((field, spec[field]) for field in fields if field in spec)
+    body['label'] = label
+    if action == 'updated':
+        driver.method_put(u'{0}/{1}'.format(uri, existing['id']), body=body)
+        return existing['id']
+
+    resp, _ = driver.method_post(uri, body=body)
+    return _mon_location_id(resp)
+
+
+def _mon_apply(func, items):
     """
-    Converts a database instance object to a dict
-    :param instance: A valid pyrax instance object
-    :return: A dict representation of the instance keyed by the instance name
+    Runs func for each item with bounded concurrency, capturing errors
+    :return: A list of (result, error message) tuples
     """
-    assert isinstance(instance, pyrax.clouddatabases.CloudDatabaseInstance)
-    return {
-        'name': instance.name,
-        'id': instance.id,
-        'status': instance.status,
-        'flavor': instance.flavor.name,
-        'hostname': instance.hostname
-    }
+    def call(item):
+        try:
+            return func(item), None
+        except Exception as e:
+            logger.error(u'Monitoring change failed: {}'.format(e))
+            return None, six.text_type(e)
+    return _parallel_map(call, items, workers=MON_WORKERS)
 
 
-def _db_flavor_list():
-    driver = _get_driver('db')
-    assert isinstance(driver, pyrax.CloudDatabaseClient)
+def _mon_location_id(resp):
+    return resp.headers['location'].rstrip('/').rsplit('/', 1)[-1]
 
-    return driver.list_flavors()
+
+def _mon_entity_to_dict(entity):
+    return {
+        'id': entity['id'],
+        'label': entity['label'],
+        'ip_addresses': entity.get('ip_addresses'),
+        'agent_id': entity.get('agent_id'),
+        'uri': entity.get('uri'),
+    }
 
 
-def _db_flavor_get_by_name(name):
+### Render lookups
+def prefetch(lookups, ttl=PREFETCH_TTL, account=None):
     """
-    Retrieves a database flavor object by name
-    :param name: A str/unicode object of the flavor name
-    :return: A pyrax flavor object
-    :raise ValueError: If no valid flavors are found
+    Resolves lookups concurrently and keeps the results for the *_get
+    functions, so an SLS can read everything its Jinja needs with one call
+    before using them. Ex.::
+
+        {% do salt['rackspace.prefetch']([['cf_container', 'assets'],
+                                          ['db_instance', 'app']]) %}
+
+    :param lookups: A list of [kind, name] or [kind, name, region] lists.
+    Kinds are cf_container, db_flavor, db_instance, dns_zone, and lb and
+    bs_volume, which take a region
+    :param ttl: Seconds the results are served to the *_get functions. A
+    result is dropped as soon as this module creates, changes or deletes its
+    object.
+    :return: A dict of the number of lookups fetched and the failed ones,
+    keyed by kind:name, with their error
     """
-    driver = _get_driver('db')
-    assert isinstance(driver, pyrax.CloudDatabaseClient)
-    flavor_list = driver.list_flavors()
+    getters = _prefetch_getters()
+    for lookup in lookups:
+        if lookup[0] not in getters:
+            raise ValueError(u'Not a valid lookup kind: {0}. Choose from '
+                             u'{1}'.format(lookup[0], sorted(getters)))
+    keys = list(set(_prefetch_key(*lookup) for lookup in lookups))
+
+    def fetch(key):
+        _, kind, name, region = key
+        try:
+            if region is None:
+                return getters[kind](name), None
+            return getters[kind](name, region=region), None
+        except Exception as e:
+            logger.error(u'Unable to prefetch {0} {1}: {2}'.format(kind, name,
+                                                                   e))
+            return None, e
+
+    cache = __context__.setdefault('rackspace.prefetch', {})
+    expires = time.time() + ttl
+    failed = {}
+    for key, (value, error) in zip(keys, _parallel_map(fetch, keys)):
+        if error is not None:
+            failed[u'{1}:{2}'.format(*key)] = six.text_type(error)
+            continue
+        cache[key] = (expires, value)
+    return {'fetched': len(keys) - len(failed), 'failed': failed}
+
+
+def _prefetch_getters():
+    return {
+        'cf_container': cf_container_get,
+        'db_flavor': db_flavor_get_by_name,
+        'db_instance': db_instance_get_by_name,
+        'dns_zone': dns_zone_get,
+        'lb': lb_get,
+        'bs_volume': bs_volume_get,
+    }
 
-    for flavor in flavor_list:
-        if flavor.name == name:
-            return flavor
 
-    raise ValueError(u"No Flavor by that name")
+def _prefetch_key(kind, name, region=None):
+    if region is None and kind in ('lb', 'bs_volume'):
+        region = 'DFW'
+    return _account()[0], kind, name, region.upper() if region else None
 
 
-def _db_flavor_to_dict(flavor):
+def _prefetch_evict(kind, names, region=None):
     """
-    Converts a flavor object to a dict
-    :param flavor: A valid pyrax flavor object
-    :return: A dict representation of the flavor keyed by the flavor name
+    Drops what prefetch stored for the given objects, so the *_get functions
+    read them again once they are changed
     """
-    assert isinstance(flavor, pyrax.clouddatabases.CloudDatabaseFlavor)
-    return {'name': flavor.name, 'ram': flavor.ram, 'id': flavor.id}
+    cache = __context__.get('rackspace.prefetch')
+    if cache:
+        for name in names:
+            cache.pop(_prefetch_key(kind, name, region), None)
 
 
-### Cloud Files
-#TODO: Add Exception handling
+def _prefetched(kind, name, region=None):
+    """
+    :return: A copy of what prefetch stored for the lookup if it hasn't
+    expired, None otherwise
+    """
+    cache = __context__.get('rackspace.prefetch')
+    if not cache:
+        return None
+    key = _prefetch_key(kind, name, region)
+    entry = cache.get(key)
+    if entry is None:
+        return None
+    if entry[0] < time.time():
+        cache.pop(key, None)
+        return None
+    _count_cache_hit()
+    return copy.deepcopy(entry[1])
+
+
+### Dry runs
+def plan_snapshot(zones=None, instances=None, containers=None, account=None):
+    """
+    Reads everything a dry run of the given objects needs, concurrently and
+    once per object, so states can compute their changes without querying
+    the API themselves.
+
+    :param zones: A list of DNS zone names, read with all of their records
+    :param instances: A list of database instance names, read from a single
+    instance listing
+    :param containers: A list of Cloud Files container names, read with
+    their CDN settings
+    :return: A dict of zones, instances and containers, each a dict keyed by
+    name of a dict or None for objects that don't exist
+    """
+    tasks = [('zones', name) for name in set(zones or [])]
+    tasks += [('containers', name) for name in set(containers or [])]
+    if instances:
+        tasks.append(('instances', None))
+
+    def read(task):
+        kind, name = task
+        if kind == 'zones':
+            return _plan_zone(name)
+        if kind == 'containers':
+            return _plan_container(name)
+        return _plan_instances()
+
+    output = {'zones': {}, 'instances': {}, 'containers': {}}
+    for (kind, name), result in zip(tasks, _parallel_map(read, tasks)):
+        if kind == 'instances':
+            for instance_name in instances:
+                output['instances'][instance_name] = result.get(instance_name)
+        else:
+            output[kind][name] = result
+    return output
+
 
-def cf_container_exists(name, cdn_enabled=None, ttl=None):
+def _plan_zone(name):
+    try:
+        zone = _dns_zone_get_by_name(name)
+    except exc.NotFound:
+        return None
+    records = []
+    for record in _dns_record_list(zone):
+        output = _dns_record_to_dict(record)
+        #Only priority records carry a priority, asking others for it would
+        # lazy load every record
+        output['priority'] = record.priority \
+            if record.type in PRIORITY_RECORD_TYPES else None
+        records.append(output)
+    return {'name': zone.name, 'email_address': zone.emailAddress,
+            'ttl': zone.ttl, 'records': records}
+
+
+def _plan_container(name):
     try:
         container = _cf_container_get_by_name(name)
     except exc.NoSuchContainer:
-        return False
-
-    if cdn_enabled is not None:
-        if cdn_enabled != container.cdn_enabled:
-            logger.debug(
-                u"CDN found to not match:: found: {0} -- provided {1}".format(
-                    container.cdn_enabled, cdn_enabled))
-            return False
-
-    if ttl is not None:
-        if ttl != container.cdn_ttl:
-            logger.debug(
-                u"CDN ttl not a match:: found: {0} -- provided {1}".format(
-                    container.cdn_ttl, ttl))
-            return False
-
-    return True
+        return None
+    return {'name': container.name, 'cdn_enabled': container.cdn_enabled,
+            'cdn_ttl': container.cdn_ttl}
 
 
-def cf_container_list():
-    containers = _cf_container_list()
-    return [_cf_container_to_dict(container) for container in containers]
+def _plan_instances():
+    """
+    Lists every database instance, following the listing marker
+    :return: A dict of instance name to a dict of its id and status
+    """
+    driver = _get_driver('db')
+    output = {}
+    marker = None
+    while True:
+        page = driver.list(limit=PAGE_SIZE, marker=marker)
+        if not page:
+            break
+        for instance in page:
+            output[instance.name] = {'name': instance.name,
+                                     'id': instance.id,
+                                     'status': instance.status}
+        marker = page[-1].id
+    return output
 
 
-def cf_container_create(name, cdn_enabled=None, ttl=None):
-    container = _cf_container_create(name, cdn_enabled=cdn_enabled, ttl=ttl)
-    return _cf_container_to_dict(container)
+### Inventory
+#The row type of each inventory table, and the fields identifying a row
+_INVENTORY_TABLES = collections.OrderedDict([
+    ('dns_zones', (collections.namedtuple(
+        '_DnsZoneRow', 'account id name email ttl updated'),
+        ('account', 'id'))),
+    ('dns_records', (collections.namedtuple(
+        '_DnsRecordRow',
+        'account zone id name type data ttl priority updated'),
+        ('account', 'zone', 'id'))),
+    ('db_instances', (collections.namedtuple(
+        '_DbInstanceRow',
+        'account region id name status flavor size hostname'),
+        ('account', 'region', 'id'))),
+    ('cf_containers', (collections.namedtuple(
+        '_CfContainerRow',
+        'account region name count bytes cdn_enabled cdn_ttl'),
+        ('account', 'region', 'name'))),
+    ('load_balancers', (collections.namedtuple(
+        '_LbRow', 'account region id name port protocol algorithm status '
+                  'nodes virtual_ips updated'),
+        ('account', 'region', 'id'))),
+])
+
+
+def inventory(regions='ALL', accounts=None, account=None):
+    """
+    Reads every DNS zone and record, database instance, Cloud Files
+    container and load balancer of the account, querying each service and
+    region concurrently. Only listings are read, straight from their
+    responses, so no request is sent per object besides one record listing
+    per zone.
+
+    :param regions: 'ALL' or a list of regions to read the regional
+    services from
+    :param accounts: 'ALL' or a list of accounts to read concurrently
+    instead of the default account
+    :return: A dict of table name to a dict of its fields, the key fields
+    identifying a row and its columns, a list of values per field
+    """
+    if accounts is not None:
+        output = None
+        for _, tables in _fan_out_accounts(
+                accounts,
+                lambda name: inventory(regions=regions, account=name)):
+            if output is None:
+                output = tables
+                continue
+            for name, table in tables.items():
+                for column, values in zip(output[name]['columns'],
+                                          table['columns']):
+                    column.extend(values)
+        return output
+
+    account = _account(account)[0]
+    tasks = [('dns', None)]
+    for driver_type in ('db', 'cf', 'lb'):
+        tasks += [(driver_type, region)
+                  for region in _get_regions(driver_type, regions)]
+    readers = {'dns': _inventory_dns, 'db': _inventory_db,
+               'cf': _inventory_cf, 'lb': _inventory_lb}
+
+    rows = dict((name, []) for name in _INVENTORY_TABLES)
+    for read in _parallel_map(
+            lambda task: readers[task[0]](account, task[1]), tasks):
+        for name, table_rows in read.items():
+            rows[name] += table_rows
+
+    output = collections.OrderedDict()
+    for name, (row_type, key) in _INVENTORY_TABLES.items():
+        table_rows = rows.pop(name)
+        columns = [list(column) for column in zip(*table_rows)] or \
+            [[] for _ in row_type._fields]
+        del table_rows
+        output[name] = {'fields': list(row_type._fields), 'key': list(key),
+                        'columns': columns}
+    return output
 
 
-def cf_container_get(name):
-    container = _cf_container_get_by_name(name)
-    return _cf_container_to_dict(container)
+def _inventory_dns(account, region):
+    zone_row, _ = _INVENTORY_TABLES['dns_zones']
+    record_row, _ = _INVENTORY_TABLES['dns_records']
+    zones = _dns_zone_list()
+    zone_rows = [zone_row(account, zone._info.get('id'), zone._info['name'],
+                          zone._info.get('emailAddress'),
+                          zone._info.get('ttl'), zone._info.get('updated'))
+                 for zone in zones]
+
+    def records(zone):
+        return [record_row(account, zone.name, info.get('id'),
+                           info['name'], info['type'], info.get('data'),
+                           info.get('ttl'), info.get('priority'),
+                           info.get('updated'))
+                for info in _dns_record_infos(zone)]
+
+    record_rows = []
+    for zone_records in _parallel_map(records, zones):
+        record_rows += zone_records
+    return {'dns_zones': zone_rows, 'dns_records': record_rows}
+
+
+def _inventory_db(account, region):
+    row, _ = _INVENTORY_TABLES['db_instances']
+    driver = _get_driver('db', region, account)
+    flavors = dict((six.text_type(flavor.id), flavor.name)
+                   for flavor in _db_flavor_list(region))
+    output = []
+    uri = u'/instances?limit={0}'.format(PAGE_SIZE)
+    while True:
+        #Raw pages: pyrax loads the details of every instance it is given
+        _, body = driver.method_get(uri)
+        page = body.get('instances') or []
+        for info in page:
+            flavor_id = six.text_type((info.get('flavor') or {}).get('id'))
+            output.append(row(account, region, info.get('id'), info['name'],
+                              info.get('status'),
+                              flavors.get(flavor_id, flavor_id),
+                              (info.get('volume') or {}).get('size'),
+                              info.get('hostname')))
+        if not page or not any(link.get('rel') == 'next'
+                               for link in body.get('links') or []):
+            break
+        uri = u'/instances?limit={0}&marker={1}'.format(PAGE_SIZE,
+                                                        page[-1]['id'])
+    return {'db_instances': output}
 
 
-def cf_container_delete(name):
-    container = _cf_container_get_by_name(name)
-    return _cf_container_delete(container)
+def _inventory_cf(account, region):
+    row, _ = _INVENTORY_TABLES['cf_containers']
+    driver = _get_driver('cf', region, account)
+    #One CDN listing instead of a CDN request per container
+    cdn = {}
+    try:
+        while True:
+            #pyrax leaves & = ? and , of the URI unquoted, container names
+            # are passed as params for requests to encode
+            params = {'limit': CF_LISTING_LIMIT}
+            if cdn:
+                params['marker'] = max(cdn)
+            _, page = driver.cdn_request(u'', 'GET', params=params)
+            for info in page or []:
+                cdn[info['name']] = info
+            if len(page or []) < CF_LISTING_LIMIT:
+                break
+    except exc.NotCDNEnabled:
+        pass
 
+    output = []
+    while True:
+        params = {'limit': CF_LISTING_LIMIT}
+        if output:
+            params['marker'] = output[-1].name
+        _, page = driver.method_get(u'/', params=params)
+        for info in page or []:
+            cdn_info = cdn.get(info['name']) or {}
+            output.append(row(account, region, info['name'],
+                              info.get('count'), info.get('bytes'),
+                              bool(cdn_info.get('cdn_enabled')),
+                              cdn_info.get('ttl')))
+        if len(page or []) < CF_LISTING_LIMIT:
+            return {'cf_containers': output}
+
+
+def _inventory_lb(account, region):
+    row, _ = _INVENTORY_TABLES['load_balancers']
+    driver = _get_driver('lb', region, account)
+    output = []
+    for lb in driver.list():
+        info = lb._info
+        output.append(row(account, region, info.get('id'), info['name'],
+                          info.get('port'), info.get('protocol'),
+                          info.get('algorithm'), info.get('status'),
+                          info.get('nodeCount'),
+                          u','.join(vip.get('address', u'') for vip in
+                                    info.get('virtualIps') or []),
+                          (info.get('updated') or {}).get('time')))
+    return {'load_balancers': output}
 
-def cf_container_update(name, cdn_enabled, ttl=None):
-    container = _cf_container_get_by_name(name)
-    if cdn_enabled:
-        _cf_container_make_public(container, ttl=ttl)
-    else:
-        _cf_container_make_private(container)
-    return _cf_container_to_dict(container)
 
+#### Utility Functions
+class _ServiceCatalog(object):
+    """
+    Read only index of service name -> region -> endpoint URL, parsed once
+    from the identity's service catalog after authenticating.
+    """
+    __slots__ = ('_services',)
+
+    def __init__(self, services):
+        """
+        :param services: A dict of service name to a dict of region to
+        endpoint URL
+        """
+        frozen = dict((name, tuple(sorted(endpoints.items())))
+                      for name, endpoints in services.items())
+        object.__setattr__(self, '_services', frozen)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(u'The service catalog is read only')
+
+    def __contains__(self, service_name):
+        return service_name in self._services
+
+    def regions(self, service_name):
+        """
+        :return: A tuple of upper case region names, ('ALL',) for global
+        services
+        """
+        return tuple(region for region, _ in self._services[service_name])
+
+    def url(self, service_name, region):
+        """
+        :return: The public URL of the service in the region
+        """
+        return dict(self._services[service_name])[region.upper()]
+
+    @classmethod
+    def from_identity(cls, identity):
+        """
+        Parses a pyrax identity's service catalog.
+        """
+        services = {}
+        for name, service in identity.services.items():
+            if isinstance(service, dict):
+                endpoints = service['endpoints']
+            else:
+                endpoints = service.endpoints
+            services[name] = dict(
+                (region.upper(), _endpoint_url(endpoint))
+                for region, endpoint in endpoints.items())
+        return cls(services)
 
-def cf_container_make_public(name, ttl=None):
-    container = _cf_container_get_by_name(name)
-    _cf_container_make_public(container, ttl)
-    return _cf_container_to_dict(container)
 
+def _endpoint_url(endpoint):
+    if isinstance(endpoint, dict):
+        return endpoint.get('public_url', endpoint.get('publicURL'))
+    return getattr(endpoint, 'public_url', None)
 
-def cf_container_make_private(name):
-    container = _cf_container_get_by_name(name)
-    _cf_container_make_private(container)
-    return _cf_container_to_dict(container)
 
+def _accounts():
+    """
+    Reads the account profiles from pillar, the flat username and apikey
+    being the profile named default
 
-def _cf_container_list():
-    driver = _get_driver('cf')
-    return driver.get_all_containers()
+    :return: A tuple of a dict of account name to its credentials and the
+    default account name, None if there isn't one
+    """
+    rackspace = __salt__['config.get']('rackspace')
+    accounts = dict(rackspace.get('accounts') or {})
+    if rackspace.get('username'):
+        accounts.setdefault(DEFAULT_ACCOUNT,
+                            {'username': rackspace['username'],
+                             'apikey': rackspace['apikey']})
+    default = rackspace.get('default_account')
+    if default is None:
+        if DEFAULT_ACCOUNT in accounts:
+            default = DEFAULT_ACCOUNT
+        elif len(accounts) == 1:
+            default = next(iter(accounts))
+    return accounts, default
+
+
+def _account(account=None):
+    """
+    Resolves the account to use: the given one, the one of the current call
+    or the default one
 
+    :return: A tuple of the account name and its credentials
+    :raise ValueError: If there is no such account, or no account was given
+    and there is no default one
+    """
+    accounts, default = _accounts()
+    name = account or _current_account() or default
+    if name is None:
+        raise ValueError(u'No account given and no default_account set, '
+                         u'choose from {0}'.format(sorted(accounts)))
+    if name not in accounts:
+        raise ValueError(u'No account found by: {0}'.format(name))
+    return name, accounts[name]
 
-def _cf_container_get_by_name(name):
-    driver = _get_driver('cf')
-    container = driver.get_container(name)
-    return container
 
+def _get_accounts(accounts):
+    """
+    Resolves the accounts argument of the list functions.
 
-def _cf_container_create(name, cdn_enabled=None, ttl=None):
-    driver = _get_driver('cf')
-    container = driver.create_container(name)
-    if cdn_enabled is not None and cdn_enabled:
-        container = _cf_container_make_public(container, ttl)
-    return container
+    :param accounts: 'ALL' or a list of account names
+    :return: A list of account names
+    :raise ValueError: If an account isn't configured
+    """
+    configured, _ = _accounts()
+    if isinstance(accounts, six.string_types):
+        if accounts.upper() == 'ALL':
+            return sorted(configured)
+        accounts = [accounts]
+    for name in accounts:
+        if name not in configured:
+            raise ValueError(u'No account found by: {0}'.format(name))
+    return list(accounts)
+
+
+def _fan_out_accounts(accounts, func):
+    """
+    Calls func(account) concurrently for each requested account.
 
+    :param accounts: 'ALL' or a list of account names
+    :param func: A callable taking an account name
+    :return: A list of (account, result) tuples
+    """
+    accounts = _get_accounts(accounts)
+    return list(zip(accounts, _parallel_map(func, accounts)))
 
-def _cf_container_delete(container):
-    container.delete()
-    return True
 
+def _merge_account_results(results):
+    """
+    Merges per account lists of dicts into a single list, tagging each dict
+    with its account. Any other results are returned keyed by account
+    instead.
 
-def _cf_container_make_public(container, ttl=None):
-    container.make_public(ttl=ttl)
-    return True
+    :param results: A list of (account, result) tuples
+    :return: A list of dicts, or a dict of account to result
+    """
+    if not all(isinstance(result, list) and
+               all(isinstance(item, dict) for item in result)
+               for _, result in results):
+        return dict(results)
+    output = []
+    for account, items in results:
+        for item in items:
+            item['account'] = account
+            output.append(item)
+    return output
 
 
-def _cf_container_make_private(container):
-    container.make_private()
-    return True
+def _auth(account=None):
+    """
+    Authenticates against the rackspace api based on values found in pillar.
+
+    Authentication uses an identity of its own per account, created with
+    pyrax.create_context, instead of pyrax's global identity, so parallel
+    states and other users of pyrax in the same process can't re-authenticate
+    over it. The identity, its token and the parsed service catalog are cached
+    per account in __context__ and reused until shortly before the token
+    expires, including by processes forked after authenticating.
+
+    :param account: The account name, the current or default one if None
+    :return: A dict of the account, username, identity, token, token expiry
+    and service catalog
+    """
+    account, credentials = _account(account)
+    username = credentials['username']
+    apikey = credentials['apikey']
+
+    if _PID != os.getpid():
+        _after_fork()
+
+    with _AUTH_LOCK:
+        lock = _AUTH_LOCKS.setdefault(account, threading.Lock())
+    #Serialized per account so concurrent region queries don't
+    # re-authenticate over each other
+    with lock:
+        auths = __context__.setdefault('rackspace.auth', {})
+        cached = auths.get(account)
+        if (cached is not None and cached['username'] == username and
+                cached['expires'] > time.time() and
+                cached['identity'].authenticated):
+            _count_cache_hit()
+            return cached
+
+        identity = pyrax.create_context('rackspace', username=username,
+                                        api_key=apikey)
+        try:
+            identity.authenticate()
+        except exc.AuthenticationFailed:
+            logger.error(
+                u"Unable to authenticate with the provided credentials of "
+                u"{0}".format(username))
+            raise
 
+        cached = {
+            'account': account,
+            'username': username,
+            'identity': identity,
+            'token': identity.token,
+            'expires': _token_expiry(identity),
+            'catalog': _ServiceCatalog.from_identity(identity),
+        }
+        auths[account] = cached
+        return cached
 
-def _cf_container_to_dict(container):
-    return {
-        'name': container.name,
-        'cdn_enabled': container.cdn_enabled,
-        'cdn_ttl': container.cdn_ttl,
-        'cdn_log_retention': container.cdn_log_retention,
-        'cdn_uri': container.cdn_uri,
-        'cdn_ssl_uri': container.cdn_ssl_uri,
-        'cdn_streaming_uri': container.cdn_streaming_uri,
-        'cdn_ios_uri': container.cdn_ios_uri
-    }
 
+def _after_fork():
+    """
+    Replaces the locks, in flight reads, token buckets, hedging attempts and
+    drivers inherited from the parent in a forked process, as states run with
+    parallel: True are. The parent's threads that held them don't exist in the
+    child, and drivers may hold the parent's connections. The authenticated
+    identity is kept, its token is still valid.
 
-#### Utility Functions
-def _auth():
+    Called by the first instrumented call or authentication made in the child.
     """
-    Authenticates against the rackspace api based on values found in pillar
+    global _PID, _AUTH_LOCK, _AUTH_LOCKS, _NET_LOCK, _RATE_LOCK, \
+        _RATE_LIMIT_LOCKS, _RATE_BUCKETS, _BREAKER_LOCK, _FLIGHT_LOCK, \
+        _IN_FLIGHT, _STATS_LOCK, _CLIENTS, _HEDGE_LOCK, _HEDGE_ATTEMPTS, \
+        _HEDGE_THREADS
+    _PID = os.getpid()
+    _AUTH_LOCK = threading.Lock()
+    _AUTH_LOCKS = {}
+    _NET_LOCK = threading.RLock()
+    _RATE_LOCK = threading.Lock()
+    _RATE_LIMIT_LOCKS = {}
+    _RATE_BUCKETS = {}
+    #Breakers keep what the parent learned about failing services
+    _BREAKER_LOCK = threading.Lock()
+    for breaker in _BREAKERS.values():
+        breaker.lock = threading.Lock()
+        breaker.probing = False
+    _FLIGHT_LOCK = threading.Lock()
+    _IN_FLIGHT = {}
+    _STATS_LOCK = threading.Lock()
+    _CLIENTS = threading.local()
+    _HEDGE_LOCK = threading.Lock()
+    _HEDGE_ATTEMPTS = {}
+    _HEDGE_THREADS = None
+
+
+def _token_expiry(identity):
     """
-    rackspace = __salt__['config.get']('rackspace')
-    username = rackspace['username']
-    apikey = rackspace['apikey']
+    Returns the time after which a token should no longer be reused.
 
-    try:
-        pyrax.set_credentials(username, apikey)
-    except exc.AuthenticationFailed:
-        logger.error(
-            u"Unable to authenticate with the provided credentials, "
-            u"{0}, {1}, {2}".format(username, apikey, rackspace)
-        )
+    :param identity: An authenticated pyrax identity
+    :return: A unix timestamp
+    """
+    expires = getattr(identity, 'expires', None)
+    if isinstance(expires, datetime.datetime):
+        expires = calendar.timegm(expires.utctimetuple())
+    else:
+        expires = time.time() + DEFAULT_TOKEN_LIFETIME
+    return expires - TOKEN_EXPIRY_MARGIN
 
 
-def _get_driver(driver_type, region='DFW'):
+def _get_driver(driver_type, region='DFW', account=None):
     """
     Returns the appropriate diver for the specified rackspace product.
 
@@ -997,88 +4922,608 @@ def _get_driver(driver_type, region='DFW'):
     driver above.
     :param region: A str or unicode object specify which region the driver
     should be initialized for.
-    :return: A driver object initialized to the specified region
+    :param account: The account name, the current or default one if None
+    :return: A driver object initialized to the specified region, private
+    to the calling thread
     :raise TypeError:
     :raise KeyError: If no valid drivers are found
+    :raise ValueError: If the service has no endpoint in the region
     """
-    _auth()
+    auth = _auth(account)
     if not isinstance(driver_type, six.string_types):
         raise TypeError("driver_type must be str or unicode object")
     if not isinstance(region, six.string_types):
         raise TypeError("region must be str or unicode object")
     region = region.upper()
 
-    if driver_type == "lb":
-        return pyrax.connect_to_cloud_loadbalancers(region)
+    if driver_type not in SERVICE_NAMES:
+        raise KeyError(u"No Driver found by: {}".format(driver_type))
+    if not _check_region(driver_type, region, auth['account']):
+        raise ValueError(u'{0} is not available in region {1}'.format(
+            SERVICE_NAMES[driver_type], region))
+
+    #Clients aren't shared between threads, and belong to one identity
+    pools = getattr(_CLIENTS, 'pools', None)
+    if pools is None:
+        pools = _CLIENTS.pools = {}
+    clients = pools.get(auth['account'])
+    if clients is None or clients['identity'] is not auth['identity']:
+        clients = pools[auth['account']] = {'identity': auth['identity'],
+                                             'drivers': {}}
+    client = clients['drivers'].get((driver_type, region))
+    if client is not None:
+        return client
+
+    service = SERVICE_NAMES[driver_type]
+    endpoint_region = region
+    if 'ALL' in auth['catalog'].regions(service):
+        endpoint_region = 'ALL'
+    if driver_type == 'net':
+        #Cloud Networks is served from the compute endpoint
+        service = 'cloud_networks'
+    client = auth['identity'].get_client(service, endpoint_region,
+                                         cached=False)
+
+    client = _schedule_client(client, driver_type, region, auth['account'])
+    clients['drivers'][(driver_type, region)] = client
+    return client
+
+
+def _schedule_client(client, driver_type, region, account):
+    """
+    Routes every request of a driver through the rate limit scheduler.
+
+    pyrax clients send all requests through _api_request, while the cloud
+    servers client is novaclient based and sends them through the
+    _cs_request of its HTTP client.
 
-    if driver_type == "db":
-        return pyrax.connect_to_cloud_databases(region)
+    :param client: A driver as returned by pyrax
+    :param driver_type: A driver type as accepted by _get_driver. Ex. lb
+    :param region: The region the driver was initialized for
+    :param account: The account of the driver, rate limits are per account
+    :return: The same client
+    """
+    if driver_type == 'cs':
+        target, method_name = getattr(client, 'client', None), '_cs_request'
+    else:
+        target, method_name = client, '_api_request'
+    send = getattr(target, method_name, None)
+    if send is None or getattr(send, 'rackspace_scheduled', False):
+        return client
 
-    if driver_type == "dns":
-        return pyrax.connect_to_cloud_dns()
+    service = SERVICE_NAMES[driver_type]
+    if 'ALL' in _get_endpoints(service, account):
+        region = 'ALL'
 
-    if driver_type == "bs":
-        return pyrax.connect_to_cloud_blockstorage(region)
+    def request(uri, method, *args, **kwargs):
+        return _scheduled_request(send, target, account, service, region,
+                                  uri, method, *args, **kwargs)
+    request.rackspace_scheduled = True
+    setattr(target, method_name, request)
+    return client
 
-    if driver_type == "mon":
-        return pyrax.connect_to_cloud_monitoring(region)
 
-    if driver_type == "net":
-        return pyrax.connect_to_cloud_networks(region)
+def _scheduled_request(send, target, account, service, region, uri, method,
+                       *args, **kwargs):
+    """
+    Sends a request once the token bucket matching it has a token, retrying
+    over limit responses after their Retry-After or a jittered backoff.
+    Requests to a service and region whose circuit breaker is open fail
+    without being sent.
+
+    :param send: The original request method of the client
+    :param target: The object owning send, used for its management_url
+    :param account: The account name
+    :param service: The service catalog name
+    :param region: The region, ALL for global services
+    :param uri: The request URI, relative to the management URL or absolute
+    :param method: The HTTP verb
+    :return: Whatever send returns
+    :raise ClientException: A 503 if the circuit breaker is open
+    """
+    url = uri
+    if not uri.startswith('http'):
+        url = u'{0}{1}'.format(getattr(target, 'management_url', None) or '',
+                               uri)
+    breaker = _circuit_breaker(service, region)
+    breaker.check()
+    bucket = _rate_limit_bucket(send, account, service, region, url, method)
+    frame = _current_call()
+
+    for attempt in range(RATE_LIMIT_RETRIES + 1):
+        if bucket is not None:
+            bucket.acquire()
+        timeout = _deadline_timeout(kwargs.get('timeout'))
+        if timeout is not None:
+            kwargs['timeout'] = timeout
+        probe = breaker.acquire()
+        started = _clock()
+        try:
+            resp, body = send(uri, method, *args, **kwargs)
+            breaker.record(_clock() - started, False, probe)
+            if frame is not None:
+                frame.requests += 1
+                frame.bytes_out += _body_size(kwargs.get('body'))
+                frame.bytes_in += len(getattr(resp, 'content', None) or b'')
+            return resp, body
+        except Exception as e:
+            breaker.record(_clock() - started, _breaker_failure(e), probe)
+            if frame is not None:
+                frame.requests += 1
+            _raise_deadline_exceeded(e, method, uri)
+            code = getattr(e, 'code', getattr(e, 'http_status', None))
+            if code not in (413, 429) or attempt == RATE_LIMIT_RETRIES:
+                raise
+            if frame is not None:
+                frame.retries += 1
+            wait = _retry_after(e, attempt)
+            logger.warning(u'Over limit for {0} {1} {2}, retrying in '
+                           u'{3:.1f}s'.format(service, method, uri, wait))
+            if bucket is not None:
+                #Holding back the shared bucket delays every queued request
+                # of this kind, not just this one
+                bucket.drain(wait)
+            else:
+                time.sleep(wait)
 
-    if driver_type == 'cf':
-        return pyrax.connect_to_cloudfiles(region)
 
-    if driver_type == 'cs':
-        return pyrax.connect_to_cloudservers(region)
+def _raise_deadline_exceeded(error, method, uri):
+    """
+    :raise ClientException: A 408 if error is a request timing out at the
+    deadline of a hedged read
+    """
+    if getattr(_CALLS, 'deadline', None) is not None and \
+            isinstance(error, requests_exceptions.Timeout):
+        with _HEDGE_LOCK:
+            _HEDGE_STATS['deadline_exceeded'] += 1
+        raise exc.ClientException(408, u'Ran out of time waiting for '
+                                       u'{0} {1}'.format(method, uri))
+
+
+def _body_size(body):
+    if body is None:
+        return 0
+    if isinstance(body, (six.binary_type, six.text_type)):
+        return len(body)
+    return len(json.dumps(body))
+
+
+def _retry_after(error, attempt):
+    """
+    Determines how long to wait before retrying an over limit response.
+
+    :param error: The over limit exception. novaclient exceptions carry the
+    Retry-After header as retry_after, Rackspace error bodies carry a
+    retryAfter timestamp which pyrax keeps in details.
+    :param attempt: The number of retries so far
+    :return: Seconds to wait
+    """
+    jitter = random.uniform(0, RATE_LIMIT_BACKOFF)
+    retry_after = getattr(error, 'retry_after', None)
+    details = getattr(error, 'details', None)
+    if retry_after is None and isinstance(details, dict):
+        retry_after = details.get('retryAfter', details.get('Retry-After'))
+
+    if retry_after is not None:
+        try:
+            return min(float(retry_after), RATE_LIMIT_MAX_BACKOFF) + jitter
+        except (TypeError, ValueError):
+            pass
+        try:
+            when = datetime.datetime.strptime(
+                six.text_type(retry_after)[:19], '%Y-%m-%dT%H:%M:%S')
+            wait = calendar.timegm(when.utctimetuple()) - time.time()
+            return min(max(wait, 0), RATE_LIMIT_MAX_BACKOFF) + jitter
+        except ValueError:
+            pass
+
+    backoff = min(RATE_LIMIT_BACKOFF * 2 ** attempt, RATE_LIMIT_MAX_BACKOFF)
+    return backoff * random.uniform(0.5, 1.5)
+
+
+class _TokenBucket(object):
+    """
+    A token bucket refilled at value requests per unit of seconds, holding at
+    most value tokens.
+    """
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated', 'lock')
+
+    def __init__(self, value, seconds):
+        self.rate = float(value) / seconds
+        self.capacity = float(value)
+        self.tokens = self.capacity
+        self.updated = time.time()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.time()
+        self.tokens = min(self.capacity,
+                          self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        """
+        Takes a token, sleeping until one is available
+        """
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def drain(self, seconds):
+        """
+        Empties the bucket so no token is available for the given seconds
+        """
+        with self.lock:
+            self._refill()
+            self.tokens = min(self.tokens, 0) - seconds * self.rate
+
+
+def _rate_limit_bucket(send, account, service, region, url, method):
+    """
+    Finds the token bucket for a request, reading the rate limits of the
+    service with one /limits request the first time it is used.
 
-    raise KeyError(u"No Driver found by: {}".format(driver_type))
+    :return: A _TokenBucket or None if no rate limit applies
+    :raise ClientException: A 408 if a hedged read ran out of time reading
+    the limits, which are then read again by the next request
+    """
+    key = (account, service, region)
+    with _RATE_LOCK:
+        limits = _RATE_LIMITS.get(key)
+        lock = _RATE_LIMIT_LOCKS.setdefault(key, threading.Lock())
+    if limits is None:
+        #Read without holding _RATE_LOCK so requests to other services and
+        # regions aren't held up by it
+        with lock:
+            with _RATE_LOCK:
+                limits = _RATE_LIMITS.get(key)
+            if limits is None:
+                kwargs = {}
+                timeout = _deadline_timeout()
+                if timeout is not None:
+                    kwargs['timeout'] = timeout
+                try:
+                    _, body = send('/limits', 'GET', **kwargs)
+                    limits = _parse_rate_limits(body)
+                except Exception as e:
+                    #Not recorded, the next request reads them again
+                    _raise_deadline_exceeded(e, 'GET', '/limits')
+                    logger.debug(u'No rate limits available for {0} {1}: '
+                                 u'{2}'.format(service, region, e))
+                    limits = []
+                with _RATE_LOCK:
+                    _RATE_LIMITS[key] = limits
+
+    method = method.upper()
+    for index, (regex, verbs) in enumerate(limits):
+        if method not in verbs:
+            continue
+        if regex is not None and not regex.match(url):
+            continue
+        bucket_key = key + (index, method)
+        with _RATE_LOCK:
+            if bucket_key not in _RATE_BUCKETS:
+                _RATE_BUCKETS[bucket_key] = _TokenBucket(*verbs[method])
+            return _RATE_BUCKETS[bucket_key]
+    return None
+
+
+def _parse_rate_limits(body):
+    """
+    Parses the rate section of a /limits response
+    :param body: The decoded /limits response
+    :return: A list of (compiled regex or None, {verb: (value, seconds)})
+    """
+    rates = ((body or {}).get('limits') or {}).get('rate') or []
+    output = []
+    for entry in rates:
+        try:
+            regex = re.compile(entry['regex']) if entry.get('regex') else None
+        except re.error:
+            regex = None
+        verbs = {}
+        for limit in entry.get('limit', []):
+            seconds = RATE_LIMIT_UNITS.get(
+                six.text_type(limit.get('unit', '')).upper())
+            if seconds and limit.get('value') and limit.get('verb'):
+                verbs[limit['verb'].upper()] = (limit['value'], seconds)
+        if verbs:
+            output.append((regex, verbs))
+    return output
+
+
+class _CircuitBreaker(object):
+    """
+    Tracks the outcome of the latest requests to a service in a region.
+
+    While closed requests are sent and their outcome recorded. Once too many
+    of them failed or were slow it opens, and requests fail without being
+    sent. After the cooldown a single probe is let through, closing the
+    breaker if it succeeds and opening it again if it doesn't.
+    """
+    __slots__ = ('name', 'outcomes', 'state', 'opened', 'probing', 'reason',
+                 'lock')
+
+    def __init__(self, name):
+        self.name = name
+        #(time, failed, slow) of the latest requests
+        self.outcomes = collections.deque(maxlen=BREAKER_WINDOW_CALLS)
+        self.state = 'closed'
+        self.opened = 0
+        self.probing = False
+        self.reason = None
+        self.lock = threading.Lock()
+
+    def _retry_in(self):
+        return max(self.opened + BREAKER_COOLDOWN - _clock(), 0)
+
+    def _reject(self):
+        """
+        Raises if requests must not be sent, the lock being held
+        """
+        if self.state == 'closed':
+            return
+        if self.probing:
+            until = u'until the request probing it succeeds'
+        elif self._retry_in() > 0:
+            until = u'for another {0:.0f}s'.format(self._retry_in())
+        else:
+            return
+        raise exc.ClientException(503, u'{0} is unavailable, {1}. Not '
+                                       u'sending it requests {2}'.format(
+                                           self.name, self.reason, until))
+
+    def check(self):
+        """
+        :raise ClientException: A 503 if the breaker is open
+        """
+        with self.lock:
+            self._reject()
+
+    def acquire(self):
+        """
+        Lets a request through, as the probe once the cooldown is over
+        :return: True if the request is the probe
+        :raise ClientException: A 503 if the breaker is open
+        """
+        with self.lock:
+            self._reject()
+            if self.state == 'closed':
+                return False
+            self.state = 'half_open'
+            self.probing = True
+            return True
+
+    def record(self, elapsed, failed, probe=False):
+        """
+        Records the outcome of a request, opening or closing the breaker
+        """
+        slow = elapsed >= BREAKER_SLOW_CALL
+        now = _clock()
+        with self.lock:
+            if probe:
+                self.probing = False
+                if failed or slow:
+                    self._open(now, u'its probe {0}'.format(
+                        u'failed' if failed else
+                        u'took {0:.1f}s'.format(elapsed)))
+                else:
+                    self.state = 'closed'
+                    self.reason = None
+                    self.outcomes.clear()
+                    logger.info(u'{0} recovered, sending it requests '
+                                u'again'.format(self.name))
+                return
+            if self.state != 'closed':
+                return
+
+            self.outcomes.append((now, failed, slow))
+            while now - self.outcomes[0][0] > BREAKER_WINDOW:
+                self.outcomes.popleft()
+            total = len(self.outcomes)
+            failures = sum(1 for _, failed, _ in self.outcomes if failed)
+            slows = sum(1 for _, failed, slow in self.outcomes
+                        if slow and not failed)
+            if total >= BREAKER_MIN_CALLS and \
+                    failures + slows >= total * BREAKER_FAILURE_RATE:
+                reason = u'{0} of its last {1} requests failed'.format(
+                    failures + slows, total)
+                if slows:
+                    reason += u' or took {0}s or more'.format(
+                        BREAKER_SLOW_CALL)
+                self._open(now, reason)
+
+    def _open(self, now, reason):
+        self.state = 'open'
+        self.opened = now
+        self.reason = reason
+        logger.warning(u'{0} is failing, {1}. Failing its requests for '
+                       u'{2}s'.format(self.name, reason, BREAKER_COOLDOWN))
+
+    def to_dict(self):
+        with self.lock:
+            return {
+                'state': self.state,
+                'requests': len(self.outcomes),
+                'failed': sum(1 for _, failed, _ in self.outcomes if failed),
+                'slow': sum(1 for _, failed, slow in self.outcomes
+                            if slow and not failed),
+                'retry_in': round(self._retry_in(), 3)
+                if self.state != 'closed' else 0,
+                'reason': self.reason,
+            }
+
+
+def _circuit_breaker(service, region):
+    """
+    :return: The _CircuitBreaker of a service in a region, shared by every
+    account and thread
+    """
+    key = (service, region)
+    with _BREAKER_LOCK:
+        breaker = _BREAKERS.get(key)
+        if breaker is None:
+            breaker = _BREAKERS[key] = _CircuitBreaker(
+                u'{0} {1}'.format(service, region))
+    return breaker
 
 
-def _get_endpoints(service_name):
-    _auth()
-    if service_name in pyrax.services:
-        return pyrax.services[service_name]["endpoints"].keys()
+def _breaker_failure(error):
+    """
+    :return: True if a request error means the service failed, a server
+    error or no response at all, rather than the request being refused
+    """
+    code = getattr(error, 'code', getattr(error, 'http_status', None))
+    try:
+        return int(code) >= 500
+    except (TypeError, ValueError):
+        return True
+
+
+def _get_endpoints(service_name, account=None):
+    """
+    Returns the regions a service has endpoints in.
+
+    :param service_name: A service catalog name. Ex. load_balancer
+    :param account: The account name, the current or default one if None
+    :return: A tuple of region names, ('ALL',) for global services
+    :raise TypeError: If the service isn't in the service catalog
+    """
+    catalog = _auth(account)['catalog']
+    if service_name in catalog:
+        return catalog.regions(service_name)
     else:
         error_msg = u'No service found: {}'.format(service_name)
         logger.error(error_msg)
         raise TypeError(error_msg)
 
 
-def _check_region(service_name, region):
-    #TODO: needs to be plugged in
-    # for svc in pyrax.services:
-    # print svc, pyrax.identity.services[svc]["endpoints"].keys()
-    #
-    # load_balancer [u'DFW', u'ORD', u'SYD']
-    # compute [u'DFW', u'ORD', u'SYD']
-    # monitor ['ALL']
-    # database [u'ORD', u'DFW', u'SYD']
-    # object_cdn [u'ORD', u'DFW', u'SYD']
-    # volume [u'DFW', u'ORD', u'SYD']
-    # dns ['ALL']
-    # autoscale [u'ORD', u'DFW']
-    # backup ['ALL']
-    # object_store [u'DFW', u'ORD', u'SYD']
-    service_names = {
-        'lb': 'load_balancer',
-        'cs': 'compute',
-        'mon': 'monitor',
-        'db': 'database',
-        'cf': 'object_store',
-        'bs': 'volume',
-        'dns': 'dns',
+def _check_region(driver_type, region, account=None):
+    """
+    Determines if a driver type has an endpoint in the given region.
 
-    }
+    :param driver_type: A driver type as accepted by _get_driver. Ex. lb
+    :param region: A str or unicode object of the region. Ex. DFW
+    :param account: The account name, the current or default one if None
+    :return: True/False if the region is served
+    """
+    regions = _get_endpoints(SERVICE_NAMES[driver_type], account)
 
-    region = region.upper()
-    regions = _get_endpoints(service_name)
+    if 'ALL' in regions:
+        return True
 
-    if len(regions) == 1:
-        if regions[0].upper() == 'ALL':
-            return True
+    return region.upper() in regions
+
+
+def _get_regions(driver_type, regions):
+    """
+    Resolves the regions argument of the list functions.
+
+    :param driver_type: A driver type as accepted by _get_driver. Ex. lb
+    :param regions: 'ALL' or a list of region names
+    :return: A list of upper case region names
+    :raise ValueError: If a requested region isn't served
+    """
+    if isinstance(regions, six.string_types):
+        if regions.upper() == 'ALL':
+            return [region for region in
+                    _get_endpoints(SERVICE_NAMES[driver_type])
+                    if region != 'ALL']
+        regions = [regions]
+
+    output = []
+    for region in regions:
+        if not _check_region(driver_type, region):
+            raise ValueError(u'{0} is not available in region {1}'.format(
+                SERVICE_NAMES[driver_type], region))
+        output.append(region.upper())
+    return output
+
+
+def _parallel_map(func, items, workers=MAX_WORKERS):
+    """
+    Calls func for every item on a thread pool.
+
+    :param func: A callable taking a single item
+    :param items: A list of items
+    :param workers: The maximum number of concurrent calls
+    :return: A list of results in the same order as items
+    :raise: The first exception raised by func
+    """
+    items = list(items)
+    if len(items) <= 1:
+        return [func(item) for item in items]
+
+    parent = _current_call()
+
+    def call(item):
+        #Work done on the pool is accounted to the calling function
+        if parent is None:
+            return func(item)
+        frame = _CallFrame(parent.kind, parent.name, parent.account,
+                           parent.deadline)
+        frame.hedge_percentile = parent.hedge_percentile
+        stack = _call_stack()
+        stack.append(frame)
+        try:
+            return func(item)
+        finally:
+            stack.pop()
+            with _STATS_LOCK:
+                parent.merge(frame)
+
+    pool = ThreadPool(min(workers, len(items)))
+    try:
+        return pool.map(call, items)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def _fan_out_regions(driver_type, regions, func):
+    """
+    Calls func(region) concurrently for each requested region.
+
+    :param driver_type: A driver type as accepted by _get_driver. Ex. lb
+    :param regions: 'ALL' or a list of region names
+    :param func: A callable taking a region name
+    :return: A list of (region, result) tuples
+    """
+    regions = _get_regions(driver_type, regions)
+    return list(zip(regions, _parallel_map(func, regions)))
+
+
+def _merge_region_lists(results):
+    """
+    Merges per region lists of dicts into a single list, tagging each dict
+    with its region.
+
+    :param results: A list of (region, list of dicts) tuples
+    :return: A list of dicts
+    """
+    output = []
+    for region, items in results:
+        for item in items:
+            item['region'] = region
+            output.append(item)
+    return output
+
+
+def _instrument_module():
+    """
+    Applies _instrumented to every public function of this module
+    """
+    module_globals = globals()
+    for name, func in list(module_globals.items()):
+        if name.startswith('_') or name in STATS_UNINSTRUMENTED:
+            continue
+        if inspect.isfunction(func) and func.__module__ == __name__:
+            module_globals[name] = _instrumented(func)
 
-    if region in regions:
-        return True
 
-    return False
\ No newline at end of file
+_instrument_module()
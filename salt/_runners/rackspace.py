@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+"""
+Runner to take inventory snapshots of whole Rackspace accounts and diff
+them.
+
+:depends: rackspace execution module, msgpack
+:configuration:
+    The rackspace execution module is run on the master, so it has to be
+    synced there with ``salt-run saltutil.sync_modules`` and the rackspace
+    credentials, see the module, set in the master config.
+
+    Each snapshot reads every DNS zone and record, database instance, Cloud
+    Files container and load balancer, querying the services and regions
+    concurrently, and is written to the master cachedir as a gzipped
+    msgpack file of one table per kind, stored by column::
+
+        salt-run rackspace.snapshot
+        salt-run rackspace.snapshot accounts=ALL regions='[DFW, ORD]'
+        salt-run rackspace.diff
+"""
+
+# Import Python libs
+import datetime
+import gzip
+import logging
+import os
+
+# Import salt libs
+try:
+    import salt.utils.msgpack as msgpack
+    HAS_MSGPACK = msgpack.HAS_MSGPACK
+except ImportError:
+    try:
+        import msgpack
+        HAS_MSGPACK = True
+    except ImportError:
+        HAS_MSGPACK = False
+
+logger = logging.getLogger(__name__)
+
+__virtualname__ = 'rackspace'
+
+#Snapshots kept when a new one is taken
+SNAPSHOT_KEEP = 14
+SNAPSHOT_SUFFIX = '.msgpack.gz'
+
+
+def __virtual__():
+    """
+    Only load if msgpack is available
+    """
+    if HAS_MSGPACK:
+        return __virtualname__
+    return False, u'The rackspace runner requires msgpack'
+
+
+def snapshot(regions='ALL', accounts=None, keep=SNAPSHOT_KEEP):
+    """
+    Takes an inventory snapshot of the account and compares it with the
+    previous one.
+
+    :param regions: 'ALL' or a list of regions to read the regional
+    services from
+    :param accounts: 'ALL' or a list of accounts to snapshot instead of the
+    default account
+    :param keep: The number of snapshots to keep, older ones are removed
+    :return: A dict of the snapshot path, the row count of each table and,
+    if there was a previous snapshot, the number of added, removed and
+    changed rows of each table
+    """
+    tables = __salt__['salt.cmd']('rackspace.inventory', regions=regions,
+                                  accounts=accounts)
+    previous = _snapshot_paths()
+    path = _snapshot_write(tables)
+
+    output = {'path': path,
+              'rows': dict((kind, len(table['columns'][0]))
+                           for kind, table in tables.items())}
+    if previous:
+        output['previous'] = previous[-1]
+        output['changes'] = dict(
+            (kind, dict((change, len(rows))
+                        for change, rows in changes.items()))
+            for kind, changes in _diff_tables(
+                _snapshot_read(previous[-1]), tables).items())
+    del tables
+
+    for stale in _snapshot_paths()[:-keep] if keep else []:
+        os.remove(stale)
+    return output
+
+
+def diff(old=None, new=None, kinds=None):
+    """
+    Lists the rows added, removed and changed between two snapshots.
+
+    :param old: The path of the older snapshot, the one before new by
+    default
+    :param new: The path of the newer snapshot, the latest by default
+    :param kinds: A list of tables to compare, ex. dns_records, all of them
+    by default
+    :return: A dict of table name to its added and removed rows and changed
+    fields, only for tables that changed
+    """
+    paths = _snapshot_paths()
+    if new is None:
+        if not paths:
+            raise ValueError(u'No snapshots found in {0}'.format(
+                _snapshot_dir()))
+        new = paths[-1]
+    if old is None:
+        older = [path for path in paths if path < new]
+        if not older:
+            raise ValueError(u'No snapshot found before {0}'.format(new))
+        old = older[-1]
+    changes = _diff_tables(_snapshot_read(old), _snapshot_read(new),
+                           kinds=kinds)
+    return dict((kind, table) for kind, table in changes.items()
+                if any(table.values()))
+
+
+def _snapshot_dir():
+    return os.path.join(__opts__['cachedir'], 'rackspace', 'snapshots')
+
+
+def _snapshot_paths():
+    """
+    :return: The paths of the stored snapshots, oldest first
+    """
+    directory = _snapshot_dir()
+    if not os.path.isdir(directory):
+        return []
+    return sorted(os.path.join(directory, name)
+                  for name in os.listdir(directory)
+                  if name.endswith(SNAPSHOT_SUFFIX))
+
+
+def _snapshot_write(tables):
+    """
+    Writes a snapshot named after the current UTC time, through a temporary
+    file so a failed write never leaves a partial snapshot behind
+    :return: The path of the snapshot
+    """
+    directory = _snapshot_dir()
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    path = os.path.join(directory, u'{0}{1}'.format(
+        datetime.datetime.utcnow().strftime('%Y%m%dT%H%M%S.%fZ'),
+        SNAPSHOT_SUFFIX))
+    temporary = path + '.tmp'
+    with gzip.open(temporary, 'wb') as handle:
+        handle.write(msgpack.packb(tables, use_bin_type=True))
+    os.rename(temporary, path)
+    return path
+
+
+def _snapshot_read(path):
+    with gzip.open(path, 'rb') as handle:
+        return msgpack.unpackb(handle.read(), raw=False)
+
+
+def _diff_tables(old, new, kinds=None):
+    """
+    Compares two snapshots table by table, matching rows by the key fields
+    of their table
+    :return: A dict of table name to a dict of its added, removed and
+    changed rows
+    """
+    output = {}
+    for kind, table in new.items():
+        if kinds is not None and kind not in kinds:
+            continue
+        fields = table['fields']
+        previous = old.get(kind) or {'fields': fields, 'columns': []}
+        old_rows = _table_rows(previous, table['key'])
+        new_rows = _table_rows(table, table['key'])
+
+        changes = {'added': [], 'removed': [], 'changed': []}
+        for key, row in new_rows.items():
+            before = old_rows.pop(key, None)
+            if before is None:
+                changes['added'].append(dict(zip(fields, row)))
+            elif before != row:
+                before = dict(zip(previous['fields'], before))
+                changes['changed'].append({
+                    'key': dict(zip(table['key'], key)),
+                    'fields': dict(
+                        (field, [before.get(field), value])
+                        for field, value in zip(fields, row)
+                        if before.get(field) != value)})
+        changes['removed'] = [dict(zip(previous['fields'], row))
+                              for row in old_rows.values()]
+        output[kind] = changes
+    return output
+
+
+def _table_rows(table, key):
+    """
+    :return: A dict of each row's key values to the row, as tuples
+    """
+    positions = [table['fields'].index(field) for field in key]
+    output = {}
+    for row in zip(*table['columns']):
+        output[tuple(row[position] for position in positions)] = row
+    return output
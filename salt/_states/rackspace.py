@@ -9,51 +9,88 @@ Module to provide Rackspace infrastructure compatibility to Salt.
         rackspace:
             username: USERNAME
             apikey: API_KEY
+
+    Every state takes an account argument naming one of the profiles
+    configured under rackspace:accounts, see the execution module.
+
+    dns_record_exists states of the same zone, and cf_container_exists
+    states, are reconciled in one batch when state aggregation is enabled,
+    either for every rackspace state in the minion config::
+        state_aggregate:
+          - rackspace
+
+    or per state with ``aggregate: True``.
+
+    The lookups of zones, records, database instances and containers made by
+    the dns_zone_exists, dns_record_exists, db_instance_exists,
+    db_database_exists and cf_container_exists states give up once the state
+    has run for its lookup_timeout, ex. ``lookup_timeout: 20``.
 """
 
 # Import Python libs
+import functools
+import importlib
+import inspect
 import logging
 
 logger = logging.getLogger(__name__)
 
-#Import pyrax
-HAS_PYRAX = False
+# Import salt libs
 try:
-    import pyrax
-    import pyrax.exceptions as exc
-
-    HAS_PYRAX = True
-    pyrax.set_setting("identity_type", "rackspace")
-    logger.debug(u'Successfully imported pyrax')
+    from salt.utils.decorators import identical_signature_wrapper
 except ImportError:
-    logger.error(u"Could not import Pyrax")
-    pass
+    identical_signature_wrapper = None
+
+
+def _exc():
+    """
+    :return: pyrax.exceptions, only used to catch errors raised by the
+    execution module, by which time it has imported pyrax
+    """
+    return importlib.import_module('pyrax.exceptions')
+
 
 __virtualname__ = 'rackspace'
 
+#The arguments, besides name, merged by mod_aggregate for each function
+AGGREGATE_FUNCTIONS = {
+    'dns_record_exists': ['zone_name', 'record_type', 'data', 'ttl',
+                          'priority', 'comment', 'allow_multiple_records',
+                          'account'],
+    'cf_container_exists': ['cdn_enabled', 'ttl', 'account'],
+}
+#Requisites a state is only merged into a batch under if it has the same
+# ones as the state running the batch
+AGGREGATE_REQUISITES = ['require', 'require_any', 'watch', 'watch_any',
+                        'onchanges', 'onchanges_any', 'onfail', 'onfail_any',
+                        'onfail_all', 'listen']
+
 
 def __virtual__():
     """
-    Only load if pyrax is available and has the correct values in pillar
+    Only load if the rackspace execution module, which checks that pyrax is
+    available, is loaded
     """
-    if HAS_PYRAX:
+    if 'rackspace.db_instance_exists' in __salt__:
         return __virtualname__
     return False
 
 
-def db_instance_exists(name, flavor, size, opts=False):
+def db_instance_exists(name, flavor, size, opts=False, account=None,
+                       lookup_timeout=None):
     ret = {'name': name, 'result': True, 'comment': '', 'changes': {}}
+    if __opts__['test']:
+        return _plan_db_instance(ret, flavor, size, account)
+
     #TODO: Check flavor and size and update accordingly
-    does_exist = __salt__['rackspace.db_instance_exists'](name)
+    does_exist = __salt__['rackspace.db_instance_exists'](name,
+                                                          account=account)
 
     if not does_exist:
-        if __opts__['test']:
-            ret['result'] = None
-            ret['comment'] = u'DB instance {0} set to be created'.format(name)
-            return ret
         try:
             created = __salt__['rackspace.db_instance_create'](name, flavor,
-                                                               size)
+                                                               size,
+                                                               account=account)
             ret['changes']['new'] = created
         except ValueError as e:
             ret['result'] = False
@@ -65,13 +102,15 @@ def db_instance_exists(name, flavor, size, opts=False):
     return ret
 
 
-def db_database_exists(name, instance_name, character_set=None, collate=None):
+def db_database_exists(name, instance_name, character_set=None, collate=None,
+                       account=None, lookup_timeout=None):
     ret = {'name': name, 'result': True, 'comment': '', 'changes': {}}
     #TODO: Clean up the ClientException. Catching non existant
     #  DBs as well as other exceptions
     try:
-        does_exist = __salt__['rackspace.db_database_exists'](name, instance_name)
-    except exc.ClientException as e:
+        does_exist = __salt__['rackspace.db_database_exists'](
+            name, instance_name, account=account)
+    except _exc().ClientException as e:
             ret['result'] = False
             msg = u'Instance {0} is not ready, API Response: {1}'
             ret['comment'] = msg.format(instance_name, e.message)
@@ -87,7 +126,8 @@ def db_database_exists(name, instance_name, character_set=None, collate=None):
             name,
             instance_name,
             character_set=character_set,
-            collate=collate)
+            collate=collate,
+            account=account)
         ret['changes']['new'] = created
 
     else:
@@ -96,34 +136,36 @@ def db_database_exists(name, instance_name, character_set=None, collate=None):
     return ret
 
 
-def dns_zone_exists(name, email_address=None, ttl=None, opts=False):
+def dns_zone_exists(name, email_address=None, ttl=None, opts=False,
+                    account=None, lookup_timeout=None):
     ret = {'name': name, 'result': True, 'comment': '', 'changes': {}}
+    if __opts__['test']:
+        return _plan_dns_zone(ret, email_address, ttl, account)
 
     does_exist = __salt__['rackspace.dns_zone_exists'](
         name,
         email_address=email_address,
-        ttl=ttl)
+        ttl=ttl,
+        account=account)
 
     if not does_exist:
-        if __opts__['test']:
-            ret['result'] = None
-            ret['comment'] = u'DNS Zone {0} set to be created'.format(name)
-            return ret
-
-        base_zone_exists = __salt__['rackspace.dns_zone_exists'](name)
+        base_zone_exists = __salt__['rackspace.dns_zone_exists'](
+            name, account=account)
         if not base_zone_exists:
 
             created = __salt__['rackspace.dns_zone_create'](
                 name,
                 email_address=email_address,
-                ttl=ttl)
+                ttl=ttl,
+                account=account)
 
             ret['changes']['new'] = created
         else:
             updated = __salt__['rackspace.dns_zone_update'](
                 name,
                 email_address=email_address,
-                ttl=ttl)
+                ttl=ttl,
+                account=account)
 
             ret['changes']['updated'] = updated
     else:
@@ -134,8 +176,25 @@ def dns_zone_exists(name, email_address=None, ttl=None, opts=False):
 
 def dns_record_exists(name, zone_name, record_type, data, ttl=None,
                       priority=None, comment=None,
-                      allow_multiple_records=False, opts=False):
+                      allow_multiple_records=False, opts=False, batch=None,
+                      account=None, lookup_timeout=None, **kwargs):
+    #kwargs takes the aggregate and __agg__ keys of aggregated states, which
+    # salt passes along with the arguments
     ret = {'name': name, 'result': True, 'comment': '', 'changes': {}}
+    if __opts__['test']:
+        return _plan_dns_record(ret, zone_name, record_type, data, ttl,
+                                priority, allow_multiple_records, account)
+
+    spec = {'name': name, 'zone_name': zone_name, 'record_type': record_type,
+            'data': data, 'ttl': ttl, 'priority': priority,
+            'comment': comment,
+            'allow_multiple_records': allow_multiple_records,
+            'account': account}
+    if batch is not None:
+        return _aggregate_dns_records(ret, spec, batch)
+    aggregated = _aggregated_result('dns_record_exists', spec)
+    if aggregated is not None:
+        return aggregated
 
     does_exist = __salt__['rackspace.dns_record_exists'](
         name,
@@ -143,23 +202,18 @@ def dns_record_exists(name, zone_name, record_type, data, ttl=None,
         record_type=record_type,
         data=data,
         ttl=ttl,
-        priority=priority)
+        priority=priority,
+        account=account)
 
     if not does_exist:
-        if __opts__['test']:
-            comment = u'DNS Record for {0} set to be created/updated'.format(
-                name)
-            ret['result'] = None
-            ret['comment'] = comment
-            return ret
-
         #passing none for data as we are only concerned with finding a record
         # of the same type
         base_record_exists = __salt__['rackspace.dns_record_exists'](
             name,
             zone_name=zone_name,
             record_type=record_type,
-            data=None)
+            data=None,
+            account=account)
 
         if not base_record_exists:
             created = __salt__['rackspace.dns_record_create'](
@@ -169,7 +223,8 @@ def dns_record_exists(name, zone_name, record_type, data, ttl=None,
                 data=data,
                 ttl=600,
                 priority=priority,
-                comment=comment)
+                comment=comment,
+                account=account)
 
             ret['changes']['new'] = created
 
@@ -183,7 +238,8 @@ def dns_record_exists(name, zone_name, record_type, data, ttl=None,
                 name,
                 zone_name=zone_name,
                 record_type=record_type,
-                data=data)
+                data=data,
+                account=account)
 
             if needs_updating:
                 updated = __salt__['rackspace.dns_record_update'](
@@ -193,7 +249,8 @@ def dns_record_exists(name, zone_name, record_type, data, ttl=None,
                     data=data,
                     ttl=ttl,
                     priority=priority,
-                    comment=comment)
+                    comment=comment,
+                    account=account)
 
                 ret['changes']['updated'] = updated
 
@@ -209,7 +266,8 @@ def dns_record_exists(name, zone_name, record_type, data, ttl=None,
                     data=data,
                     ttl=600,
                     priority=priority,
-                    comment=comment)
+                    comment=comment,
+                    account=account)
 
                 ret['changes']['new'] = created
 
@@ -222,7 +280,8 @@ def dns_record_exists(name, zone_name, record_type, data, ttl=None,
                     data=data,
                     ttl=ttl,
                     priority=priority,
-                    comment=comment)
+                    comment=comment,
+                    account=account)
 
                 ret['changes']['updated'] = updated
     else:
@@ -231,37 +290,733 @@ def dns_record_exists(name, zone_name, record_type, data, ttl=None,
     return ret
 
 
-def cf_container_exists(name, cdn_enabled=None, ttl=None):
+def dns_ptr_managed(name, servers=None, load_balancers=None, region='DFW',
+                    ttl=None, remove_unlisted=False, account=None):
+    ret = {'name': name, 'result': True, 'comment': '', 'changes': {}}
+
+    try:
+        result = __salt__['rackspace.dns_ptr_sync'](
+            servers=servers,
+            load_balancers=load_balancers,
+            region=region,
+            ttl=ttl,
+            remove_unlisted=remove_unlisted,
+            test=__opts__['test'],
+            account=account)
+    except (ValueError, _exc().ClientException) as e:
+        ret['result'] = False
+        ret['comment'] = u'Unable to manage PTR records: {}'.format(e)
+        return ret
+
+    changes = dict((key, result[key]) for key in ('added', 'updated',
+                                                  'removed') if result[key])
+    summary = u', '.join(u'{0} {1}'.format(len(value), key)
+                         for key, value in sorted(changes.items()))
+
+    if __opts__['test'] and changes:
+        ret['result'] = None
+        ret['comment'] = u'PTR records set to be changed: {0}'.format(
+            summary)
+        return ret
+
+    ret['changes'] = changes
+    if result['failed']:
+        ret['result'] = False
+        ret['comment'] = u'Unable to change {0} PTR records: {1}'.format(
+            len(result['failed']), u'; '.join(
+                u'{0} {1}: {2}'.format(item['device'], item['ip'],
+                                       item['error'])
+                for item in result['failed']))
+    elif changes:
+        ret['comment'] = u'PTR records changed: {0}'.format(summary)
+    else:
+        ret['comment'] = u'PTR records are in the desired state'
+    return ret
+
+
+def cf_container_exists(name, cdn_enabled=None, ttl=None, batch=None,
+                        account=None, lookup_timeout=None, **kwargs):
+    #kwargs takes the aggregate and __agg__ keys of aggregated states, which
+    # salt passes along with the arguments
     ret = {'name': name, 'result': True, 'comment': '', 'changes': {}}
+    if __opts__['test']:
+        return _plan_cf_container(ret, cdn_enabled, ttl, account)
+
+    spec = {'name': name, 'cdn_enabled': cdn_enabled, 'ttl': ttl,
+            'account': account}
+    if batch is not None:
+        return _aggregate_cf_containers(ret, spec, batch)
+    aggregated = _aggregated_result('cf_container_exists', spec)
+    if aggregated is not None:
+        return aggregated
+
     does_exist = __salt__['rackspace.cf_container_exists'](
         name,
         cdn_enabled=cdn_enabled,
-        ttl=ttl)
+        ttl=ttl,
+        account=account)
     
     if not does_exist:
-        if __opts__['test']:
-            ret['result'] = None
-            ret['comment'] = u'Container {0} set to be created/updated'.format(
-                name)
-            return ret
-
-        base_exists = __salt__['rackspace.cf_container_exists'](name)
+        base_exists = __salt__['rackspace.cf_container_exists'](
+            name, account=account)
         if not base_exists:
 
             created = __salt__['rackspace.cf_container_create'](
                 name,
                 cdn_enabled=cdn_enabled,
-                ttl=ttl)
+                ttl=ttl,
+                account=account)
 
             ret['changes']['new'] = created
         else:
             updated = __salt__['rackspace.cf_container_update'](
                 name,
                 cdn_enabled=cdn_enabled,
-                ttl=ttl)
+                ttl=ttl,
+                account=account)
 
             ret['changes']['updated'] = updated
     else:
         ret['comment'] = u'{0} exists'.format(name)
 
     return ret
+
+
+def lb_exists(name, port, protocol, virtual_ips='PUBLIC', algorithm=None,
+              region='DFW', account=None):
+    ret = {'name': name, 'result': True, 'comment': '', 'changes': {}}
+
+    does_exist = __salt__['rackspace.lb_exists'](name, region=region,
+                                                 account=account)
+
+    if not does_exist:
+        if __opts__['test']:
+            ret['result'] = None
+            ret['comment'] = u'Load balancer {0} set to be created'.format(
+                name)
+            return ret
+        try:
+            created = __salt__['rackspace.lb_create'](
+                name,
+                port,
+                protocol,
+                virtual_ips=virtual_ips,
+                algorithm=algorithm,
+                region=region,
+                account=account)
+            ret['changes']['new'] = created
+        except ValueError as e:
+            ret['result'] = False
+            ret['comment'] = u'Unable to create: {}'.format(e)
+    else:
+        ret['comment'] = u'{0} exists'.format(name)
+
+    return ret
+
+
+def lb_nodes_managed(name, nodes, region='DFW', remove_unlisted=True,
+                     account=None):
+    ret = {'name': name, 'result': True, 'comment': '', 'changes': {}}
+
+    try:
+        diff = __salt__['rackspace.lb_nodes_sync'](
+            name,
+            nodes,
+            region=region,
+            remove_unlisted=remove_unlisted,
+            test=__opts__['test'],
+            account=account)
+    except (ValueError, _exc().NotFound) as e:
+        ret['result'] = False
+        ret['comment'] = u'Unable to manage nodes: {}'.format(e)
+        return ret
+
+    changes = dict((key, value) for key, value in diff.items() if value)
+    if not changes:
+        ret['comment'] = u'Nodes of {0} are in the desired state'.format(name)
+        return ret
+
+    summary = u', '.join(u'{0} {1}'.format(len(value), key)
+                         for key, value in sorted(changes.items()))
+    if __opts__['test']:
+        ret['result'] = None
+        ret['comment'] = u'Nodes of {0} set to be changed: {1}'.format(
+            name, summary)
+        return ret
+
+    ret['changes'] = changes
+    ret['comment'] = u'Nodes of {0} changed: {1}'.format(name, summary)
+    return ret
+
+
+def cs_servers_managed(name, count, image, flavor,
+                       name_pattern='{name}-{index}', networks=None,
+                       metadata=None, region='DFW', timeout=1800,
+                       account=None):
+    ret = {'name': name, 'result': True, 'comment': '', 'changes': {}}
+
+    names = [name_pattern.format(name=name, index=index)
+             for index in range(1, count + 1)]
+    existing = set(server['name'] for server in
+                   __salt__['rackspace.cs_server_list'](region=region,
+                                                        account=account))
+    missing = [server_name for server_name in names
+               if server_name not in existing]
+
+    if not missing:
+        ret['comment'] = u'All {0} servers of {1} exist'.format(count, name)
+        return ret
+
+    if __opts__['test']:
+        ret['result'] = None
+        ret['comment'] = u'Servers {0} set to be created'.format(
+            u', '.join(missing))
+        return ret
+
+    try:
+        created = __salt__['rackspace.cs_servers_create'](
+            missing,
+            image,
+            flavor,
+            networks=networks,
+            metadata=metadata,
+            region=region,
+            timeout=timeout,
+            fire_events=True,
+            account=account)
+    except ValueError as e:
+        ret['result'] = False
+        ret['comment'] = u'Unable to create: {}'.format(e)
+        return ret
+
+    if created['servers']:
+        ret['changes']['new'] = created['servers']
+    if created['failed']:
+        ret['result'] = False
+        ret['comment'] = u'Unable to create: {0}'.format(u'; '.join(
+            u'{0}: {1}'.format(server_name, error)
+            for server_name, error in sorted(created['failed'].items())))
+    else:
+        ret['comment'] = u'Created {0}'.format(u', '.join(missing))
+    return ret
+
+
+def bs_volumes_managed(name, volumes, region='DFW', timeout=600,
+                       account=None):
+    ret = {'name': name, 'result': True, 'comment': '', 'changes': {}}
+
+    result = __salt__['rackspace.bs_volumes_ensure'](
+        volumes,
+        region=region,
+        timeout=timeout,
+        test=__opts__['test'],
+        account=account)
+
+    changes = dict((key, result[key]) for key in ('created', 'attached')
+                   if result[key])
+
+    if __opts__['test'] and changes and not result['failed']:
+        ret['result'] = None
+        ret['comment'] = u'Volumes set to be changed: {0}'.format(changes)
+        return ret
+
+    if not __opts__['test']:
+        ret['changes'] = changes
+
+    if result['failed']:
+        ret['result'] = False
+        ret['comment'] = u'Unable to manage volumes: {0}'.format(u'; '.join(
+            u'{0}: {1}'.format(volume, error)
+            for volume, error in sorted(result['failed'].items())))
+    elif changes:
+        ret['comment'] = u'Volumes changed'
+    else:
+        ret['comment'] = u'Volumes are in the desired state'
+    return ret
+
+
+def bs_snapshots_present(name, volumes, force=True, region='DFW',
+                         timeout=600, account=None):
+    ret = {'name': name, 'result': True, 'comment': '', 'changes': {}}
+
+    name_pattern = name + u'-{volume}'
+    existing = set(snapshot['name'] for snapshot in
+                   __salt__['rackspace.bs_snapshot_list'](region=region,
+                                                          account=account))
+    missing = [volume for volume in volumes
+               if name_pattern.format(volume=volume) not in existing]
+
+    if not missing:
+        ret['comment'] = u'Snapshots {0} exist'.format(name)
+        return ret
+
+    if __opts__['test']:
+        ret['result'] = None
+        ret['comment'] = u'Snapshots of {0} set to be created'.format(
+            u', '.join(missing))
+        return ret
+
+    created = __salt__['rackspace.bs_snapshots_create'](
+        missing,
+        name_pattern=name_pattern,
+        force=force,
+        region=region,
+        timeout=timeout,
+        account=account)
+
+    if created['snapshots']:
+        ret['changes']['new'] = created['snapshots']
+    if created['failed']:
+        ret['result'] = False
+        ret['comment'] = u'Unable to snapshot: {0}'.format(u'; '.join(
+            u'{0}: {1}'.format(volume, error)
+            for volume, error in sorted(created['failed'].items())))
+    else:
+        ret['comment'] = u'Snapshots of {0} created within {1:.1f}s'.format(
+            u', '.join(missing), created['spread'])
+    return ret
+
+
+def mon_checks_managed(name, entities, remove_unlisted=False, account=None):
+    ret = {'name': name, 'result': True, 'comment': '', 'changes': {}}
+
+    result = __salt__['rackspace.mon_checks_sync'](
+        entities,
+        remove_unlisted=remove_unlisted,
+        test=__opts__['test'],
+        account=account)
+
+    changes = dict((key, result[key])
+                   for key in ('created', 'updated', 'removed')
+                   if result[key])
+
+    if __opts__['test'] and changes:
+        ret['result'] = None
+        ret['comment'] = u'Monitoring set to be changed: {0}'.format(changes)
+        return ret
+
+    if not __opts__['test']:
+        ret['changes'] = changes
+
+    if result['failed']:
+        ret['result'] = False
+        ret['comment'] = u'Unable to manage monitoring: {0}'.format(
+            u'; '.join(u'{0}: {1}'.format(item, error)
+                       for item, error in sorted(result['failed'].items())))
+    elif changes:
+        ret['comment'] = u'Monitoring changed'
+    else:
+        ret['comment'] = u'Monitoring is in the desired state'
+    return ret
+
+
+def net_exists(name, cidr, region='DFW', account=None):
+    ret = {'name': name, 'result': True, 'comment': '', 'changes': {}}
+
+    does_exist = __salt__['rackspace.net_exists'](name, region=region,
+                                                  account=account)
+
+    if not does_exist:
+        if __opts__['test']:
+            ret['result'] = None
+            ret['comment'] = u'Network {0} set to be created'.format(name)
+            return ret
+        try:
+            created = __salt__['rackspace.net_create'](name, cidr,
+                                                       region=region,
+                                                       account=account)
+            ret['changes']['new'] = created
+        except ValueError as e:
+            ret['result'] = False
+            ret['comment'] = u'Unable to create: {}'.format(e)
+    elif not __salt__['rackspace.net_exists'](name, cidr=cidr, region=region,
+                                              account=account):
+        ret['result'] = False
+        ret['comment'] = u'{0} exists with a different cidr'.format(name)
+    else:
+        ret['comment'] = u'{0} exists'.format(name)
+
+    return ret
+
+
+def stats_reported(name, reset=True):
+    """
+    Sends the rackspace call stats of the run onto the event bus. Add it with
+    order: last so it reports once every other state has run.
+    """
+    ret = {'name': name, 'result': True, 'comment': '', 'changes': {}}
+
+    if __opts__['test']:
+        ret['comment'] = u'Stats are not sent in test mode'
+        return ret
+
+    summary = __salt__['rackspace.stats_emit'](reset=reset)
+    ret['comment'] = u'Sent stats of {0} functions'.format(len(summary))
+    return ret
+
+
+def mod_aggregate(low, chunks, running):
+    """
+    Merges the dns_record_exists states of a zone, and the
+    cf_container_exists states, that haven't run yet into the batch of the
+    first of them, so they are reconciled with one batched call. The merged
+    states still run afterwards and report their own result from the batch.
+    States are only merged if they have the same requisites as the first one,
+    the batch runs when and only if it runs. States using prereq, which are
+    first run in test mode, are never merged.
+    """
+    if low.get('fun') not in AGGREGATE_FUNCTIONS or _aggregate_prereq(low):
+        return low
+    key = _aggregate_key(low)
+    low_tag = __utils__['state.gen_tag'](low)
+    batch = []
+    for chunk in chunks:
+        if chunk.get('state') != __virtualname__ or '__agg__' in chunk:
+            continue
+        tag = __utils__['state.gen_tag'](chunk)
+        if tag == low_tag or tag in running:
+            continue
+        if _aggregate_key(chunk) != key or _aggregate_prereq(chunk) or \
+                _aggregate_requisites(chunk) != _aggregate_requisites(low):
+            continue
+        spec = dict((arg, chunk[arg]) for arg in
+                    AGGREGATE_FUNCTIONS[low['fun']] if arg in chunk)
+        spec['name'] = chunk['name']
+        batch.append(spec)
+        chunk['__agg__'] = True
+    if batch:
+        low['batch'] = batch
+    return low
+
+
+def _aggregate_key(chunk):
+    """
+    :return: What chunks must share to be merged into one batch
+    """
+    if chunk.get('fun') == 'dns_record_exists':
+        return chunk.get('fun'), chunk.get('account'), chunk.get('zone_name')
+    return chunk.get('fun'), chunk.get('account')
+
+
+def _aggregate_requisites(chunk):
+    return dict((requisite, chunk[requisite])
+                for requisite in AGGREGATE_REQUISITES if chunk.get(requisite))
+
+
+def _aggregate_prereq(chunk):
+    return bool(chunk.get('prereq') or chunk.get('__prereq__'))
+
+
+def _aggregate_spec_key(function, spec):
+    if function == 'dns_record_exists':
+        return (function, spec['account'], spec['zone_name'], spec['name'],
+                spec['record_type'], spec['data'])
+    return function, spec['account'], spec['name']
+
+
+def _aggregated_result(function, spec):
+    """
+    Returns, once, the result a batch stored for a merged state of this run
+    """
+    results = __context__.get('rackspace.aggregate', {})
+    return results.pop(_aggregate_spec_key(function, spec), None)
+
+
+def _aggregate_store(function, specs, rets):
+    results = __context__.setdefault('rackspace.aggregate', {})
+    for spec, ret in zip(specs, rets):
+        results[_aggregate_spec_key(function, spec)] = ret
+
+
+def _aggregate_dns_records(ret, spec, batch):
+    specs = [spec]
+    for item in batch:
+        item = dict(item, zone_name=spec['zone_name'],
+                    account=spec['account'])
+        for arg, default in (('ttl', None), ('priority', None),
+                             ('comment', None),
+                             ('allow_multiple_records', False)):
+            item.setdefault(arg, default)
+        specs.append(item)
+
+    try:
+        results = __salt__['rackspace.dns_records_ensure'](
+            spec['zone_name'], specs, account=spec['account'])
+    except _exc().NotFound:
+        results = [{'action': None, 'record': None,
+                    'error': u'Zone {0} not found'.format(spec['zone_name'])}
+                   for _ in specs]
+
+    rets = []
+    for item, result in zip(specs, results):
+        item_ret = ret if item is spec else \
+            {'name': item['name'], 'result': True, 'comment': '',
+             'changes': {}}
+        if result['error'] is not None:
+            item_ret['result'] = False
+            item_ret['comment'] = u'Unable to manage {0}: {1}'.format(
+                item['name'], result['error'])
+        elif result['action'] == 'created':
+            item_ret['changes']['new'] = [result['record']]
+        elif result['action'] == 'updated':
+            item_ret['changes']['updated'] = result['record']
+        else:
+            item_ret['comment'] = u'{0} exists'.format(item['name'])
+        rets.append(item_ret)
+    _aggregate_store('dns_record_exists', specs[1:], rets[1:])
+    return ret
+
+
+def _aggregate_cf_containers(ret, spec, batch):
+    specs = [spec] + [dict({'cdn_enabled': None, 'ttl': None}, **item)
+                      for item in batch]
+    for item in specs:
+        item['account'] = spec['account']
+    results = __salt__['rackspace.cf_containers_ensure'](
+        specs, account=spec['account'])
+
+    rets = []
+    for item, result in zip(specs, results):
+        item_ret = ret if item is spec else \
+            {'name': item['name'], 'result': True, 'comment': '',
+             'changes': {}}
+        if result['error'] is not None:
+            item_ret['result'] = False
+            item_ret['comment'] = u'Unable to manage {0}: {1}'.format(
+                item['name'], result['error'])
+        elif result['action'] == 'created':
+            item_ret['changes']['new'] = result['container']
+        elif result['action'] == 'updated':
+            item_ret['changes']['updated'] = result['container']
+        else:
+            item_ret['comment'] = u'{0} exists'.format(item['name'])
+        rets.append(item_ret)
+    _aggregate_store('cf_container_exists', specs[1:], rets[1:])
+    return ret
+
+
+def _plan_references(account=None):
+    """
+    Collects the zones, instances and containers referred to by every
+    rackspace state of the run from __lowstate__, once per run
+
+    :return: A dict of zones, instances, containers and managed_zones sets
+    of the states using the account
+    """
+    accounts = __context__.get('rackspace.plan_refs')
+    if accounts is not None:
+        return accounts.get(account, _plan_empty_references())
+
+    accounts = {}
+    try:
+        chunks = __lowstate__
+    except NameError:
+        #Only available when called through the state system
+        chunks = []
+    for chunk in chunks or []:
+        if chunk.get('state') != __virtualname__:
+            continue
+        refs = accounts.setdefault(chunk.get('account'),
+                                   _plan_empty_references())
+        function = chunk.get('fun')
+        if function == 'dns_zone_exists':
+            refs['zones'].add(chunk['name'])
+            refs['managed_zones'].add(chunk['name'])
+        elif function == 'dns_record_exists' and chunk.get('zone_name'):
+            refs['zones'].add(chunk['zone_name'])
+        elif function == 'db_instance_exists':
+            refs['instances'].add(chunk['name'])
+        elif function == 'cf_container_exists':
+            refs['containers'].add(chunk['name'])
+    __context__['rackspace.plan_refs'] = accounts
+    return accounts.get(account, _plan_empty_references())
+
+
+def _plan_empty_references():
+    return {'zones': set(), 'instances': set(), 'containers': set(),
+            'managed_zones': set()}
+
+
+def _plan(zones=(), instances=(), containers=(), account=None):
+    """
+    Returns the dry run snapshot of an account, reading every object the
+    states of the run refer to in one rackspace.plan_snapshot call the first
+    time, and any object it doesn't hold yet afterwards
+    """
+    snapshots = __context__.setdefault('rackspace.plan', {})
+    first = account not in snapshots
+    snapshot = snapshots.setdefault(
+        account, {'zones': {}, 'instances': {}, 'containers': {}})
+    wanted = {'zones': set(zones), 'instances': set(instances),
+              'containers': set(containers)}
+    if first:
+        refs = _plan_references(account)
+        for kind in wanted:
+            wanted[kind] |= refs[kind]
+
+    missing = dict((kind, sorted(name for name in names
+                                 if name not in snapshot[kind]))
+                   for kind, names in wanted.items())
+    if any(missing.values()):
+        fetched = __salt__['rackspace.plan_snapshot'](account=account,
+                                                      **missing)
+        for kind in snapshot:
+            snapshot[kind].update(fetched[kind])
+    return snapshot
+
+
+def _planned(ret, changes, comment):
+    ret['result'] = None
+    ret['changes'] = changes
+    ret['comment'] = comment
+    return ret
+
+
+def _plan_diff(current, desired):
+    """
+    :return: old and new dicts of the desired values that differ from the
+    current ones
+    """
+    old = {}
+    new = {}
+    for key, value in desired.items():
+        if value is not None and current.get(key) != value:
+            old[key] = current.get(key)
+            new[key] = value
+    return old, new
+
+
+def _plan_dns_zone(ret, email_address, ttl, account):
+    name = ret['name']
+    zone = _plan(zones=[name], account=account)['zones'][name]
+    desired = {'email_address': email_address, 'ttl': ttl}
+    if zone is None:
+        return _planned(ret, {'old': None, 'new': dict(desired, name=name)},
+                        u'DNS Zone {0} set to be created'.format(name))
+
+    old, new = _plan_diff(zone, desired)
+    if not new:
+        ret['comment'] = u'{0} exists'.format(name)
+        return ret
+    return _planned(ret, {'old': old, 'new': new},
+                    u'DNS Zone {0} set to be updated'.format(name))
+
+
+def _plan_dns_record(ret, zone_name, record_type, data, ttl, priority,
+                     allow_multiple_records, account):
+    name = ret['name']
+    record_type = record_type.upper()
+    desired = {'name': name, 'type': record_type, 'data': data,
+               'ttl': ttl or None, 'priority': priority or None}
+    zone = _plan(zones=[zone_name], account=account)['zones'][zone_name]
+    if zone is None:
+        if zone_name not in _plan_references(account)['managed_zones']:
+            ret['result'] = False
+            ret['comment'] = u'Zone {0} not found'.format(zone_name)
+            return ret
+        return _planned(ret, {'old': None, 'new': desired},
+                        u'DNS Record for {0} set to be created with zone '
+                        u'{1}'.format(name, zone_name))
+
+    same = [record for record in zone['records']
+            if record['type'] == record_type and
+            record['name'].lower() == name.lower()]
+    matching = [record for record in same if record['data'] == data]
+    for record in matching:
+        old, _ = _plan_diff(record, {'ttl': desired['ttl']})
+        if not old and (record['priority'] is None or
+                        desired['priority'] is None or
+                        record['priority'] == desired['priority']):
+            ret['comment'] = u'{0} exists'.format(name)
+            return ret
+
+    if not same or (not matching and allow_multiple_records):
+        return _planned(ret, {'old': None, 'new': desired},
+                        u'DNS Record for {0} set to be created'.format(name))
+
+    current = (matching or same)[0]
+    old, new = _plan_diff(current, desired)
+    return _planned(ret, {'id': current['id'], 'old': old, 'new': new},
+                    u'DNS Record for {0} set to be updated'.format(name))
+
+
+def _plan_db_instance(ret, flavor, size, account):
+    name = ret['name']
+    instance = _plan(instances=[name], account=account)['instances'][name]
+    if instance is not None:
+        ret['comment'] = u'{0} exists'.format(name)
+        return ret
+    return _planned(ret, {'old': None, 'new': {'name': name, 'flavor': flavor,
+                                               'size': size}},
+                    u'DB instance {0} set to be created'.format(name))
+
+
+def _plan_cf_container(ret, cdn_enabled, ttl, account):
+    name = ret['name']
+    container = _plan(containers=[name],
+                      account=account)['containers'][name]
+    desired = {'cdn_enabled': cdn_enabled, 'cdn_ttl': ttl}
+    if container is None:
+        return _planned(ret, {'old': None, 'new': dict(desired, name=name)},
+                        u'Container {0} set to be created'.format(name))
+
+    old, new = _plan_diff(container, desired)
+    if not new:
+        ret['comment'] = u'{0} exists'.format(name)
+        return ret
+    return _planned(ret, {'old': old, 'new': new},
+                    u'Container {0} set to be updated'.format(name))
+
+
+def _lookup_timeout(value):
+    """
+    :return: The lookup_timeout of a state in seconds, None if there is none
+    """
+    try:
+        return float(value or 0) or None
+    except (TypeError, ValueError):
+        return None
+
+
+def _instrumented(func):
+    """
+    Records the wall time and the API usage of every call of a state through
+    the rackspace module's stats, bounding its lookups by the lookup_timeout
+    argument of the states taking one
+    """
+    code = func.__code__
+    arg_names = code.co_varnames[:code.co_argcount]
+    position = arg_names.index('lookup_timeout') \
+        if 'lookup_timeout' in arg_names else None
+
+    def wrapper(*args, **kwargs):
+        timeout = kwargs.get('lookup_timeout')
+        if position is not None and len(args) > position:
+            timeout = args[position]
+        token = __salt__['rackspace.stats_begin'](
+            'state', func.__name__, timeout=_lookup_timeout(timeout))
+        failed = True
+        try:
+            result = func(*args, **kwargs)
+            failed = False
+            return result
+        finally:
+            __salt__['rackspace.stats_end'](token, failed)
+
+    #Salt maps state arguments using the function signature
+    if identical_signature_wrapper is not None:
+        return identical_signature_wrapper(func, wrapper)
+    return functools.wraps(func)(wrapper)
+
+
+def _instrument_states():
+    state_globals = globals()
+    for name, func in list(state_globals.items()):
+        if name.startswith('_') or name in ('stats_reported',
+                                            'mod_aggregate'):
+            continue
+        if inspect.isfunction(func) and func.__module__ == __name__:
+            state_globals[name] = _instrumented(func)
+
+
+_instrument_states()